@@ -1,19 +1,66 @@
-import pyodbc
 import pandas as pd
 import datetime
 import traceback
+import argparse
+import json
+import os
+import csv
+import time
+import glob
+import hashlib
+import shutil
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+
+from almacen import (write_partitions, replace_partitions, escribir_manifiestos, particion_completa,
+                     list_partitions)
+from dimensiones import load_dimensiones, version_dimensiones, enrich, marcar_enriquecido, es_enriquecido
+from esquema import hora_a_segundos
 
 SERVER = r"SICCUBOCL\\INSTBDD01"
 DATABASE = "Reportes"
 
 OUTPUT_PATH = r"C:\Users\amaldonado\OneDrive - Sicontac Center S.A\Documentos\Documentos Analytics\Paneles\Aplicacion_Panel\Data\gestiones_actualizado.csv"
 
-QUERY = """
+# Almacén columnar Parquet particionado por FechaGestion (alternativa al CSV)
+PARQUET_DIR = r"C:\Users\amaldonado\OneDrive - Sicontac Center S.A\Documentos\Documentos Analytics\Paneles\Aplicacion_Panel\Data\gestiones"
+
+# Tablas de dimensión: las gestiones se guardan ya enriquecidas (pre-unidas)
+DIM_DIR = r"C:\Users\amaldonado\OneDrive - Sicontac Center S.A\Documentos\Documentos Analytics\Paneles\Aplicacion_Panel\Data"
+
+# Marca de agua del modo incremental (última FechaGestion + HoraGestion ya guardada)
+SUFIJO_WATERMARK = ".watermark.json"
+WATERMARK_PATH = OUTPUT_PATH + SUFIJO_WATERMARK
+
+# Bytes finales de la parte confirmada del CSV que se guardan (hash) en la
+# marca, para reconocer el archivo antes de recortarlo
+COLA_WATERMARK = 64 * 1024
+
+# Filas por lote en la exportación por streaming (memoria máxima ~ un lote)
+BATCH_SIZE = 50_000
+
+CONN_STR = (
+    "DRIVER={ODBC Driver 17 for SQL Server};"
+    "Server=SICCUBOCL\\INSTBDD01;"
+    "Database=Reportes;"
+    "Trusted_Connection=yes;"
+)
+
+# HoraGestion viaja como segundos desde la medianoche (entero): el panel
+# ordena y saca mínimos sobre números y la formatea solo al mostrarla
+SEGUNDOS_HORA = (
+    "(DATEPART(hour, HoraGestion) * 3600 + DATEPART(minute, HoraGestion) * 60"
+    " + DATEPART(second, HoraGestion))"
+)
+
+QUERY_SELECT = f"""
 select skfecha,
        DATEPART(hour, horagestion) as Hora,
        cast(CONVERT(varchar(10), FechaGestion) +' '+ CONVERT(varchar(11), HoraGestion) as datetime) AS Fecha,
        FechaGestion,
-       CONVERT(varchar, HoraGestion, 8) HoraGestion,
+       {SEGUNDOS_HORA} HoraGestion,
        NumeroOperacion,
        tipocontacto as CodigoTipoContacto,
        NombreRespuesta as Respuesta,
@@ -26,39 +73,146 @@ select skfecha,
        ProductoGestion,
        EsGestor,
        esEfectivo,
-    
+
        Estrategia,
        Gestor,
        Supervisor,
        codigocanal,
        EstadoCompromiso
 from RepGestionesSemanalPorHora
-where CodigoCedente = 'SOLIDARIO'
+"""
+
+QUERY_BASE = QUERY_SELECT + """where CodigoCedente = 'SOLIDARIO'
   and codigocanal in ('CALLCENTER','TELECONTACT')
-  and CAST(FechaGestion AS DATE) = '2025-11-21'
+"""
+
+QUERY = QUERY_BASE + """  and CAST(FechaGestion AS DATE) = '2025-11-21'
 
 """
 
-def run_query():
+# Solo filas desde la marca de agua: parámetros (fecha, fecha, segundos).
+# Se pide ">=" en la hora y se descartan luego las filas ya guardadas en ese
+# mismo segundo, para no perder gestiones que llegan con la misma hora.
+QUERY_INCREMENTAL = QUERY_BASE + f"""  and (CAST(FechaGestion AS DATE) > ?
+       or (CAST(FechaGestion AS DATE) = ? and {SEGUNDOS_HORA} >= ?))
+order by FechaGestion, HoraGestion
+"""
+
+
+def conectar():
+    # pyodbc solo hace falta contra SQL Server; el resto del módulo
+    # (incremental, rangos) funciona con cualquier conexión DB-API
+    import pyodbc
+
+    print("Conectando al servidor SQL...")
+    conn = pyodbc.connect(CONN_STR)
+    print("Conexión exitosa.")
+    return conn
+
+
+def _lotes(cursor, batch_size):
+    total = 0
+    inicio = time.perf_counter()
+
+    while True:
+        lote = cursor.fetchmany(batch_size)
+        if not lote:
+            break
+
+        yield lote
+
+        total += len(lote)
+        seg = time.perf_counter() - inicio
+        print(f"  {total:,} filas escritas ({total / seg if seg else 0:,.0f} filas/s)")
+
+
+def export_streaming(conn, query, output_path, params=(), batch_size=BATCH_SIZE, formato="csv", dims=None,
+                     staging=None, manifiesto=None):
+    """
+    Ejecuta `query` y escribe el resultado en `output_path` lote a lote con
+    `cursor.fetchmany`, sin armar el resultado completo en memoria.
+    Sirve con cualquier conexión DB-API (pyodbc, sqlite3...). Devuelve las filas escritas.
+
+    Con formato="parquet", `output_path` es la carpeta del almacén: los lotes
+    se escriben en staging (`staging`, por defecto `output_path`.staging) y al
+    terminar reemplazan las particiones (días) traídas. Con `manifiesto`
+    ({"fechas": días que cubre la consulta, más datos a registrar}) cada día
+    se reemplaza junto con su manifiesto, también los días sin filas.
+    Con `dims` (ver dimensiones.load_dimensiones) cada lote se enriquece antes de escribirse.
+    """
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    columnas = [d[0] for d in cursor.description]
+
+    total = 0
+
+    if formato == "parquet":
+        staging = staging or output_path + ".staging"
+        shutil.rmtree(staging, ignore_errors=True)
+
+        for lote in _lotes(cursor, batch_size):
+            df = pd.DataFrame.from_records([tuple(r) for r in lote], columns=columnas)
+            if dims is not None:
+                enrich(df, dims)
+            write_partitions(df, staging)
+            total += len(lote)
+
+        if manifiesto is not None:
+            escribir_manifiestos(staging, **manifiesto)
+        replace_partitions(staging, output_path)
+
+    else:
+        with open(output_path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            if dims is None:
+                writer.writerow(columnas)
+
+            for lote in _lotes(cursor, batch_size):
+                if dims is None:
+                    writer.writerows(lote)
+                else:
+                    df = pd.DataFrame.from_records([tuple(r) for r in lote], columns=columnas)
+                    enrich(df, dims)
+                    df.to_csv(f, index=False, header=total == 0)
+                f.flush()
+                total += len(lote)
+
+    cursor.close()
+    return total
+
+
+def _todo_enriquecido(destino, version, formato="parquet"):
+    """
+    True si, tras escribir filas enriquecidas con `version`, todo `destino`
+    queda con esa versión: el CSV se reescribe entero, pero en Parquet solo
+    cambian los días traídos y los demás conservan la versión que tenían.
+    """
+    if formato == "csv" or not list_partitions(destino):
+        return True
+    return es_enriquecido(destino, version)
+
+
+def run_query(formato="csv"):
     try:
-        print("Conectando al servidor SQL...")
+        conn = conectar()
 
-        conn_str = (
-            "DRIVER={ODBC Driver 17 for SQL Server};"
-            "Server=SICCUBOCL\\INSTBDD01;"
-            "Database=Reportes;"
-            "Trusted_Connection=yes;"
-        )
+        destino = PARQUET_DIR if formato == "parquet" else OUTPUT_PATH
+        version = version_dimensiones(DIM_DIR)
+        marcar = _todo_enriquecido(destino, version, formato)
 
-        conn = pyodbc.connect(conn_str)
-        print("Conexión exitosa.")
+        # La salida se reescribe: la marca de agua del modo incremental ya
+        # no la describe (run_incremental se niega a seguir sin marca)
+        borrar_watermark(destino + SUFIJO_WATERMARK)
 
-        df = pd.read_sql_query(QUERY, conn)
+        dims = load_dimensiones(DIM_DIR)
+        filas = export_streaming(conn, QUERY, destino, formato=formato, dims=dims)
 
-        print(f"Filas obtenidas: {len(df)}")
+        # Si no, la marca queda como estaba y el panel vuelve a enriquecer al cargar
+        if marcar:
+            marcar_enriquecido(destino, version)
 
-        df.to_csv(OUTPUT_PATH, index=False, encoding="utf-8-sig")
-        print(f"Archivo actualizado: {OUTPUT_PATH}")
+        print(f"Filas obtenidas: {filas}")
+        print(f"Archivo actualizado: {destino}")
 
         conn.close()
 
@@ -67,7 +221,428 @@ def run_query():
         print(traceback.format_exc())
 
 
+# =========================================================
+# MODO INCREMENTAL (marca de agua)
+# =========================================================
+def leer_watermark(path=WATERMARK_PATH):
+    """Devuelve la marca de agua guardada o None si todavía no existe."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def guardar_watermark(wm, path=WATERMARK_PATH):
+    """Escribe la marca de agua de forma atómica (archivo temporal + rename)."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(wm, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def borrar_watermark(path=WATERMARK_PATH):
+    if os.path.exists(path):
+        print(f"Borrando marca de agua: {path}")
+        os.remove(path)
+
+
+def _huella_cola(path, hasta):
+    """Hash de los COLA_WATERMARK bytes que terminan en `hasta`."""
+    desde = max(hasta - COLA_WATERMARK, 0)
+    with open(path, "rb") as f:
+        f.seek(desde)
+        return hashlib.blake2b(f.read(hasta - desde), digest_size=16).hexdigest()
+
+
+def _recuperar_salida(output_path, wm, inicio, formato="csv"):
+    """
+    Si una ejecución anterior alcanzó a escribir filas pero no a mover la
+    marca de agua, el archivo quedó más largo que lo registrado: se recorta
+    al último tamaño confirmado para no duplicar gestiones. En Parquet se
+    borran los archivos de lotes posteriores al último confirmado.
+
+    Antes de tocar nada se comprueba que la salida sea la que describe la
+    marca; si no (otra exportación la reescribió) o si hay salida con filas
+    pero no hay marca, agregar duplicaría o perdería filas: RuntimeError.
+    """
+    if not os.path.exists(output_path):
+        return
+
+    if wm is None:
+        if formato == "parquet":
+            posteriores = [p for p in list_partitions(output_path) if p >= str(inicio)]
+            if posteriores:
+                raise RuntimeError(
+                    f"{output_path} ya tiene los días {posteriores[0]}..{posteriores[-1]} y no hay "
+                    f"marca de agua: extráigalos con --desde (o use un --desde posterior)"
+                )
+        elif os.path.getsize(output_path) > 0:
+            raise RuntimeError(
+                f"{output_path} ya tiene filas y no hay marca de agua: muévalo o bórrelo "
+                f"para extraer de nuevo desde {inicio}"
+            )
+        return
+
+    if formato == "parquet":
+        # Los archivos del último lote confirmado tienen que seguir ahí
+        faltan = [f for f in wm.get("archivos", []) if not os.path.exists(os.path.join(output_path, f))]
+        if faltan:
+            raise RuntimeError(
+                f"{output_path} no es el que describe la marca de agua (faltan {faltan[0]}...): "
+                f"se reemplazaron particiones; borre la marca y vuelva a extraer esos días"
+            )
+        confirmado = wm.get("lote", 0)
+        for f in glob.glob(os.path.join(output_path, "*", "inc-*.parquet")):
+            if int(os.path.basename(f).split("-")[1]) > confirmado:
+                print(f"Borrando lote no confirmado: {f}")
+                os.remove(f)
+        return
+
+    confirmados = wm.get("bytes", 0)
+    tamano = os.path.getsize(output_path)
+    # Marcas anteriores no guardaban la cola: solo se acepta el archivo sin cambios
+    reconocido = tamano >= confirmados and (
+        _huella_cola(output_path, confirmados) == wm["cola"] if "cola" in wm else tamano == confirmados
+    )
+    if not reconocido:
+        raise RuntimeError(
+            f"{output_path} no es el archivo que describe la marca de agua "
+            f"({tamano:,} bytes, la marca confirma {confirmados:,}): muévalo o bórrelo "
+            f"junto con la marca para extraer de nuevo"
+        )
+    if tamano > confirmados:
+        print("Recortando filas no confirmadas de la ejecución anterior...")
+        with open(output_path, "r+b") as f:
+            f.truncate(confirmados)
+
+
+def run_incremental(conn=None, query=QUERY_INCREMENTAL, output_path=OUTPUT_PATH,
+                    watermark_path=WATERMARK_PATH, desde=None, formato="csv", dim_dir=DIM_DIR):
+    """
+    Trae solo las gestiones posteriores a la marca de agua, las agrega al
+    archivo local y luego avanza la marca. Devuelve las filas nuevas.
+
+    `conn` puede ser cualquier conexión DB-API (por defecto la de SQL Server)
+    y `desde` la fecha inicial cuando aún no hay marca (por defecto, hoy).
+    Con formato="parquet", `output_path` es la carpeta del almacén y cada
+    ejecución agrega un archivo `inc-<lote>` por día.
+    Las filas nuevas se enriquecen con las dimensiones de `dim_dir` (None = no).
+    """
+    propia = conn is None
+    if propia:
+        conn = conectar()
+
+    try:
+        wm = leer_watermark(watermark_path)
+        inicio = desde or datetime.date.today()
+        _recuperar_salida(output_path, wm, inicio, formato)
+
+        if wm is None:
+            wm = {
+                "FechaGestion": str(inicio),
+                "HoraGestion": 0,
+                "filas_en_marca": 0,
+                "bytes": 0,
+                "lote": 0,
+            }
+
+        # Marcas anteriores guardaban la hora como "HH:MM:SS"
+        fecha = wm["FechaGestion"]
+        hora = int(hora_a_segundos(pd.Series([wm["HoraGestion"]])).iloc[0])
+        df = pd.read_sql_query(query, conn, params=[fecha, fecha, hora])
+
+        # Claves normalizadas para comparar contra la marca
+        fechas = pd.to_datetime(df["FechaGestion"]).dt.strftime("%Y-%m-%d")
+        horas = hora_a_segundos(df["HoraGestion"])
+
+        # Descartar las filas que ya se guardaron en el segundo de la marca
+        en_marca = ((fechas == fecha) & (horas == hora)).to_numpy(dtype=bool, na_value=False)
+        ya_guardadas = en_marca.cumsum() <= wm["filas_en_marca"]
+        nuevas = ~(en_marca & ya_guardadas)
+
+        df = df[nuevas]
+        fechas = fechas[nuevas]
+        horas = horas[nuevas]
+
+        print(f"Filas nuevas: {len(df)}")
+        if df.empty:
+            return 0
+
+        # Solo se enriquece si la salida es nueva o ya venía enriquecida,
+        # para que todas las filas tengan las mismas columnas
+        nueva_salida = not os.path.exists(output_path) or (
+            formato == "csv" and os.path.getsize(output_path) == 0
+        )
+        enriquecer = dim_dir is not None and (nueva_salida or es_enriquecido(output_path))
+        if enriquecer:
+            version = version_dimensiones(dim_dir)
+            marcar = nueva_salida or es_enriquecido(output_path, version)
+            enrich(df, load_dimensiones(dim_dir))
+
+        lote = wm.get("lote", 0) + 1
+        archivos = []
+        if formato == "parquet":
+            escritos = write_partitions(df, output_path, prefijo=f"inc-{lote:06d}")
+            archivos = [os.path.relpath(f, output_path) for f in escritos]
+        else:
+            escribir_encabezado = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+            with open(output_path, "a", encoding="utf-8-sig" if escribir_encabezado else "utf-8", newline="") as f:
+                df.to_csv(f, index=False, header=escribir_encabezado)
+                f.flush()
+                os.fsync(f.fileno())
+
+        ultima_fecha, ultima_hora = fechas.iloc[-1], int(horas.iloc[-1])
+        en_ultima = int(((fechas == ultima_fecha) & (horas == ultima_hora)).sum())
+        if (ultima_fecha, ultima_hora) == (fecha, hora):
+            en_ultima += wm["filas_en_marca"]
+
+        confirmados = os.path.getsize(output_path) if formato == "csv" else 0
+        guardar_watermark({
+            "FechaGestion": ultima_fecha,
+            "HoraGestion": ultima_hora,
+            "filas_en_marca": en_ultima,
+            "bytes": confirmados,
+            "cola": _huella_cola(output_path, confirmados) if formato == "csv" else None,
+            "archivos": archivos,
+            "lote": lote,
+        }, watermark_path)
+
+        # Si las dimensiones cambiaron, la marca queda con la versión anterior
+        # y el panel vuelve a enriquecer todo al cargar
+        if enriquecer and marcar:
+            marcar_enriquecido(output_path, version)
+
+        print(f"Archivo actualizado: {output_path} (marca {ultima_fecha} {ultima_hora})")
+        return len(df)
+
+    finally:
+        if propia:
+            conn.close()
+
+
+# =========================================================
+# EXTRACCIÓN POR RANGOS (backfill)
+#
+# En vez de editar el literal de fecha de QUERY y correrlo día por día,
+# la consulta recibe como parámetros el rango [desde, hasta) y las listas
+# de cedentes y canales. Los rangos de días son independientes: se
+# reparten entre un número acotado de hilos que toman conexiones de un
+# pool, y cada rango reemplaza sus particiones apenas termina.
+# =========================================================
+CEDENTES = ["SOLIDARIO"]
+CANALES = ["CALLCENTER", "TELECONTACT"]
+
+MAX_CONEXIONES = 4
+
+
+class PoolConexiones:
+    """
+    Conexiones DB-API reutilizables, como mucho `maximo` abiertas a la vez.
+    `fabrica` crea una conexión nueva (por defecto la de SQL Server); para
+    probar sin servidor sirve, por ejemplo,
+    lambda: sqlite3.connect(path, check_same_thread=False).
+    """
+
+    def __init__(self, fabrica=None, maximo=MAX_CONEXIONES):
+        self.fabrica = fabrica or conectar
+        self._libres = queue.LifoQueue()
+        self._cupos = threading.BoundedSemaphore(maximo)
+
+    @contextmanager
+    def conexion(self):
+        with self._cupos:
+            try:
+                conn = self._libres.get_nowait()
+            except queue.Empty:
+                conn = self.fabrica()
+
+            try:
+                yield conn
+            except Exception:
+                # Tras un error la conexión puede quedar en mal estado: se descarta
+                conn.close()
+                raise
+            self._libres.put(conn)
+
+    def cerrar(self):
+        while True:
+            try:
+                self._libres.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def _marcadores(valores):
+    return ", ".join("?" * len(valores))
+
+
+def query_rango(cedentes=CEDENTES, canales=CANALES, select=QUERY_SELECT):
+    """
+    Consulta con parámetros (*cedentes, *canales, desde, hasta) sobre `select`.
+    El rango de fechas es semiabierto y sin CAST, así usa el índice de FechaGestion.
+    """
+    return select + f"""where CodigoCedente in ({_marcadores(cedentes)})
+  and codigocanal in ({_marcadores(canales)})
+  and FechaGestion >= ? and FechaGestion < ?
+"""
+
+
+def rangos_dias(desde, hasta, dias=1):
+    """Rangos [inicio, fin) de `dias` días que cubren desde..hasta (ambos incluidos)."""
+    desde = pd.Timestamp(desde).date()
+    hasta = pd.Timestamp(hasta).date()
+    paso = datetime.timedelta(days=dias)
+
+    inicio = desde
+    while inicio <= hasta:
+        fin = min(inicio + paso, hasta + datetime.timedelta(days=1))
+        yield inicio, fin
+        inicio = fin
+
+
+def extraer_rangos(desde, hasta, cedentes=CEDENTES, canales=CANALES, destino=PARQUET_DIR,
+                   pool=None, max_workers=MAX_CONEXIONES, dias=1, select=QUERY_SELECT,
+                   dim_dir=DIM_DIR, batch_size=BATCH_SIZE, reanudar=True, verificar=False):
+    """
+    Extrae desde..hasta (fechas incluidas) al almacén Parquet `destino`,
+    un rango de `dias` días por tarea y hasta `max_workers` tareas a la vez.
+    Cada rango reemplaza sus particiones al terminar, así lo ya extraído
+    queda guardado aunque falle otro rango.
+
+    Cada día queda con un manifiesto (filas, hashes y la consulta que lo
+    generó). Con reanudar=True se saltan los rangos cuyos días ya tienen
+    manifiesto de esta misma consulta y versión de las dimensiones
+    (dimensiones.version_dimensiones), así que volver a correr el mismo
+    backfill solo extrae lo que falta; verificar=True además recalcula
+    los hashes de los archivos.
+
+    `pool` es un PoolConexiones (por defecto uno nuevo contra SQL Server) y
+    `select` la parte select/from de la consulta. Devuelve
+    ({inicio: filas} de los rangos completos, [inicio de los rangos fallidos]).
+    """
+    query = query_rango(cedentes, canales, select)
+    rangos = list(rangos_dias(desde, hasta, dias))
+
+    version = version_dimensiones(dim_dir) if dim_dir is not None else None
+
+    # Identifica la consulta en los manifiestos: otros cedentes, canales o
+    # dimensiones (el enriquecimiento queda en los archivos) rehacen el día
+    consulta = hashlib.blake2b(
+        json.dumps([query, cedentes, canales, version]).encode("utf-8"), digest_size=16
+    ).hexdigest()
+
+    def dias_de(inicio, fin):
+        return [str(d.date()) for d in pd.date_range(inicio, fin, inclusive="left")]
+
+    pendientes = [
+        (inicio, fin) for inicio, fin in rangos
+        if not reanudar or not all(
+            particion_completa(destino, dia, verificar=verificar, consulta=consulta)
+            for dia in dias_de(inicio, fin)
+        )
+    ]
+    if len(pendientes) < len(rangos):
+        print(f"Rangos ya completos (se saltan): {len(rangos) - len(pendientes)}")
+
+    # Si lo que ya está guardado tiene esta versión de dimensiones, se mira
+    # antes de extraer (después ya no se distingue lo nuevo de lo viejo)
+    dims = None
+    marcar = False
+    if dim_dir is not None:
+        dims = load_dimensiones(dim_dir)
+        marcar = _todo_enriquecido(destino, version)
+        previos = set(list_partitions(destino))
+
+    propio = pool is None
+    if propio:
+        pool = PoolConexiones(maximo=max_workers)
+
+    def extraer(inicio, fin):
+        params = [*cedentes, *canales, str(inicio), str(fin)]
+        staging = f"{destino}.staging-{inicio}"
+        with pool.conexion() as conn:
+            return export_streaming(conn, query, destino, params=params, batch_size=batch_size,
+                                    formato="parquet", dims=dims, staging=staging,
+                                    manifiesto={"fechas": dias_de(inicio, fin), "consulta": consulta})
+
+    completos, fallidos = {}, []
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as ejecutor:
+            tareas = {ejecutor.submit(extraer, inicio, fin): inicio for inicio, fin in pendientes}
+
+            for tarea in as_completed(tareas):
+                inicio = tareas[tarea]
+                try:
+                    completos[inicio] = tarea.result()
+                    print(f"Rango {inicio}: {completos[inicio]:,} filas")
+                except Exception:
+                    fallidos.append(inicio)
+                    print(f"Error en el rango {inicio}:")
+                    print(traceback.format_exc())
+    finally:
+        if propio:
+            pool.cerrar()
+
+    # Solo si los días no extraídos ya tenían esta versión (ver run_query)
+    # o si se volvieron a extraer todos los días que había
+    if dims is not None and completos:
+        fines = dict(pendientes)
+        extraidos = {dia for inicio in completos for dia in dias_de(inicio, fines[inicio])}
+        if marcar or previos <= extraidos:
+            marcar_enriquecido(destino, version)
+
+    print(f"Rangos extraídos: {len(completos)} de {len(pendientes)} pendientes "
+          f"({sum(completos.values()):,} filas)")
+    return completos, sorted(fallidos)
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extracción de gestiones")
+    parser.add_argument("--incremental", action="store_true",
+                        help="traer solo las gestiones nuevas desde la marca de agua")
+    parser.add_argument("--formato", choices=["csv", "parquet"], default="csv",
+                        help="formato de salida (parquet = almacén particionado por FechaGestion)")
+    parser.add_argument("--desde", help="extraer por rangos desde esta fecha (YYYY-MM-DD) al almacén Parquet")
+    parser.add_argument("--hasta", help="última fecha del rango (por defecto, la de --desde)")
+    parser.add_argument("--cedente", action="append", help="cedente a extraer (repetible)")
+    parser.add_argument("--canal", action="append", help="canal a extraer (repetible)")
+    parser.add_argument("--dias", type=int, default=1, help="días por rango")
+    parser.add_argument("--workers", type=int, default=MAX_CONEXIONES,
+                        help="rangos en paralelo (y conexiones abiertas)")
+    parser.add_argument("--rehacer", action="store_true",
+                        help="volver a extraer también los días ya completos")
+    parser.add_argument("--verificar", action="store_true",
+                        help="comprobar los hashes de los días completos antes de saltarlos")
+    args = parser.parse_args()
+
     print("---- EJECUCIÓN INICIADA ----", datetime.datetime.now())
-    run_query()
-    print("---- EJECUCIÓN TERMINADA ----", datetime.datetime.now())
\ No newline at end of file
+    if args.desde:
+        try:
+            extraer_rangos(args.desde, args.hasta or args.desde,
+                           cedentes=args.cedente or CEDENTES, canales=args.canal or CANALES,
+                           dias=args.dias, max_workers=args.workers,
+                           reanudar=not args.rehacer, verificar=args.verificar)
+        except Exception:
+            print("Error ejecutando el proceso:")
+            print(traceback.format_exc())
+    elif args.incremental:
+        try:
+            if args.formato == "parquet":
+                run_incremental(output_path=PARQUET_DIR, watermark_path=PARQUET_DIR + SUFIJO_WATERMARK,
+                                formato="parquet")
+            else:
+                run_incremental()
+        except Exception:
+            print("Error ejecutando el proceso:")
+            print(traceback.format_exc())
+    else:
+        run_query(args.formato)
+    print("---- EJECUCIÓN TERMINADA ----", datetime.datetime.now())
@@ -0,0 +1,70 @@
+import threading
+from collections import OrderedDict
+
+from filtros import normalizar_seleccion
+from diagnostico import medir
+
+# =========================================================
+# Caché de agregados por widget
+#
+# Streamlit re-ejecuta todo el script en cada interacción. Cada cálculo
+# del panel (tabla de primera gestión, embudo, donut, resumen, pivote,
+# comparativo) se guarda con una clave hecha solo de lo que lo afecta:
+#   (nombre, versión de datos, filtros activos, entradas extra)
+# así mover el slider de hora recalcula el embudo y nada más. LRU con
+# tope de memoria; la instancia se comparte entre sesiones. Cada cálculo
+# (y cada acierto) queda en el diagnóstico del rerun que lo pidió.
+# =========================================================
+MAX_BYTES = 256 * 1024 * 1024
+
+# Marca de "no está en la caché": un resultado None también se guarda
+_FALTA = object()
+
+
+def clave_filtros(seleccion):
+    """Filtros activos como tupla ordenada: 'Todas' y 'Todos' no cuentan."""
+    return tuple(sorted(normalizar_seleccion(seleccion or {}).items()))
+
+
+class CacheAgregados:
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._datos = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, nombre, version, calcular, seleccion=None, **entradas):
+        """
+        Resultado de `calcular()` para esta combinación de entradas, calculado
+        una sola vez. El resultado se comparte: quien lo use no debe modificarlo.
+        """
+        clave = (nombre, version, clave_filtros(seleccion), tuple(sorted(entradas.items())))
+
+        with self._lock:
+            if clave in self._datos:
+                self._datos.move_to_end(clave)
+                self.aciertos += 1
+                valor = self._datos[clave][0]
+            else:
+                valor = _FALTA
+                self.fallos += 1
+
+        if valor is not _FALTA:
+            with medir(nombre, cache="acierto"):
+                return valor
+
+        with medir(nombre, cache="fallo") as m:
+            valor = m.salida(calcular())
+        bytes_valor = m.bytes_salida
+
+        with self._lock:
+            if clave not in self._datos and bytes_valor <= self.max_bytes:
+                self._datos[clave] = (valor, bytes_valor)
+                self._bytes += bytes_valor
+                while self._bytes > self.max_bytes:
+                    _, (_, liberado) = self._datos.popitem(last=False)
+                    self._bytes -= liberado
+        return valor
@@ -0,0 +1,431 @@
+import os
+import glob
+import hashlib
+import json
+import mmap
+import pickle
+import re
+import shutil
+import struct
+import time
+import uuid
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+# =========================================================
+# Almacenamiento columnar (Parquet particionado por FechaGestion)
+#
+#   base_dir/FechaGestion=2025-11-21/part-xxxx.parquet
+#
+# La columna de partición no se guarda dentro del archivo: la
+# reconstruye pyarrow a partir del nombre de la carpeta.
+# =========================================================
+PARTICION = "FechaGestion"
+COMPRESION = "zstd"
+
+
+def _carpeta(base_dir, fecha):
+    return os.path.join(base_dir, f"{PARTICION}={fecha}")
+
+
+# Solo carpetas de partición terminadas: no las .old que deja
+# replace_partitions ni otras copias con el mismo prefijo
+_NOMBRE_PARTICION = re.compile(rf"{PARTICION}=(\d{{4}}-\d{{2}}-\d{{2}})")
+
+
+def _particiones(base_dir):
+    """{fecha: carpeta} de las particiones del almacén."""
+    carpetas = {}
+    for carpeta in glob.glob(os.path.join(base_dir, f"{PARTICION}=*")):
+        nombre = _NOMBRE_PARTICION.fullmatch(os.path.basename(carpeta))
+        if nombre and os.path.isdir(carpeta):
+            carpetas[nombre.group(1)] = carpeta
+    return carpetas
+
+
+def _archivos(base_dir, fechas=None):
+    """Archivos .parquet de las particiones (de `fechas`, si se indican); sin los .tmp."""
+    carpetas = _particiones(base_dir)
+    if fechas is not None:
+        carpetas = {f: carpetas[f] for f in map(str, fechas) if f in carpetas}
+    return sorted(
+        archivo
+        for carpeta in carpetas.values()
+        for archivo in glob.glob(os.path.join(carpeta, "*.parquet"))
+    )
+
+
+def _clave_fecha(serie):
+    return pd.to_datetime(serie).dt.strftime("%Y-%m-%d")
+
+
+def write_partitions(df, base_dir, prefijo="part"):
+    """Agrega `df` a `base_dir`, un archivo nuevo por cada FechaGestion presente."""
+    claves = _clave_fecha(df[PARTICION])
+    datos = df.drop(columns=[PARTICION])
+
+    escritos = []
+    for fecha, idx in datos.groupby(claves.to_numpy(), sort=False).indices.items():
+        carpeta = _carpeta(base_dir, fecha)
+        os.makedirs(carpeta, exist_ok=True)
+
+        destino = os.path.join(carpeta, f"{prefijo}-{uuid.uuid4().hex}.parquet")
+        tmp = destino + ".tmp"
+
+        tabla = pa.Table.from_pandas(datos.iloc[idx], preserve_index=False)
+        pq.write_table(tabla, tmp, compression=COMPRESION)
+        os.replace(tmp, destino)
+        escritos.append(destino)
+
+    return escritos
+
+
+def replace_partitions(staging_dir, base_dir):
+    """
+    Reemplaza en `base_dir` cada partición presente en `staging_dir`
+    (recarga completa de un día) y borra la carpeta de staging.
+    """
+    os.makedirs(base_dir, exist_ok=True)
+
+    for carpeta in sorted(glob.glob(os.path.join(staging_dir, f"{PARTICION}=*"))):
+        destino = os.path.join(base_dir, os.path.basename(carpeta))
+        viejo = destino + ".old"
+
+        if os.path.exists(destino):
+            shutil.rmtree(viejo, ignore_errors=True)  # restos de un reemplazo anterior
+            os.replace(destino, viejo)
+        os.replace(carpeta, destino)
+        shutil.rmtree(viejo, ignore_errors=True)
+
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+# =========================================================
+# Manifiestos de partición (backfill reanudable)
+#
+#   base_dir/FechaGestion=2025-11-21/_manifiesto.json
+#
+# Se escriben en staging junto a los archivos del día y llegan al
+# almacén con el mismo rename de replace_partitions: si hay manifiesto,
+# la partición está completa. Registra filas y blake2b de cada archivo.
+# Los días sin filas también llevan manifiesto (y carpeta vacía).
+# =========================================================
+MANIFIESTO = "_manifiesto.json"
+
+
+def escribir_manifiestos(staging_dir, fechas, **datos):
+    """Manifiesto de cada día de `fechas` en `staging_dir`, con `datos` extra."""
+    for fecha in fechas:
+        carpeta = _carpeta(staging_dir, fecha)
+        os.makedirs(carpeta, exist_ok=True)
+
+        archivos = sorted(glob.glob(os.path.join(carpeta, "*.parquet")))
+        _escribir_json(os.path.join(carpeta, MANIFIESTO), {
+            **datos,
+            "fecha": str(fecha),
+            "filas": sum(pq.read_metadata(f).num_rows for f in archivos),
+            "archivos": {os.path.basename(f): _hash_archivo(f) for f in archivos},
+        })
+
+
+def leer_manifiesto(base_dir, fecha):
+    """Manifiesto de la partición o None si no está completa."""
+    try:
+        with open(os.path.join(_carpeta(base_dir, fecha), MANIFIESTO), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def particion_completa(base_dir, fecha, verificar=False, **datos):
+    """
+    True si la partición tiene manifiesto con estos `datos` y sus archivos
+    son los registrados. Con verificar=True además se comparan los hashes.
+    """
+    manifiesto = leer_manifiesto(base_dir, fecha)
+    if manifiesto is None or any(manifiesto.get(k) != v for k, v in datos.items()):
+        return False
+
+    carpeta = _carpeta(base_dir, fecha)
+    presentes = {os.path.basename(f) for f in glob.glob(os.path.join(carpeta, "*.parquet"))}
+    if presentes != set(manifiesto["archivos"]):
+        return False
+
+    if verificar:
+        return all(
+            _hash_archivo(os.path.join(carpeta, nombre)) == suma
+            for nombre, suma in manifiesto["archivos"].items()
+        )
+    return True
+
+
+def list_partitions(base_dir):
+    """Fechas (YYYY-MM-DD) disponibles en el almacén, ordenadas."""
+    return sorted(_particiones(base_dir))
+
+
+def _unificar(esquemas):
+    # Los lotes con columnas completamente nulas se guardan como tipo null:
+    # se unifican los esquemas para que convivan con los lotes tipados.
+    try:
+        return pa.unify_schemas(esquemas, promote_options="permissive")
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+
+    # Tipos incompatibles entre lotes (HoraGestion "HH:MM:SS" en lotes viejos
+    # y segundos en los nuevos): esas columnas se leen como texto y
+    # aplicar_esquema las convierte
+    tipos = {}
+    for esquema in esquemas:
+        for campo in esquema:
+            tipos.setdefault(campo.name, set()).add(campo.type)
+    texto = {nombre for nombre, t in tipos.items() if len(t - {pa.null()}) > 1}
+
+    esquemas = [
+        pa.schema([pa.field(c.name, pa.string()) if c.name in texto else c for c in esquema])
+        for esquema in esquemas
+    ]
+    return pa.unify_schemas(esquemas, promote_options="permissive")
+
+
+def read_partitions(base_dir, columns=None, fechas=None, categorias=()):
+    """
+    Lee el almacén con proyección de columnas (`columns`) y poda de
+    particiones (`fechas`): solo se abren los archivos de esos días.
+    Las columnas de `categorias` se leen como diccionario y llegan a
+    pandas como category, sin materializar los textos.
+    """
+    # Lista explícita de archivos: los .tmp a medio escribir y las
+    # carpetas .old o de staging no entran al dataset
+    archivos = _archivos(base_dir, fechas)
+    if not archivos:
+        return pd.DataFrame(columns=columns or [])
+
+    esquema = _unificar(
+        [pq.read_schema(f) for f in archivos] + [pa.schema([(PARTICION, pa.string())])]
+    )
+
+    categorias = [c for c in categorias if c in esquema.names and c != PARTICION]
+    for col in categorias:
+        i = esquema.get_field_index(col)
+        esquema = esquema.set(i, pa.field(col, pa.dictionary(pa.int32(), pa.string())))
+
+    formato = ds.ParquetFileFormat(read_options=ds.ParquetReadOptions(dictionary_columns=categorias))
+    particiones = ds.partitioning(pa.schema([(PARTICION, pa.string())]), flavor="hive")
+    dataset = ds.dataset(archivos, format=formato, partitioning=particiones,
+                         partition_base_dir=base_dir, schema=esquema)
+
+    if columns is not None:
+        columns = [c for c in columns if c in esquema.names]
+
+    return dataset.to_table(columns=columns).to_pandas()
+
+
+# =========================================================
+# Huellas de archivos (para versionar datos derivados)
+# =========================================================
+def _hash_archivo(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def fingerprint(paths):
+    """Hash del nombre y contenido de los archivos: cambia si cambia cualquiera."""
+    h = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        h.update(os.path.basename(path).encode("utf-8"))
+        h.update(_hash_archivo(path).encode("utf-8"))
+    return h.hexdigest()
+
+
+# =========================================================
+# Caché en disco del DataFrame enriquecido
+#
+# La clave combina ruta, tamaño, mtime y hash de cada archivo fuente:
+# si DatosGestion reescribe un archivo la clave cambia sola. El hash
+# completo solo se recalcula cuando cambian el tamaño o el mtime.
+#
+# El archivo de cada versión se escribe una vez y todos los procesos de
+# Streamlit lo mapean en memoria: las páginas las comparte el sistema
+# operativo y cada proceso extra no suma una copia del dataset.
+# =========================================================
+CACHE_DIR = ".cache_panel"
+
+# Segundos tras los cuales un .lock de otro proceso se da por abandonado
+BLOQUEO_ESPERA = 600
+
+
+def _escribir_json(path, datos):
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(datos, f)
+    os.replace(tmp, path)
+
+
+def file_key(paths, extra="", cache_dir=CACHE_DIR):
+    """Clave de versión de un conjunto de archivos fuente."""
+    os.makedirs(cache_dir, exist_ok=True)
+    memo_path = os.path.join(cache_dir, "hashes.json")
+
+    memo = {}
+    if os.path.exists(memo_path):
+        with open(memo_path, "r", encoding="utf-8") as f:
+            memo = json.load(f)
+
+    h = hashlib.blake2b(extra.encode("utf-8"), digest_size=16)
+    cambios = False
+
+    for path in sorted(os.path.abspath(p) for p in paths):
+        st = os.stat(path)
+        firma = [st.st_size, st.st_mtime_ns]
+
+        guardado = memo.get(path)
+        if guardado is None or guardado[:2] != firma:
+            memo[path] = firma + [_hash_archivo(path)]
+            cambios = True
+
+        h.update(json.dumps([path] + memo[path]).encode("utf-8"))
+
+    if cambios:
+        _escribir_json(memo_path, memo)
+
+    return h.hexdigest()
+
+
+# Alineación de cada arreglo dentro del archivo de un objeto
+_ALINEACION = 64
+
+
+class DiskCache:
+    """
+    Guarda DataFrames en Arrow IPC (Feather v2) bajo `cache_dir`, uno por
+    clave, y conserva solo las `max_versiones` más recientes.
+
+    Los archivos van sin comprimir y en un solo bloque de registros, así
+    `get` los mapea sin copiar: números, fechas, códigos de categorías y
+    textos quedan como vistas de solo lectura sobre el archivo.
+
+    Junto a cada DataFrame se pueden guardar objetos armados a partir de
+    él (índices, cubo) con `put_objeto`: pickle 5 con los arreglos numpy
+    fuera de banda, cada uno alineado en el archivo. `get_objeto` mapea el
+    archivo y los arreglos quedan como vistas de solo lectura, igual que
+    las columnas. Se desalojan con su DataFrame. Solo para objetos que
+    escribió este mismo proceso o sus pares (es pickle).
+    """
+
+    def __init__(self, nombre, cache_dir=CACHE_DIR, max_versiones=3):
+        self.nombre = nombre
+        self.cache_dir = cache_dir
+        self.max_versiones = max_versiones
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, clave):
+        return os.path.join(self.cache_dir, f"{self.nombre}-{clave}.arrow")
+
+    def existe(self, clave):
+        return os.path.exists(self._path(clave))
+
+    def get(self, clave):
+        path = self._path(clave)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)  # marca de uso para el desalojo
+        # split_blocks: una columna por bloque; consolidarlas copiaría todo
+        tabla = feather.read_table(path, memory_map=True)
+        return tabla.to_pandas(split_blocks=True)
+
+    def put(self, clave, df):
+        path = self._path(clave)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        # Varios bloques de registros obligarían a concatenar (copiar) al leer
+        feather.write_feather(
+            df.reset_index(drop=True), tmp, compression="uncompressed", chunksize=max(len(df), 1)
+        )
+        os.replace(tmp, path)
+        self._desalojar()
+
+    def _path_objeto(self, clave, parte):
+        return os.path.join(self.cache_dir, f"{self.nombre}-{clave}.{parte}.pkl")
+
+    def existe_objeto(self, clave, parte):
+        return os.path.exists(self._path_objeto(clave, parte))
+
+    def get_objeto(self, clave, parte):
+        path = self._path_objeto(clave, parte)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # Al final: pickle (con las posiciones de los arreglos) y su largo
+        (largo,) = struct.unpack("<Q", mapa[-8:])
+        datos, tramos = pickle.loads(mapa[-8 - largo:-8])
+        vista = memoryview(mapa)
+        return pickle.loads(datos, buffers=[vista[i:i + n] for i, n in tramos])
+
+    def put_objeto(self, clave, parte, objeto):
+        path = self._path_objeto(clave, parte)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+
+        buffers = []
+        datos = pickle.dumps(objeto, protocol=5, buffer_callback=buffers.append)
+        tramos = []
+        with open(tmp, "wb") as f:
+            for buffer in buffers:
+                crudo = buffer.raw()
+                f.write(b"\0" * (-f.tell() % _ALINEACION))
+                tramos.append((f.tell(), crudo.nbytes))
+                f.write(crudo)
+            cola = pickle.dumps((datos, tramos), protocol=5)
+            f.write(cola)
+            f.write(struct.pack("<Q", len(cola)))
+        os.replace(tmp, path)
+
+    @contextmanager
+    def bloqueo(self, clave, espera=BLOQUEO_ESPERA, intervalo=0.5):
+        """
+        Exclusión entre procesos para armar `clave` una sola vez: el primero
+        crea <archivo>.lock y los demás esperan a que lo borre.
+        """
+        lock = self._path(clave) + ".lock"
+        while True:
+            try:
+                os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock) > espera:
+                        os.remove(lock)  # el proceso que lo creó murió
+                        continue
+                except OSError:
+                    continue
+                time.sleep(intervalo)
+        try:
+            yield
+        finally:
+            try:
+                os.remove(lock)
+            except OSError:
+                pass
+
+    def _desalojar(self):
+        versiones = sorted(
+            glob.glob(os.path.join(self.cache_dir, f"{self.nombre}-*.arrow")),
+            key=os.path.getmtime,
+            reverse=True,
+        )
+        for viejo in versiones[self.max_versiones:]:
+            # Con sus objetos: <nombre>-<clave>.<parte>.pkl
+            for path in [viejo] + glob.glob(glob.escape(viejo[:-len(".arrow")]) + ".*.pkl"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
@@ -1,48 +1,100 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import csv
+import os
+import glob
+import uuid
+from functools import partial
+
+from almacen import read_partitions, list_partitions, file_key, DiskCache
+from ingesta import load_csv
+from dimensiones import (
+    COLUMNAS_DIMENSION,
+    dim_paths,
+    load_dimensiones,
+    version_dimensiones,
+    enrich,
+    es_enriquecido,
+)
+from filtros import FilterEngine, Dominios
+from cubo import Cubo
+from distintos import MODOS, ERROR_HLL
+from agregados import CacheAgregados
+from detalle import VistaDetalle, TAMANOS_PAGINA
+from diagnostico import Diagnostico, LOG_PATH, activar, medir, medir_asignaciones, leer_log
+from medidas import calcular_campos
+from esquema import CATEGORIAS, FECHAS, dtypes_lectura, aplicar_esquema, formato_fecha, formato_hora
 
 st.set_page_config(page_title="Panel Productividad BS", layout="wide")
 
-# =========================================================
-# Función robusta para cargar y limpiar CSVs
-# =========================================================
-def load_csv(path):
-    try:
-        with open(path, "r", encoding="latin-1") as f:
-            dialect = csv.Sniffer().sniff(f.read(1024))
-            sep = dialect.delimiter
-    except:
-        sep = ";"
-
-    df = pd.read_csv(path, sep=sep, encoding="latin-1")
-
-    df.columns = (
-        df.columns
-        .str.replace("ï»¿", "", regex=False)
-        .str.replace("\ufeff", "", regex=False)
-        .str.strip()
-    )
-    return df
+# Tiempos, filas y memoria de cada etapa de este rerun (ver diagnostico.py)
+diag = activar(Diagnostico("app", sesion=st.session_state.setdefault("sesion", uuid.uuid4().hex[:8])))
+
+# Archivo de gestiones que escribe DatosGestion
+CSV_PATH = "Data1/gestiones_actualizado1.csv"
+
+# Almacén Parquet particionado por FechaGestion (si existe, reemplaza al CSV)
+PARQUET_DIR = "Data1/gestiones"
+
+# Últimos N días a cargar desde el almacén (None = todos)
+DIAS_PANEL = None
+
+# Columnas que realmente usa el panel (proyección al leer Parquet)
+COLUMNAS_PANEL = [
+    "FechaGestion",
+    "Hora",
+    "HoraGestion",
+    "NumeroOperacion",
+    "CodigoTipoContacto",
+    "Respuesta",
+    "Identificacion",
+    "Telefono",
+    "Etapa",
+    "ProductoGestion",
+    "EsGestor",
+    "EsCompromiso",
+    "Estrategia",
+    "Gestor",
+    "Supervisor",
+] + COLUMNAS_DIMENSION
+
+# Caché en disco del resultado de load_all; subir la versión si cambia
+# la forma en que se arma el DataFrame
+CACHE_VERSION = 4
+CACHE = DiskCache("app")
+
+
+def fuentes():
+    """Archivos de los que depende load_all: gestiones + dimensiones."""
+    if os.path.isdir(PARQUET_DIR):
+        hechos = glob.glob(os.path.join(PARQUET_DIR, "*", "*.parquet"))
+    else:
+        hechos = [CSV_PATH]
+    return hechos + dim_paths()
+
+
+def load_gestiones_parquet():
+    fechas = list_partitions(PARQUET_DIR)
+    if DIAS_PANEL:
+        fechas = fechas[-DIAS_PANEL:]
+    return read_partitions(PARQUET_DIR, columns=COLUMNAS_PANEL, fechas=fechas, categorias=CATEGORIAS)
 
 
 # =========================================================
 # CARGA PRINCIPAL DE DATOS DESDE Data1/
 # =========================================================
-@st.cache_data
-def load_all():
-
+def armar_dataset():
+    """Lee las gestiones, las une con las dimensiones y agrega los campos calculados."""
 
-
-    # Archivo grande unificado
-    df = load_csv("Data1/gestiones_actualizado1.csv")
-
-    # Cargar tablas auxiliares desde Data
-    tipo_contacto = load_csv("Data/TipoContacto.csv")
-    producto = load_csv("Data/Producto.csv")
-    orden_etapa = load_csv("Data/Orden etapa.csv")  
-    semana = load_csv("Data/Semana.csv")
+    # Archivo grande unificado (o almacén Parquet si ya existe)
+    if os.path.isdir(PARQUET_DIR):
+        fuente = PARQUET_DIR
+        with medir("carga: parquet") as m:
+            df = m.salida(load_gestiones_parquet())
+    else:
+        fuente = CSV_PATH
+        with medir("carga: csv") as m:
+            df = m.salida(load_csv(fuente, dtype=dtypes_lectura(), usecols=COLUMNAS_PANEL, fechas=FECHAS))
 
 
     # Corrige columnas con BOM si existen
@@ -55,414 +107,532 @@ def load_all():
     }
 
     df.rename(columns=rename_map, inplace=True)
-    tipo_contacto.rename(columns=rename_map, inplace=True)
-    producto.rename(columns=rename_map, inplace=True)
-    orden_etapa.rename(columns=rename_map, inplace=True)
-    semana.rename(columns=rename_map, inplace=True)
-
-    # uniones
-    df = df.merge(tipo_contacto, on="CodigoTipoContacto", how="left")
-
-    df = df.merge(
-        producto[["ProductoGestion", "Producto"]],
-        on="ProductoGestion",
-        how="left"
-    )
-
-    df = df.merge(orden_etapa, on="Etapa", how="left")
 
-    semana.rename(columns={"fechaGestion": "FechaGestion"}, inplace=True)
+    # uniones: DatosGestion ya guarda las gestiones pre-unidas; solo se
+    # resuelven aquí si el archivo no trae la versión actual de las dimensiones
+    if not es_enriquecido(fuente, version_dimensiones()):
+        with medir("carga: dimensiones", entrada=df) as m:
+            m.salida(enrich(df, load_dimensiones()))
 
-    df = df.merge(semana, on="FechaGestion", how="left")
+    # Tipos del esquema (categorías, int8, fechas)
+    with medir("carga: esquema", entrada=df) as m:
+        m.salida(aplicar_esquema(df))
 
+    # Campos calculados (como DAX): EsContactoDirecto, EsContacto y Robot.
+    # Las medidas (Gestiones, CD, Contacto, ...) son alias, no columnas
+    with medir("carga: campos calculados", entrada=df) as m:
+        m.salida(calcular_campos(df))
 
-    # ========= CAMPOS CALCULADOS =========
-    
-    # EsContactoDirecto (como DAX)
-    df["EsContactoDirecto"] = (df["CodigoTipoContacto"] == "TIPRESCDIRE").astype(int)
-    
-    # EsContacto (como DAX)
-    df["EsContacto"] = (df["CodigoTipoContacto"] != "TIPRESNCON").astype(int)
-
-    # Robot (como DAX)
-    df["Robot"] = df["EsGestor"].apply(lambda x: "GESTOR" if x == 1 else "GESTOR_")
+    return df
 
-    
-    # Métricas del panel
-    df["Gestiones"] = 1
-    df["CD"] = df["EsContactoDirecto"]
-    df["Contacto"] = df["EsContacto"]
-    df["ContactoDirecto"] = df["EsContactoDirecto"]
-    df["Compromisos"] = df["EsCompromiso"]
 
+# cache_resource: todas las sesiones comparten el mismo DataFrame (solo
+# lectura) en vez de recibir una copia en cada rerun como con cache_data.
+# El DataFrame es un mapeo del archivo de la caché en disco, así también
+# lo comparten los demás procesos de Streamlit; lo mismo el índice de
+# filtros, el cubo y el orden del detalle (ver compartido)
+@st.cache_resource(max_entries=2)
+def load_all(version):
 
-    return df
+    # Caché en disco: reinicios y redeploys no vuelven a parsear ni unir
+    if not CACHE.existe(version):
+        # Un solo proceso arma el dataset; los demás esperan su archivo
+        with CACHE.bloqueo(version):
+            if not CACHE.existe(version):
+                df = armar_dataset()
+                with medir("carga: escribir cache en disco", entrada=df):
+                    CACHE.put(version, df)
+                del df  # la copia privada se libera; se usa la mapeada
 
+    with medir("carga: cache en disco") as m:
+        return m.salida(CACHE.get(version))
 
-df = load_all()
 
-# =========================================================
-# INTERFAZ PRINCIPAL
-# =========================================================
-tab1, tab2, tab3 = st.tabs([" Gestiones", " Detalle", " Comparativo"])
+# La versión cambia sola cuando DatosGestion reescribe algún archivo
+VERSION = file_key(fuentes(), extra=f"{CACHE_VERSION}-{DIAS_PANEL}")
+df = load_all(VERSION)
 
 
-# =========================================================
-# 1️⃣ — PESTAÑA GESTIONES (Ventana 1 Power BI)
-# =========================================================
-with tab1:
+def compartido(version, parte, armar):
+    """
+    Objeto armado sobre el dataset (índice, cubo, orden del detalle) desde
+    la caché en disco: sus arreglos quedan mapeados y los comparten los
+    procesos, como el DataFrame. Un solo proceso lo arma y lo escribe.
+    """
+    if not CACHE.existe_objeto(version, parte):
+        with CACHE.bloqueo(f"{version}.{parte}"):
+            if not CACHE.existe_objeto(version, parte):
+                CACHE.put_objeto(version, parte, armar())
+    return CACHE.get_objeto(version, parte)
 
-    st.title(" Panel de Gestiones — Productividad BS")
 
-    # -------------------- FILTROS --------------------
-    st.markdown("###  Filtros")
+@st.cache_resource(max_entries=2)
+def load_motor(version):
+    with medir("construir: indice de filtros", entrada=load_all(version)):
+        return compartido(version, "motor", lambda: FilterEngine(load_all(version)))
 
-    c1, c2, c3, c4, c5, c6, c7 = st.columns(7)
 
+motor = load_motor(VERSION)
 
-    with c1:
-        fecha_sel = st.selectbox("Fecha Gestión", ["Todas"] + sorted(df["FechaGestion"].dropna().unique()))
 
-    with c2:
-        supervisor_sel = st.selectbox("Supervisor", ["Todas"] + sorted(df["Supervisor"].dropna().unique()))
+@st.cache_resource(max_entries=2)
+def load_cubo(version):
+    with medir("construir: cubo", entrada=load_all(version)):
+        # Los subcubos (filtros fuera del grano) son de cada proceso
+        cubo = compartido(version, "cubo", lambda: Cubo(load_all(version)))
+        return cubo.enlazar(load_all(version), motor_filas=load_motor(version))
 
-    with c3:
-        gestor_sel = st.selectbox("Gestor", ["Todas"] + sorted(df["Gestor"].dropna().unique()))
 
-    with c4:
-        etapa_sel = st.selectbox("Etapa", ["Todas"] + sorted(df["Etapa"].dropna().unique()))
+cubo = load_cubo(VERSION)
 
-    with c5:
-        estrategia_sel = st.selectbox("Estrategia", ["Todas"] + sorted(df["Estrategia"].dropna().unique()))
 
-    with c6:
-        producto_sel = st.selectbox("Producto", ["Todos"] + sorted(df["Producto"].dropna().unique()))
-    with c7:
-        tipo_sel = st.selectbox("Tipo", ["Todos"] + sorted(df["Robot"].unique()))
+# Opciones de los filtros, una vez por versión y compartidas por las pestañas
+@st.cache_resource(max_entries=2)
+def load_dominios(version):
+    with medir("construir: opciones de filtros", entrada=load_cubo(version).celdas):
+        return Dominios(load_cubo(version).celdas, filas=load_all(version))
 
 
-    # Aplicar filtros
-    df_f = df.copy()
+dominios = load_dominios(VERSION)
 
-    if fecha_sel != "Todas":
-        df_f = df_f[df_f["FechaGestion"] == fecha_sel]
 
-    if supervisor_sel != "Todas":
-        df_f = df_f[df_f["Supervisor"] == supervisor_sel]
+# Agregados por widget, compartidos entre sesiones (clave: filtros + VERSION)
+@st.cache_resource
+def load_memo():
+    return CacheAgregados()
 
-    if gestor_sel != "Todas":
-        df_f = df_f[df_f["Gestor"] == gestor_sel]
 
-    if etapa_sel != "Todas":
-        df_f = df_f[df_f["Etapa"] == etapa_sel]
+memo = load_memo()
 
-    if estrategia_sel != "Todas":
-        df_f = df_f[df_f["Estrategia"] == estrategia_sel]
 
-    if producto_sel != "Todos":
-        df_f = df_f[df_f["Producto"] == producto_sel]
-        
-    if tipo_sel != "Todos":
-        df_f = df_f[df_f["Robot"] == tipo_sel]
+# Orden de la tabla de detalle (se arma al abrir la pestaña Detalle)
+@st.cache_resource(max_entries=2)
+def load_vista(version):
+    with medir("construir: orden del detalle", entrada=load_all(version)):
+        return compartido(version, "detalle", lambda: VistaDetalle(load_all(version)))
 
+# =========================================================
+# INTERFAZ PRINCIPAL
+# =========================================================
+# Solo se ejecuta la pestaña abierta: cambiar de pestaña re-ejecuta el script
+tab1, tab2, tab3 = st.tabs(
+    [" Gestiones", " Detalle", " Comparativo"], key="pestana", on_change="rerun"
+)
 
 
-    # -------------------- KPIs --------------------
-    st.markdown("---")
-    st.markdown("###  Métricas")
+# =========================================================
+# 1️⃣ — PESTAÑA GESTIONES (Ventana 1 Power BI)
+# =========================================================
+if tab1.open:
+    with tab1:
 
-    k1, k2, k3, k4, k5 = st.columns(5)
+        st.title(" Panel de Gestiones — Productividad BS")
 
-    k1.metric("Gestiones", df_f["Gestiones"].sum())
-    k2.metric("Operaciones Únicas", df_f["NumeroOperacion"].nunique())
-    k3.metric("Contacto Directo", df_f["Contacto"].sum())
-    k4.metric("Directo", df_f["ContactoDirecto"].sum())
-    k5.metric("Compromisos", df_f["Compromisos"].sum())
+        # -------------------- FILTROS --------------------
+        st.markdown("###  Filtros")
 
+        c1, c2, c3, c4, c5, c6, c7 = st.columns(7)
 
-    # --------------------------------------------------------
-    # LAYOUT PRINCIPAL
-    # --------------------------------------------------------
-    st.markdown("---")
-    colA, colB, colC = st.columns([1.2, 1.3, 1])
 
-    # ----------- 1) Tabla primera gestión -----------
-    with colA:
-        st.markdown("####  Hora de la primera gestión")
+        with c1:
+            fecha_sel = st.selectbox("Fecha Gestión", ["Todas"] + dominios.opciones("FechaGestion"), format_func=formato_fecha)
 
-        df_hora = (
-            df_f.groupby("Gestor")["HoraGestion"]
-            .min()
-            .reset_index()
-            .sort_values("HoraGestion")
-        )
+        with c2:
+            supervisor_sel = st.selectbox("Supervisor", ["Todas"] + dominios.opciones("Supervisor"))
 
-        st.dataframe(df_hora, use_container_width=True, height=360)
+        with c3:
+            gestor_sel = st.selectbox("Gestor", ["Todas"] + dominios.opciones("Gestor", {"Supervisor": supervisor_sel}))
 
+        with c4:
+            etapa_sel = st.selectbox("Etapa", ["Todas"] + dominios.opciones("Etapa"))
 
-    # ----------- 2) Slider + funnel -----------
-    with colB:
-        st.markdown("####  Rango de hora")
+        with c5:
+            estrategia_sel = st.selectbox("Estrategia", ["Todas"] + dominios.opciones("Estrategia"))
 
-        h_min = int(df_f["Hora"].min())
-        h_max = int(df_f["Hora"].max())
+        with c6:
+            producto_sel = st.selectbox("Producto", ["Todos"] + dominios.opciones("Producto"))
+        with c7:
+            tipo_sel = st.selectbox("Tipo", ["Todos"] + dominios.opciones("Robot"))
 
-        desde = st.slider("Desde", h_min, h_max, h_min)
-        hasta = st.slider("Hasta", h_min, h_max, h_max)
 
-        df_rango = df_f[(df_f["Hora"] >= desde) & (df_f["Hora"] <= hasta)]
+        # Aplicar filtros
+        seleccion = {
+            "FechaGestion": fecha_sel,
+            "Supervisor": supervisor_sel,
+            "Gestor": gestor_sel,
+            "Etapa": etapa_sel,
+            "Estrategia": estrategia_sel,
+            "Producto": producto_sel,
+            "Robot": tipo_sel,
+        }
 
-        st.markdown(f"**Gestiones en rango:** {df_rango['Gestiones'].sum():,.0f}")
+        # KPIs, embudo, donut y tablas salen del cubo: la pestaña no toca filas
+        totales = memo.obtener("totales", VERSION, lambda: cubo.totales(seleccion), seleccion)
 
-        funnel = pd.DataFrame({
-            "Etapa": ["Operaciones", "Contacto Directo", "Directo", "Compromisos"],
-            "Valor": [
-                df_rango["NumeroOperacion"].nunique(),
-                df_rango["Contacto"].sum(),
-                df_rango["ContactoDirecto"].sum(),
-                df_rango["Compromisos"].sum(),
-            ]
-        })
+        # -------------------- KPIs --------------------
+        st.markdown("---")
+        st.markdown("###  Métricas")
 
-        fig = px.bar(
-            funnel,
-            x="Valor",
-            y="Etapa",
-            orientation="h",
-            text="Valor"
+        modo_ops = st.radio(
+            "Conteo de operaciones únicas",
+            MODOS,
+            horizontal=True,
+            help=f"Aproximado usa HyperLogLog: error típico ±{ERROR_HLL:.1%}, más rápido al filtrar muchos datos.",
+        )
+        ops_unicas = memo.obtener(
+            "operaciones_unicas", VERSION,
+            lambda: cubo.operaciones_unicas(seleccion, modo=modo_ops),
+            seleccion, modo=modo_ops,
         )
-        st.plotly_chart(fig, use_container_width=True, height=360)
 
+        k1, k2, k3, k4, k5 = st.columns(5)
+
+        k1.metric("Gestiones", totales["Gestiones"])
+        k2.metric("Operaciones Únicas", ops_unicas)
+        k3.metric("Contacto Directo", totales["Contacto"])
+        k4.metric("Directo", totales["ContactoDirecto"])
+        k5.metric("Compromisos", totales["Compromisos"])
+
+
+        # --------------------------------------------------------
+        # LAYOUT PRINCIPAL
+        # --------------------------------------------------------
+        st.markdown("---")
+        colA, colB, colC = st.columns([1.2, 1.3, 1])
+
+        # ----------- 1) Tabla primera gestión -----------
+        with colA:
+            st.markdown("####  Hora de la primera gestión")
+
+            df_hora = memo.obtener(
+                "primera_gestion", VERSION,
+                lambda: (
+                    cubo.rollup(seleccion, "Gestor")[["Gestor", "PrimeraHora"]]
+                    .rename(columns={"PrimeraHora": "HoraGestion"})
+                    .sort_values("HoraGestion")
+                    .assign(HoraGestion=lambda t: formato_hora(t["HoraGestion"]))
+                ),
+                seleccion,
+            )
 
-    # ----------- 3) Donut Tipo Contacto -----------
-    with colC:
-        st.markdown("#### Tipo de contacto")
+            with medir("tabla: primera gestion", entrada=df_hora):
+                st.dataframe(df_hora, use_container_width=True, height=360)
 
-        tc = df_f["TipoContacto"].value_counts().reset_index()
-        tc.columns = ["Tipo", "Cantidad"]
 
-        fig_pie = px.pie(tc, values="Cantidad", names="Tipo", hole=0.55)
-        st.plotly_chart(fig_pie, use_container_width=True, height=360)
+        # ----------- 2) Slider + funnel -----------
+        with colB:
+            st.markdown("####  Rango de hora")
 
+            # Medidas acumuladas por hora: mover los sliders resta dos sumas
+            acumulado = memo.obtener("por_hora", VERSION, lambda: cubo.por_hora(seleccion), seleccion)
+            h_min, h_max = acumulado.extremos()
 
-    # -------------------- TABLAS INFERIORES --------------------
-    st.markdown("---")
-    b1, b2 = st.columns([1.2, 1.8])
+            desde = st.slider("Desde", h_min, h_max, h_min)
+            hasta = st.slider("Hasta", h_min, h_max, h_max)
 
-    # ----------- Resumen por gestor -----------
-    with b1:
-        st.markdown("####  Resumen por Gestor")
+            def _embudo():
+                rango = acumulado.totales((desde, hasta))
+                funnel = pd.DataFrame({
+                    "Etapa": ["Operaciones", "Contacto Directo", "Directo", "Compromisos"],
+                    "Valor": [
+                        cubo.operaciones_unicas(seleccion, hora=(desde, hasta), modo=modo_ops),
+                        rango["Contacto"],
+                        rango["ContactoDirecto"],
+                        rango["Compromisos"],
+                    ]
+                })
+                return rango, funnel
 
-        tabla = (
-            df_f.groupby("Gestor")
-            .agg({
-                "Gestiones": "sum",
-                "CD": "sum",
-                "Compromisos": "sum",
-                "ContactoDirecto": "sum",
-            })
-            .reset_index()
-        )
+            rango, funnel = memo.obtener(
+                "embudo", VERSION, _embudo, seleccion, hora=(desde, hasta), modo=modo_ops
+            )
 
-        tabla["% Directo"] = (tabla["ContactoDirecto"] / tabla["Gestiones"] * 100).round(1)
+            st.markdown(f"**Gestiones en rango:** {rango['Gestiones']:,.0f}")
 
-        st.dataframe(tabla, use_container_width=True, height=320)
+            fig = px.bar(
+                funnel,
+                x="Valor",
+                y="Etapa",
+                orientation="h",
+                text="Valor"
+            )
+            with medir("grafico: embudo"):
+                st.plotly_chart(fig, use_container_width=True, height=360)
+
+
+        # ----------- 3) Donut Tipo Contacto -----------
+        with colC:
+            st.markdown("#### Tipo de contacto")
+
+            tc = memo.obtener(
+                "donut", VERSION,
+                lambda: (
+                    cubo.rollup(seleccion, "TipoContacto")[["TipoContacto", "Gestiones"]]
+                    .sort_values("Gestiones", ascending=False)
+                    .set_axis(["Tipo", "Cantidad"], axis=1)
+                ),
+                seleccion,
+            )
 
+            fig_pie = px.pie(tc, values="Cantidad", names="Tipo", hole=0.55)
+            with medir("grafico: donut tipo contacto"):
+                st.plotly_chart(fig_pie, use_container_width=True, height=360)
 
-    # ----------- Tabla por hora -----------
-    with b2:
-        st.markdown("#### Gestiones por Hora")
 
-        tabla_horas = pd.pivot_table(
-            df_f,
-            index="Gestor",
-            columns="Hora",
-            values="Gestiones",
-            aggfunc="sum",
-            fill_value=0
-        )
+        # -------------------- TABLAS INFERIORES --------------------
+        st.markdown("---")
+        b1, b2 = st.columns([1.2, 1.8])
 
-        st.dataframe(tabla_horas, use_container_width=True, height=320)
+        # ----------- Resumen por gestor -----------
+        with b1:
+            st.markdown("####  Resumen por Gestor")
 
+            def _resumen():
+                tabla = cubo.rollup(seleccion, "Gestor")
+                tabla["CD"] = tabla["ContactoDirecto"]
+                tabla = tabla[["Gestor", "Gestiones", "CD", "Compromisos", "ContactoDirecto"]]
 
+                tabla["% Directo"] = (tabla["ContactoDirecto"] / tabla["Gestiones"] * 100).round(1)
+                return tabla
 
-# =========================================================
-# 6. PESTAÑA — DETALLE
-# =========================================================
-with tab2:
+            tabla = memo.obtener("resumen_gestor", VERSION, _resumen, seleccion)
 
-    st.title(" Detalle de Gestiones")
+            with medir("tabla: resumen gestor", entrada=tabla):
+                st.dataframe(tabla, use_container_width=True, height=320)
 
-    # -------------------- FILTROS --------------------
-    st.markdown("###  Filtros")
 
-    d1, d2, d3, d4, d5, d6, d7 = st.columns(7)
+        # ----------- Tabla por hora -----------
+        with b2:
+            st.markdown("#### Gestiones por Hora")
 
-    with d1:
-        fecha_d = st.selectbox(
-            "Fecha Gestión",
-            ["Todas"] + sorted(df["FechaGestion"].dropna().unique()),
-            key="fecha_d"
-        )
+            tabla_horas = memo.obtener(
+                "pivot_hora", VERSION,
+                lambda: cubo.pivot(seleccion, index="Gestor", columns="Hora"),
+                seleccion,
+            )
 
-    with d2:
-        supervisor_d = st.selectbox(
-            "Supervisor",
-            ["Todas"] + sorted(df["Supervisor"].dropna().unique()),
-            key="supervisor_d"
-        )
+            with medir("tabla: pivote hora", entrada=tabla_horas):
+                st.dataframe(tabla_horas, use_container_width=True, height=320)
 
-    with d3:
-        gestor_d = st.selectbox(
-            "Gestor",
-            ["Todas"] + sorted(df["Gestor"].dropna().unique()),
-            key="gestor_d"
-        )
 
-    with d4:
-        etapa_d = st.selectbox(
-            "Etapa",
-            ["Todas"] + sorted(df["Etapa"].dropna().unique()),
-            key="etapa_d"
-        )
 
-    with d5:
-        estrategia_d = st.selectbox(
-            "Estrategia",
-            ["Todas"] + sorted(df["Estrategia"].dropna().unique()),
-            key="estrategia_d"
-        )
+# =========================================================
+# 6. PESTAÑA — DETALLE
+# =========================================================
+if tab2.open:
+    with tab2:
 
-    with d6:
-        producto_d = st.selectbox(
-            "Producto",
-            ["Todos"] + sorted(df["Producto"].dropna().unique()),
-            key="producto_d"
-        )
+        st.title(" Detalle de Gestiones")
 
-    with d7:
-        tipo_d = st.selectbox(
-            "Tipo",
-            ["Todos"] + sorted(df["Robot"].dropna().unique()),
-            key="tipo_d"
-        )
+        # -------------------- FILTROS --------------------
+        st.markdown("###  Filtros")
+
+        d1, d2, d3, d4, d5, d6, d7 = st.columns(7)
 
-    # -------------------- APLICAR FILTROS --------------------
-    df_det = df.copy()
+        with d1:
+            fecha_d = st.selectbox(
+                "Fecha Gestión",
+                ["Todas"] + dominios.opciones("FechaGestion"),
+                format_func=formato_fecha,
+                key="fecha_d"
+            )
 
-    if fecha_d != "Todas":
-        df_det = df_det[df_det["FechaGestion"] == fecha_d]
+        with d2:
+            supervisor_d = st.selectbox(
+                "Supervisor",
+                ["Todas"] + dominios.opciones("Supervisor"),
+                key="supervisor_d"
+            )
 
-    if supervisor_d != "Todas":
-        df_det = df_det[df_det["Supervisor"] == supervisor_d]
+        with d3:
+            gestor_d = st.selectbox(
+                "Gestor",
+                ["Todas"] + dominios.opciones("Gestor", {"Supervisor": supervisor_d}),
+                key="gestor_d"
+            )
 
-    if gestor_d != "Todas":
-        df_det = df_det[df_det["Gestor"] == gestor_d]
+        with d4:
+            etapa_d = st.selectbox(
+                "Etapa",
+                ["Todas"] + dominios.opciones("Etapa"),
+                key="etapa_d"
+            )
 
-    if etapa_d != "Todas":
-        df_det = df_det[df_det["Etapa"] == etapa_d]
+        with d5:
+            estrategia_d = st.selectbox(
+                "Estrategia",
+                ["Todas"] + dominios.opciones("Estrategia"),
+                key="estrategia_d"
+            )
 
-    if estrategia_d != "Todas":
-        df_det = df_det[df_det["Estrategia"] == estrategia_d]
+        with d6:
+            producto_d = st.selectbox(
+                "Producto",
+                ["Todos"] + dominios.opciones("Producto"),
+                key="producto_d"
+            )
 
-    if producto_d != "Todos":
-        df_det = df_det[df_det["Producto"] == producto_d]
+        with d7:
+            tipo_d = st.selectbox(
+                "Tipo",
+                ["Todos"] + dominios.opciones("Robot"),
+                key="tipo_d"
+            )
 
-    if tipo_d != "Todos":
-        df_det = df_det[df_det["Robot"] == tipo_d]
+        # -------------------- APLICAR FILTROS --------------------
+        seleccion_d = {
+            "FechaGestion": fecha_d,
+            "Supervisor": supervisor_d,
+            "Gestor": gestor_d,
+            "Etapa": etapa_d,
+            "Estrategia": estrategia_d,
+            "Producto": producto_d,
+            "Robot": tipo_d,
+        }
+
+        # -------------------- SLIDER DE HORA --------------------
+        st.markdown("---")
+        st.markdown("###  Rango de hora")
+
+        acumulado_d = memo.obtener("por_hora", VERSION, lambda: cubo.por_hora(seleccion_d), seleccion_d)
+        h_min, h_max = acumulado_d.extremos()
+
+        hh1, hh2, hh3 = st.columns([1, 1, 4])
+
+        with hh1:
+            desde_h = st.number_input("Desde", min_value=h_min, max_value=h_max, value=h_min, key="desde_h_d")
+
+        with hh2:
+            hasta_h = st.number_input("Hasta", min_value=h_min, max_value=h_max, value=h_max, key="hasta_h_d")
+
+        with hh3:
+            rango_h = st.slider(
+                "Seleccione el rango horario",
+                min_value=h_min,
+                max_value=h_max,
+                value=(desde_h, hasta_h),
+                key="slider_h_d"
+            )
 
-    # -------------------- SLIDER DE HORA --------------------
-    st.markdown("---")
-    st.markdown("###  Rango de hora")
+        # Filtrar por hora (junto con los filtros, en una sola pasada por el índice);
+        # solo las posiciones: las filas se leen por columna o por página
+        with medir("detalle: filtro", entrada=df) as m:
+            idx_det = motor.indices(seleccion_d, hora=rango_h)
+            m.filas_salida = len(df) if idx_det is None else len(idx_det)
+
+        # KPI
+        st.markdown(f"### Gestiones filtradas: **{acumulado_d.totales(rango_h)['Gestiones']:,.0f}**")
+
+        # -------------------- GRÁFICOS --------------------
+        st.markdown("---")
+        g1, g2 = st.columns(2)
+
+        # -------- Gráfico 1: Respuestas más frecuentes --------
+        with g1:
+            st.markdown("#### Respuestas más frecuentes")
+
+            if "Respuesta" in df.columns:
+                respuestas = df["Respuesta"] if idx_det is None else df["Respuesta"].take(idx_det)
+                with medir("detalle: respuestas", entrada=respuestas) as m:
+                    resp = m.salida(respuestas.value_counts().loc[lambda s: s > 0].reset_index())
+                resp.columns = ["Respuesta", "Cantidad"]
+
+                fig_resp = px.bar(
+                    resp,
+                    y="Respuesta",
+                    x="Cantidad",
+                    orientation="h",
+                    text="Cantidad"
+                )
+                with medir("grafico: respuestas"):
+                    st.plotly_chart(fig_resp, use_container_width=True, height=400)
+            else:
+                st.info("No existe la columna 'Respuesta' en los datos.")
+
+        # -------- Gráfico 2: Gestiones por Tipo de Contacto --------
+        with g2:
+            st.markdown("#### Gestiones por Tipo de Contacto")
+
+            tc = cubo.rollup(seleccion_d, "TipoContacto", hora=rango_h)[["TipoContacto", "Gestiones"]]
+
+            fig_tc = px.bar(
+                tc,
+                y="TipoContacto",
+                x="Gestiones",
+                orientation="h",
+                text="Gestiones"
+            )
+            with medir("grafico: tipo contacto"):
+                st.plotly_chart(fig_tc, use_container_width=True, height=400)
 
-    try:
-        h_min = int(df_det["Hora"].min())
-        h_max = int(df_det["Hora"].max())
-    except:
-        h_min, h_max = 0, 23
+        # -------------------- TABLA DETALLE --------------------
+        st.markdown("---")
+        st.markdown("###  Registros detallados")
 
-    hh1, hh2, hh3 = st.columns([1, 1, 4])
+        columnas_detalle = [
+            "Gestor",
+            "Identificacion",
+            "Telefono",
+            "HoraGestion",
+            "Respuesta",
+            "TipoContacto",
+            "CodigoTipoContacto",
+        ]
 
-    with hh1:
-        desde_h = st.number_input("Desde", min_value=h_min, max_value=h_max, value=h_min, key="desde_h_d")
+        columnas_presentes = [c for c in columnas_detalle if c in df.columns]
 
-    with hh2:
-        hasta_h = st.number_input("Hasta", min_value=h_min, max_value=h_max, value=h_max, key="hasta_h_d")
+        # Solo se ordena y se envía la página visible
+        vista = load_vista(VERSION)
+        total_det = vista.total(idx_det)
 
-    with hh3:
-        rango_h = st.slider(
-            "Seleccione el rango horario",
-            min_value=h_min,
-            max_value=h_max,
-            value=(desde_h, hasta_h),
-            key="slider_h_d"
-        )
+        p1, p2, p3 = st.columns([1, 1, 4])
 
-    # Filtrar por hora
-    df_det = df_det[(df_det["Hora"] >= rango_h[0]) & (df_det["Hora"] <= rango_h[1])]
+        with p1:
+            tamano = st.selectbox("Filas por página", TAMANOS_PAGINA, key="tamano_pagina_d")
 
-    # KPI
-    st.markdown(f"### Gestiones filtradas: **{df_det['Gestiones'].sum():,.0f}**")
+        paginas = max(1, -(-total_det // tamano))
 
-    # -------------------- GRÁFICOS --------------------
-    st.markdown("---")
-    g1, g2 = st.columns(2)
+        with p2:
+            pagina = st.number_input("Página", min_value=1, max_value=paginas, value=1)
 
-    # -------- Gráfico 1: Respuestas más frecuentes --------
-    with g1:
-        st.markdown("#### Respuestas más frecuentes")
+        desde_fila = (pagina - 1) * tamano
+        with medir("detalle: pagina") as m:
+            df_final = m.salida(vista.pagina(df, idx_det, pagina - 1, tamano, columnas_presentes))
 
-        if "Respuesta" in df_det.columns:
-            resp = df_det["Respuesta"].value_counts().reset_index()
-            resp.columns = ["Respuesta", "Cantidad"]
+        with p3:
+            st.caption(f"Filas {min(desde_fila + 1, total_det):,}–{desde_fila + len(df_final):,} de {total_det:,}")
 
-            fig_resp = px.bar(
-                resp,
-                y="Respuesta",
-                x="Cantidad",
-                orientation="h",
-                text="Cantidad"
+            st.download_button(
+                "Descargar CSV",
+                data=partial(vista.exportar_csv, df, idx_det, columnas_presentes),
+                file_name="detalle_gestiones.csv",
+                mime="text/csv",
             )
-            st.plotly_chart(fig_resp, use_container_width=True, height=400)
-        else:
-            st.info("No existe la columna 'Respuesta' en los datos.")
-
-    # -------- Gráfico 2: Gestiones por Tipo de Contacto --------
-    with g2:
-        st.markdown("#### Gestiones por Tipo de Contacto")
-
-        tc = (
-            df_det.groupby("TipoContacto")["Gestiones"]
-            .sum()
-            .reset_index()
-        )
-        tc.columns = ["TipoContacto", "Gestiones"]
-
-        fig_tc = px.bar(
-            tc,
-            y="TipoContacto",
-            x="Gestiones",
-            orientation="h",
-            text="Gestiones"
-        )
-        st.plotly_chart(fig_tc, use_container_width=True, height=400)
 
-    # -------------------- TABLA DETALLE --------------------
-    st.markdown("---")
-    st.markdown("###  Registros detallados")
+        with medir("tabla: detalle", entrada=df_final):
+            st.dataframe(df_final, use_container_width=True, height=650)
 
-    columnas_detalle = [
-        "Gestor",
-        "Identificacion",
-        "Telefono",
-        "HoraGestion",
-        "Respuesta",
-        "TipoContacto",
-        "CodigoTipoContacto",
-    ]
 
-    columnas_presentes = [c for c in columnas_detalle if c in df_det.columns]
-
-    df_final = df_det[columnas_presentes].sort_values("HoraGestion")
+# =========================================================
+# 7. DIAGNÓSTICO DE RENDIMIENTO
+# =========================================================
+# Cada etapa queda también en diagnostico.LOG_PATH (JSON por línea), esté o no abierto
+diag.terminar()
+
+st.markdown("---")
+if st.toggle("Diagnóstico de rendimiento", key="diagnostico"):
+    medir_asignaciones(st.toggle(
+        "Medir memoria asignada",
+        key="diagnostico_memoria",
+        help="tracemalloc: hace más lentos los reruns de todas las sesiones mientras está activo",
+    ))
+
+    st.markdown("#### Etapas de este rerun")
+    st.dataframe(diag.tabla(), use_container_width=True)
+    st.caption(
+        f"Caché de agregados: {memo.aciertos:,} aciertos, {memo.fallos:,} cálculos · "
+        f"log: {LOG_PATH}"
+    )
 
-    st.dataframe(df_final, use_container_width=True, height=650)
+    st.markdown("#### Últimos registros (todas las sesiones)")
+    st.dataframe(leer_log(), use_container_width=True)
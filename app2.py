@@ -1,59 +1,102 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import csv
+import os
+import glob
+import uuid
+from functools import partial
+
+from almacen import read_partitions, list_partitions, file_key, DiskCache
+from ingesta import load_shards, list_shards
+from dimensiones import (
+    COLUMNAS_DIMENSION,
+    dim_paths,
+    load_dimensiones,
+    version_dimensiones,
+    enrich,
+    es_enriquecido,
+)
+from filtros import FilterEngine, Dominios
+from cubo import Cubo
+from distintos import MODOS, ERROR_HLL
+from agregados import CacheAgregados
+from detalle import VistaDetalle, TAMANOS_PAGINA
+from diagnostico import Diagnostico, LOG_PATH, activar, medir, medir_asignaciones, leer_log
+from medidas import calcular_campos
+from esquema import CATEGORIAS, FECHAS, dtypes_lectura, aplicar_esquema, formato_fecha, formato_hora
 
 st.set_page_config(page_title="Panel Productividad BS", layout="wide")
 
-# =========================================================
-# Función robusta para cargar y limpiar CSVs
-# =========================================================
-def load_csv(path):
-    try:
-        with open(path, "r", encoding="latin-1") as f:
-            dialect = csv.Sniffer().sniff(f.read(1024))
-            sep = dialect.delimiter
-    except:
-        sep = ";"
-
-    df = pd.read_csv(path, sep=sep, encoding="latin-1")
-
-    # limpiar BOM, espacios, caracteres invisibles
-    df.columns = (
-        df.columns
-        .str.replace("ï»¿", "", regex=False)
-        .str.replace("\ufeff", "", regex=False)
-        .str.strip()
-    )
-
-    return df
+# Tiempos, filas y memoria de cada etapa de este rerun (ver diagnostico.py)
+diag = activar(Diagnostico("app2", sesion=st.session_state.setdefault("sesion", uuid.uuid4().hex[:8])))
+
+# Archivos de gestiones partidos (Gestion_part1.csv, Gestion_part2.csv, ...)
+GESTION_PATRON = "Data/Gestion_part*.csv"
+
+# Almacén Parquet particionado por FechaGestion (si existe, reemplaza al CSV)
+PARQUET_DIR = "Data/gestiones"
+
+# Últimos N días a cargar desde el almacén (None = todos)
+DIAS_PANEL = None
+
+# Columnas que realmente usa el panel (proyección al leer Parquet)
+COLUMNAS_PANEL = [
+    "FechaGestion",
+    "Hora",
+    "HoraGestion",
+    "NumeroOperacion",
+    "CodigoTipoContacto",
+    "Respuesta",
+    "Identificacion",
+    "Telefono",
+    "Etapa",
+    "ProductoGestion",
+    "EsGestor",
+    "EsCompromiso",
+    "Estrategia",
+    "Gestor",
+    "Supervisor",
+    "Observacion",
+] + COLUMNAS_DIMENSION
+
+# Caché en disco del resultado de load_all; subir la versión si cambia
+# la forma en que se arma el DataFrame
+CACHE_VERSION = 4
+CACHE = DiskCache("app2")
+
+
+def fuentes():
+    """Archivos de los que depende load_all: gestiones + dimensiones."""
+    if os.path.isdir(PARQUET_DIR):
+        hechos = glob.glob(os.path.join(PARQUET_DIR, "*", "*.parquet"))
+    else:
+        hechos = list_shards(GESTION_PATRON)
+    return hechos + dim_paths()
+
+
+def load_gestiones_parquet():
+    fechas = list_partitions(PARQUET_DIR)
+    if DIAS_PANEL:
+        fechas = fechas[-DIAS_PANEL:]
+    return read_partitions(PARQUET_DIR, columns=COLUMNAS_PANEL, fechas=fechas, categorias=CATEGORIAS)
 
 
 # =========================================================
 # 1. Cargar archivos
 # =========================================================
-@st.cache_data
-def load_all():
+def armar_dataset():
+    """Lee las gestiones, las une con las dimensiones y agrega los campos calculados."""
 
-    # CARGAR LOS 5 ARCHIVOS DE GESTIONES
-    gestion_files = [
-        "Data/Gestion_part1.csv",
-        "Data/Gestion_part2.csv",
-        "Data/Gestion_part3.csv",
-        "Data/Gestion_part4.csv",
-        "Data/Gestion_part5.csv"
-    ]
+    if os.path.isdir(PARQUET_DIR):
+        fuente = PARQUET_DIR
+        with medir("carga: parquet") as m:
+            df = m.salida(load_gestiones_parquet())
+    else:
+        fuente = None
 
-    df_list = [load_csv(f) for f in gestion_files]
-
-    # UNIR TODO EN UN SOLO DATAFRAME
-    df = pd.concat(df_list, ignore_index=True)
-
-    # Cargar otras tablas
-    tipo_contacto = load_csv("Data/TipoContacto.csv")
-    producto = load_csv("Data/Producto.csv")
-    orden_etapa = load_csv("Data/Orden etapa.csv")
-    semana = load_csv("Data/Semana.csv")
+        # CARGAR TODOS LOS ARCHIVOS DE GESTIONES EN PARALELO Y UNIRLOS
+        with medir("carga: csv") as m:
+            df = m.salida(load_shards(GESTION_PATRON, dtype=dtypes_lectura(), usecols=COLUMNAS_PANEL, fechas=FECHAS))
 
     # ------------------------------
     # Renombrar columnas con BOM
@@ -67,480 +110,574 @@ def load_all():
     }
 
     df.rename(columns=rename_map, inplace=True)
-    tipo_contacto.rename(columns=rename_map, inplace=True)
-    producto.rename(columns=rename_map, inplace=True)
-    orden_etapa.rename(columns=rename_map, inplace=True)
-    semana.rename(columns=rename_map, inplace=True)
 
     # =====================================================
     # 2. Uniones como en Power BI
     # =====================================================
 
-    # Tipo de Contacto
-    df = df.merge(
-        tipo_contacto,
-        on="CodigoTipoContacto",
-        how="left"
-    )
-
-    # Producto
-    df = df.merge(
-        producto[["ProductoGestion", "Producto"]],
-        on="ProductoGestion",
-        how="left"
-    )
-
-    # Orden Etapa
-    df = df.merge(
-        orden_etapa,
-        on="Etapa",
-        how="left"
-    )
+    # Tipo de Contacto, Producto, Orden Etapa y Semana: el almacén Parquet
+    # ya viene pre-unido desde DatosGestion; los CSV se resuelven aquí
+    if fuente is None or not es_enriquecido(fuente, version_dimensiones()):
+        with medir("carga: dimensiones", entrada=df) as m:
+            m.salida(enrich(df, load_dimensiones()))
 
-    # Semana: renombrar para hacer merge
-    semana.rename(columns={"fechaGestion": "FechaGestion"}, inplace=True)
-
-    df = df.merge(
-        semana,
-        on="FechaGestion",
-        how="left"
-    )
+    # Tipos del esquema (categorías, int8, fechas)
+    with medir("carga: esquema", entrada=df) as m:
+        m.salida(aplicar_esquema(df))
 
     # =====================================================
-    # 3. Crear métricas del panel
+    # 3. Campos calculados (como DAX), los mismos que en app.py;
+    #    las medidas del panel son alias, no columnas
     # =====================================================
-    df["Gestiones"] = 1
-    df["CD"] = df["EsContactoDirecto"]
-    df["Contacto"] = df["EsContacto"]
-    df["ContactoDirecto"] = df["EsContactoDirecto"]
-    df["Compromisos"] = df["EsCompromiso"]
+    with medir("carga: campos calculados", entrada=df) as m:
+        m.salida(calcular_campos(df))
 
     return df
 
 
-df = load_all()
+# cache_resource: todas las sesiones comparten el mismo DataFrame (solo
+# lectura) en vez de recibir una copia en cada rerun como con cache_data.
+# El DataFrame es un mapeo del archivo de la caché en disco, así también
+# lo comparten los demás procesos de Streamlit; lo mismo el índice de
+# filtros, el cubo y el orden del detalle (ver compartido)
+@st.cache_resource(max_entries=2)
+def load_all(version):
 
+    # Caché en disco: reinicios y redeploys no vuelven a parsear ni unir
+    if not CACHE.existe(version):
+        # Un solo proceso arma el dataset; los demás esperan su archivo
+        with CACHE.bloqueo(version):
+            if not CACHE.existe(version):
+                df = armar_dataset()
+                with medir("carga: escribir cache en disco", entrada=df):
+                    CACHE.put(version, df)
+                del df  # la copia privada se libera; se usa la mapeada
 
-# =========================================================
-# 4. INTERFAZ PRINCIPAL
-# =========================================================
-tab1, tab2, tab3 = st.tabs([" Gestiones", " Detalle", " Comparativo"])
+    with medir("carga: cache en disco") as m:
+        return m.salida(CACHE.get(version))
 
 
-# =========================================================
-# 5. PESTAÑA — GESTIONES
-# =========================================================
-with tab1:
+# La versión cambia sola cuando DatosGestion reescribe algún archivo
+VERSION = file_key(fuentes(), extra=f"{CACHE_VERSION}-{DIAS_PANEL}")
+df = load_all(VERSION)
 
-    st.title(" Panel de Gestiones — Productividad BS")
 
-    # -------------------- FILTROS --------------------
-    st.markdown("###  Filtros")
+def compartido(version, parte, armar):
+    """
+    Objeto armado sobre el dataset (índice, cubo, orden del detalle) desde
+    la caché en disco: sus arreglos quedan mapeados y los comparten los
+    procesos, como el DataFrame. Un solo proceso lo arma y lo escribe.
+    """
+    if not CACHE.existe_objeto(version, parte):
+        with CACHE.bloqueo(f"{version}.{parte}"):
+            if not CACHE.existe_objeto(version, parte):
+                CACHE.put_objeto(version, parte, armar())
+    return CACHE.get_objeto(version, parte)
 
-    c1, c2, c3, c4, c5, c6 = st.columns(6)
 
-    with c1:
-        fecha_sel = st.selectbox("Fecha Gestión", ["Todas"] + sorted(df["FechaGestion"].dropna().unique()))
+@st.cache_resource(max_entries=2)
+def load_motor(version):
+    with medir("construir: indice de filtros", entrada=load_all(version)):
+        return compartido(version, "motor", lambda: FilterEngine(load_all(version)))
 
-    with c2:
-        supervisor_sel = st.selectbox("Supervisor", ["Todas"] + sorted(df["Supervisor"].dropna().unique()))
 
-    with c3:
-        gestor_sel = st.selectbox("Gestor", ["Todas"] + sorted(df["Gestor"].dropna().unique()))
+motor = load_motor(VERSION)
 
-    with c4:
-        etapa_sel = st.selectbox("Etapa", ["Todas"] + sorted(df["Etapa"].dropna().unique()))
 
-    with c5:
-        estrategia_sel = st.selectbox("Estrategia", ["Todas"] + sorted(df["Estrategia"].dropna().unique()))
+@st.cache_resource(max_entries=2)
+def load_cubo(version):
+    with medir("construir: cubo", entrada=load_all(version)):
+        # Los subcubos (filtros fuera del grano) son de cada proceso
+        cubo = compartido(version, "cubo", lambda: Cubo(load_all(version)))
+        return cubo.enlazar(load_all(version), motor_filas=load_motor(version))
 
-    with c6:
-        producto_sel = st.selectbox("Producto", ["Todos"] + sorted(df["Producto"].dropna().unique()))
 
-    df_f = df.copy()
+cubo = load_cubo(VERSION)
 
-    if fecha_sel != "Todas":
-        df_f = df_f[df_f["FechaGestion"] == fecha_sel]
 
-    if supervisor_sel != "Todas":
-        df_f = df_f[df_f["Supervisor"] == supervisor_sel]
+# Opciones de los filtros, una vez por versión y compartidas por las pestañas
+@st.cache_resource(max_entries=2)
+def load_dominios(version):
+    with medir("construir: opciones de filtros", entrada=load_cubo(version).celdas):
+        return Dominios(load_cubo(version).celdas, filas=load_all(version))
 
-    if gestor_sel != "Todas":
-        df_f = df_f[df_f["Gestor"] == gestor_sel]
 
-    if etapa_sel != "Todas":
-        df_f = df_f[df_f["Etapa"] == etapa_sel]
+dominios = load_dominios(VERSION)
 
-    if estrategia_sel != "Todas":
-        df_f = df_f[df_f["Estrategia"] == estrategia_sel]
 
-    if producto_sel != "Todos":
-        df_f = df_f[df_f["Producto"] == producto_sel]
+# Agregados por widget, compartidos entre sesiones (clave: filtros + VERSION)
+@st.cache_resource
+def load_memo():
+    return CacheAgregados()
 
 
-    # -------------------- KPIs --------------------
-    st.markdown("---")
-    st.markdown("###  Métricas")
+memo = load_memo()
 
-    k1, k2, k3, k4, k5 = st.columns(5)
 
-    with k1:
-        st.metric("Gestiones", df_f["Gestiones"].sum())
+# Orden de la tabla de detalle (se arma al abrir la pestaña Detalle)
+@st.cache_resource(max_entries=2)
+def load_vista(version):
+    with medir("construir: orden del detalle", entrada=load_all(version)):
+        return compartido(version, "detalle", lambda: VistaDetalle(load_all(version)))
 
-    with k2:
-        st.metric("Operaciones Únicas", df_f["NumeroOperacion"].nunique())
 
-    with k3:
-        st.metric("Contacto", df_f["Contacto"].sum())
-
-    with k4:
-        st.metric("Directo", df_f["ContactoDirecto"].sum())
-
-    with k5:
-        st.metric("Compromisos", df_f["Compromisos"].sum())
-
-
-    # -------------------- LAYOUT PRINCIPAL --------------------
-    st.markdown("---")
-    colA, colB, colC = st.columns([1.2, 1.3, 1])
-
-    # ----------- 1) Tabla primera gestión -----------
-    with colA:
-        st.markdown("####  Hora de la primera gestión")
-
-        df_hora = (
-            df_f.groupby("Gestor")["HoraGestion"]
-            .min()
-            .reset_index()
-            .sort_values("HoraGestion")
-        )
+# =========================================================
+# 4. INTERFAZ PRINCIPAL
+# =========================================================
+# Solo se ejecuta la pestaña abierta: cambiar de pestaña re-ejecuta el script
+tab1, tab2, tab3 = st.tabs(
+    [" Gestiones", " Detalle", " Comparativo"], key="pestana", on_change="rerun"
+)
 
-        st.dataframe(df_hora, use_container_width=True, height=360)
 
+# =========================================================
+# 5. PESTAÑA — GESTIONES
+# =========================================================
+if tab1.open:
+    with tab1:
 
-    # ----------- 2) Slider + funnel -----------
-    with colB:
-        st.markdown("####  Rango de hora")
+        st.title(" Panel de Gestiones — Productividad BS")
 
-        h_min = int(df_f["Hora"].min())
-        h_max = int(df_f["Hora"].max())
+        # -------------------- FILTROS --------------------
+        st.markdown("###  Filtros")
 
-        h1, h2 = st.columns(2)
+        c1, c2, c3, c4, c5, c6 = st.columns(6)
 
-        with h1:
-            desde = st.slider("Desde", h_min, h_max, h_min)
+        with c1:
+            fecha_sel = st.selectbox("Fecha Gestión", ["Todas"] + dominios.opciones("FechaGestion"), format_func=formato_fecha)
 
-        with h2:
-            hasta = st.slider("Hasta", h_min, h_max, h_max)
-
-        df_rango = df_f[(df_f["Hora"] >= desde) & (df_f["Hora"] <= hasta)]
-
-        st.markdown(f"**Gestiones en rango:** {df_rango['Gestiones'].sum():,.0f}")
-
-        funnel = pd.DataFrame({
-            "Etapa": ["Operaciones", "Contacto", "Directo", "Compromisos"],
-            "Valor": [
-                df_rango["NumeroOperacion"].nunique(),
-                df_rango["Contacto"].sum(),
-                df_rango["ContactoDirecto"].sum(),
-                df_rango["Compromisos"].sum(),
-            ]
-        })
-
-        fig = px.bar(
-            funnel,
-            x="Valor",
-            y="Etapa",
-            orientation="h",
-            text="Valor"
-        )
-        st.plotly_chart(fig, use_container_width=True, height=360)
+        with c2:
+            supervisor_sel = st.selectbox("Supervisor", ["Todas"] + dominios.opciones("Supervisor"))
 
+        with c3:
+            gestor_sel = st.selectbox("Gestor", ["Todas"] + dominios.opciones("Gestor", {"Supervisor": supervisor_sel}))
 
-    # ----------- 3) Donut Tipo Contacto -----------
-    with colC:
-        st.markdown("#### Tipo de contacto")
+        with c4:
+            etapa_sel = st.selectbox("Etapa", ["Todas"] + dominios.opciones("Etapa"))
 
-        tc = df_f["TipoContacto"].value_counts().reset_index()
-        tc.columns = ["Tipo", "Cantidad"]
+        with c5:
+            estrategia_sel = st.selectbox("Estrategia", ["Todas"] + dominios.opciones("Estrategia"))
 
-        fig_pie = px.pie(tc, values="Cantidad", names="Tipo", hole=0.55)
-        st.plotly_chart(fig_pie, use_container_width=True, height=360)
+        with c6:
+            producto_sel = st.selectbox("Producto", ["Todos"] + dominios.opciones("Producto"))
 
+        seleccion = {
+            "FechaGestion": fecha_sel,
+            "Supervisor": supervisor_sel,
+            "Gestor": gestor_sel,
+            "Etapa": etapa_sel,
+            "Estrategia": estrategia_sel,
+            "Producto": producto_sel,
+        }
 
-    # -------------------- TABLAS INFERIORES --------------------
-    st.markdown("---")
-    b1, b2 = st.columns([1.2, 1.8])
+        # KPIs, embudo, donut y tablas salen del cubo: la pestaña no toca filas
+        totales = memo.obtener("totales", VERSION, lambda: cubo.totales(seleccion), seleccion)
 
-    # ----------- Tabla resumen gestor -----------
-    with b1:
-        st.markdown("####  Resumen por Gestor")
+        # -------------------- KPIs --------------------
+        st.markdown("---")
+        st.markdown("###  Métricas")
 
-        tabla = (
-            df_f.groupby("Gestor")
-            .agg({
-                "Gestiones": "sum",
-                "CD": "sum",
-                "Compromisos": "sum",
-                "ContactoDirecto": "sum",
-            })
-            .reset_index()
+        modo_ops = st.radio(
+            "Conteo de operaciones únicas",
+            MODOS,
+            horizontal=True,
+            help=f"Aproximado usa HyperLogLog: error típico ±{ERROR_HLL:.1%}, más rápido al filtrar muchos datos.",
+        )
+        ops_unicas = memo.obtener(
+            "operaciones_unicas", VERSION,
+            lambda: cubo.operaciones_unicas(seleccion, modo=modo_ops),
+            seleccion, modo=modo_ops,
         )
 
-        tabla["% Directo"] = (tabla["ContactoDirecto"] / tabla["Gestiones"] * 100).round(1)
-
-        st.dataframe(tabla, use_container_width=True, height=320)
+        k1, k2, k3, k4, k5 = st.columns(5)
 
+        with k1:
+            st.metric("Gestiones", totales["Gestiones"])
 
-    # ----------- Tabla por hora -----------
-    with b2:
-        st.markdown("#### Gestiones por Hora")
+        with k2:
+            st.metric("Operaciones Únicas", ops_unicas)
 
-        tabla_horas = pd.pivot_table(
-            df_f,
-            index="Gestor",
-            columns="Hora",
-            values="Gestiones",
-            aggfunc="sum",
-            fill_value=0
-        )
+        with k3:
+            st.metric("Contacto", totales["Contacto"])
 
-        st.dataframe(tabla_horas, use_container_width=True, height=320)
+        with k4:
+            st.metric("Directo", totales["ContactoDirecto"])
 
+        with k5:
+            st.metric("Compromisos", totales["Compromisos"])
 
-# =========================================================
-# Placeholders de las otras pestañas
-# =========================================================
-# =========================================================
-# 6. PESTAÑA — DETALLE
-# =========================================================
-with tab2:
 
-    st.title(" Detalle de Gestiones")
+        # -------------------- LAYOUT PRINCIPAL --------------------
+        st.markdown("---")
+        colA, colB, colC = st.columns([1.2, 1.3, 1])
 
-    # -------------------- FILTROS --------------------
-    st.markdown("###  Filtros")
+        # ----------- 1) Tabla primera gestión -----------
+        with colA:
+            st.markdown("####  Hora de la primera gestión")
 
-    d1, d2, d3, d4, d5, d6 = st.columns(6)
+            df_hora = memo.obtener(
+                "primera_gestion", VERSION,
+                lambda: (
+                    cubo.rollup(seleccion, "Gestor")[["Gestor", "PrimeraHora"]]
+                    .rename(columns={"PrimeraHora": "HoraGestion"})
+                    .sort_values("HoraGestion")
+                    .assign(HoraGestion=lambda t: formato_hora(t["HoraGestion"]))
+                ),
+                seleccion,
+            )
 
-    with d1:
-        fecha_d = st.selectbox("Fecha Gestión — Detalle", ["Todas"] + sorted(df["FechaGestion"].dropna().unique()))
+            with medir("tabla: primera gestion", entrada=df_hora):
+                st.dataframe(df_hora, use_container_width=True, height=360)
 
-    with d2:
-        supervisor_d = st.selectbox("Supervisor — Detalle", ["Todas"] + sorted(df["Supervisor"].dropna().unique()))
 
-    with d3:
-        gestor_d = st.selectbox("Gestor — Detalle", ["Todas"] + sorted(df["Gestor"].dropna().unique()))
+        # ----------- 2) Slider + funnel -----------
+        with colB:
+            st.markdown("####  Rango de hora")
 
-    with d4:
-        etapa_d = st.selectbox("Etapa — Detalle", ["Todas"] + sorted(df["Etapa"].dropna().unique()))
+            # Medidas acumuladas por hora: mover los sliders resta dos sumas
+            acumulado = memo.obtener("por_hora", VERSION, lambda: cubo.por_hora(seleccion), seleccion)
+            h_min, h_max = acumulado.extremos()
 
-    with d5:
-        estrategia_d = st.selectbox("Estrategia — Detalle", ["Todas"] + sorted(df["Estrategia"].dropna().unique()))
+            h1, h2 = st.columns(2)
 
-    with d6:
-        producto_d = st.selectbox("Producto — Detalle", ["Todos"] + sorted(df["Producto"].dropna().unique()))
+            with h1:
+                desde = st.slider("Desde", h_min, h_max, h_min)
 
-    # Aplicar filtros
-    df_det = df.copy()
+            with h2:
+                hasta = st.slider("Hasta", h_min, h_max, h_max)
 
-    if fecha_d != "Todas":
-        df_det = df_det[df_det["FechaGestion"] == fecha_d]
+            def _embudo():
+                rango = acumulado.totales((desde, hasta))
+                funnel = pd.DataFrame({
+                    "Etapa": ["Operaciones", "Contacto", "Directo", "Compromisos"],
+                    "Valor": [
+                        cubo.operaciones_unicas(seleccion, hora=(desde, hasta), modo=modo_ops),
+                        rango["Contacto"],
+                        rango["ContactoDirecto"],
+                        rango["Compromisos"],
+                    ]
+                })
+                return rango, funnel
 
-    if supervisor_d != "Todas":
-        df_det = df_det[df_det["Supervisor"] == supervisor_d]
+            rango, funnel = memo.obtener(
+                "embudo", VERSION, _embudo, seleccion, hora=(desde, hasta), modo=modo_ops
+            )
 
-    if gestor_d != "Todas":
-        df_det = df_det[df_det["Gestor"] == gestor_d]
+            st.markdown(f"**Gestiones en rango:** {rango['Gestiones']:,.0f}")
 
-    if etapa_d != "Todas":
-        df_det = df_det[df_det["Etapa"] == etapa_d]
+            fig = px.bar(
+                funnel,
+                x="Valor",
+                y="Etapa",
+                orientation="h",
+                text="Valor"
+            )
+            with medir("grafico: embudo"):
+                st.plotly_chart(fig, use_container_width=True, height=360)
 
-    if estrategia_d != "Todas":
-        df_det = df_det[df_det["Estrategia"] == estrategia_d]
 
-    if producto_d != "Todos":
-        df_det = df_det[df_det["Producto"] == producto_d]
+        # ----------- 3) Donut Tipo Contacto -----------
+        with colC:
+            st.markdown("#### Tipo de contacto")
 
-    # -------------------- GRAFICOS --------------------
-    st.markdown("---")
-    g1, g2 = st.columns(2)
+            tc = memo.obtener(
+                "donut", VERSION,
+                lambda: (
+                    cubo.rollup(seleccion, "TipoContacto")[["TipoContacto", "Gestiones"]]
+                    .sort_values("Gestiones", ascending=False)
+                    .set_axis(["Tipo", "Cantidad"], axis=1)
+                ),
+                seleccion,
+            )
 
-    # ----------- Gráfico 1: Respuestas -----------
-    with g1:
-        st.markdown("#### Respuestas más frecuentes")
-        resp = df_det["Respuesta"].value_counts().reset_index()
-        resp.columns = ["Respuesta", "Cantidad"]
+            fig_pie = px.pie(tc, values="Cantidad", names="Tipo", hole=0.55)
+            with medir("grafico: donut tipo contacto"):
+                st.plotly_chart(fig_pie, use_container_width=True, height=360)
 
-        fig_resp = px.bar(
-            resp,
-            y="Respuesta",
-            x="Cantidad",
-            orientation="h",
-            text="Cantidad"
-        )
-        st.plotly_chart(fig_resp, use_container_width=True, height=400)
 
-    # ----------- Gráfico 2: Tipo de Contacto -----------
-    with g2:
-        st.markdown("#### Tipo de Contacto")
-        tc = df_det["TipoContacto"].value_counts().reset_index()
-        tc.columns = ["TipoContacto", "Cantidad"]
+        # -------------------- TABLAS INFERIORES --------------------
+        st.markdown("---")
+        b1, b2 = st.columns([1.2, 1.8])
 
-        fig_tc = px.bar(
-            tc,
-            y="TipoContacto",
-            x="Cantidad",
-            orientation="h",
-            text="Cantidad"
-        )
-        st.plotly_chart(fig_tc, use_container_width=True, height=400)
+        # ----------- Tabla resumen gestor -----------
+        with b1:
+            st.markdown("####  Resumen por Gestor")
 
-    # -------------------- TABLA DETALLE --------------------
-    st.markdown("---")
-    st.markdown("### 📋 Registros detallados")
+            def _resumen():
+                tabla = cubo.rollup(seleccion, "Gestor")
+                tabla["CD"] = tabla["ContactoDirecto"]
+                tabla = tabla[["Gestor", "Gestiones", "CD", "Compromisos", "ContactoDirecto"]]
+
+                tabla["% Directo"] = (tabla["ContactoDirecto"] / tabla["Gestiones"] * 100).round(1)
+                return tabla
 
-    columnas_detalle = [
-        "Gestor",
-        "Identificacion",
-        "Telefono",
-        "HoraGestion",
-        "Respuesta",
-        "TipoContacto",
-        "Observacion"
-    ]
+            tabla = memo.obtener("resumen_gestor", VERSION, _resumen, seleccion)
+
+            with medir("tabla: resumen gestor", entrada=tabla):
+                st.dataframe(tabla, use_container_width=True, height=320)
 
-    columnas_presentes = [c for c in columnas_detalle if c in df_det.columns]
 
-    df_final = df_det[columnas_presentes].sort_values("HoraGestion")
+        # ----------- Tabla por hora -----------
+        with b2:
+            st.markdown("#### Gestiones por Hora")
 
-    st.dataframe(df_final, use_container_width=True, height=650)
+            tabla_horas = memo.obtener(
+                "pivot_hora", VERSION,
+                lambda: cubo.pivot(seleccion, index="Gestor", columns="Hora"),
+                seleccion,
+            )
 
+            with medir("tabla: pivote hora", entrada=tabla_horas):
+                st.dataframe(tabla_horas, use_container_width=True, height=320)
 
 
 # =========================================================
-# 7. PESTAÑA — COMPARATIVO
+# Placeholders de las otras pestañas
 # =========================================================
-with tab3:
-
-    st.title(" Comparativo de Productividad")
-
-    # -------------------- FILTROS --------------------
-    st.markdown("### Filtros")
-
-    c1, c2, c3, c4, c5, c6 = st.columns(6)
-
-    with c1:
-        fecha_c = st.selectbox("Fecha Gestión — Comp.", ["Todas"] + sorted(df["FechaGestion"].dropna().unique()))
+# =========================================================
+# 6. PESTAÑA — DETALLE
+# =========================================================
+if tab2.open:
+    with tab2:
+
+        st.title(" Detalle de Gestiones")
+
+        # -------------------- FILTROS --------------------
+        st.markdown("###  Filtros")
+
+        d1, d2, d3, d4, d5, d6 = st.columns(6)
+
+        with d1:
+            fecha_d = st.selectbox("Fecha Gestión — Detalle", ["Todas"] + dominios.opciones("FechaGestion"), format_func=formato_fecha)
+
+        with d2:
+            supervisor_d = st.selectbox("Supervisor — Detalle", ["Todas"] + dominios.opciones("Supervisor"))
+
+        with d3:
+            gestor_d = st.selectbox("Gestor — Detalle", ["Todas"] + dominios.opciones("Gestor", {"Supervisor": supervisor_d}))
+
+        with d4:
+            etapa_d = st.selectbox("Etapa — Detalle", ["Todas"] + dominios.opciones("Etapa"))
+
+        with d5:
+            estrategia_d = st.selectbox("Estrategia — Detalle", ["Todas"] + dominios.opciones("Estrategia"))
+
+        with d6:
+            producto_d = st.selectbox("Producto — Detalle", ["Todos"] + dominios.opciones("Producto"))
+
+        # Aplicar filtros
+        seleccion_d = {
+            "FechaGestion": fecha_d,
+            "Supervisor": supervisor_d,
+            "Gestor": gestor_d,
+            "Etapa": etapa_d,
+            "Estrategia": estrategia_d,
+            "Producto": producto_d,
+        }
+        with medir("detalle: filtro", entrada=df) as m:
+            idx_det = motor.indices(seleccion_d)
+            m.filas_salida = len(df) if idx_det is None else len(idx_det)
+
+        # -------------------- GRAFICOS --------------------
+        st.markdown("---")
+        g1, g2 = st.columns(2)
+
+        # ----------- Gráfico 1: Respuestas -----------
+        with g1:
+            st.markdown("#### Respuestas más frecuentes")
+            respuestas = df["Respuesta"] if idx_det is None else df["Respuesta"].take(idx_det)
+            with medir("detalle: respuestas", entrada=respuestas) as m:
+                resp = m.salida(respuestas.value_counts().loc[lambda s: s > 0].reset_index())
+            resp.columns = ["Respuesta", "Cantidad"]
+
+            fig_resp = px.bar(
+                resp,
+                y="Respuesta",
+                x="Cantidad",
+                orientation="h",
+                text="Cantidad"
+            )
+            with medir("grafico: respuestas"):
+                st.plotly_chart(fig_resp, use_container_width=True, height=400)
+
+        # ----------- Gráfico 2: Tipo de Contacto -----------
+        with g2:
+            st.markdown("#### Tipo de Contacto")
+            tc = (
+                cubo.rollup(seleccion_d, "TipoContacto")[["TipoContacto", "Gestiones"]]
+                .sort_values("Gestiones", ascending=False)
+            )
+            tc.columns = ["TipoContacto", "Cantidad"]
+
+            fig_tc = px.bar(
+                tc,
+                y="TipoContacto",
+                x="Cantidad",
+                orientation="h",
+                text="Cantidad"
+            )
+            with medir("grafico: tipo contacto"):
+                st.plotly_chart(fig_tc, use_container_width=True, height=400)
+
+        # -------------------- TABLA DETALLE --------------------
+        st.markdown("---")
+        st.markdown("### 📋 Registros detallados")
+
+        columnas_detalle = [
+            "Gestor",
+            "Identificacion",
+            "Telefono",
+            "HoraGestion",
+            "Respuesta",
+            "TipoContacto",
+            "Observacion"
+        ]
+
+        columnas_presentes = [c for c in columnas_detalle if c in df.columns]
+
+        # Solo se ordena y se envía la página visible
+        vista = load_vista(VERSION)
+        total_det = vista.total(idx_det)
+
+        p1, p2, p3 = st.columns([1, 1, 4])
+
+        with p1:
+            tamano = st.selectbox("Filas por página", TAMANOS_PAGINA, key="tamano_pagina_d")
+
+        paginas = max(1, -(-total_det // tamano))
+
+        with p2:
+            pagina = st.number_input("Página", min_value=1, max_value=paginas, value=1)
+
+        desde_fila = (pagina - 1) * tamano
+        with medir("detalle: pagina") as m:
+            df_final = m.salida(vista.pagina(df, idx_det, pagina - 1, tamano, columnas_presentes))
+
+        with p3:
+            st.caption(f"Filas {min(desde_fila + 1, total_det):,}–{desde_fila + len(df_final):,} de {total_det:,}")
+
+            st.download_button(
+                "Descargar CSV",
+                data=partial(vista.exportar_csv, df, idx_det, columnas_presentes),
+                file_name="detalle_gestiones.csv",
+                mime="text/csv",
+            )
+
+        with medir("tabla: detalle", entrada=df_final):
+            st.dataframe(df_final, use_container_width=True, height=650)
 
-    with c2:
-        supervisor_c = st.selectbox("Supervisor — Comp.", ["Todas"] + sorted(df["Supervisor"].dropna().unique()))
 
-    with c3:
-        gestor_c = st.selectbox("Gestor — Comp.", ["Todas"] + sorted(df["Gestor"].dropna().unique()))
 
-    with c4:
-        etapa_c = st.selectbox("Etapa — Comp.", ["Todas"] + sorted(df["Etapa"].dropna().unique()))
+# =========================================================
+# 7. PESTAÑA — COMPARATIVO
+# =========================================================
+if tab3.open:
+    with tab3:
 
-    with c5:
-        estrategia_c = st.selectbox("Estrategia — Comp.", ["Todas"] + sorted(df["Estrategia"].dropna().unique()))
+        st.title(" Comparativo de Productividad")
 
-    with c6:
-        producto_c = st.selectbox("Producto — Comp.", ["Todos"] + sorted(df["Producto"].dropna().unique()))
+        # -------------------- FILTROS --------------------
+        st.markdown("### Filtros")
 
+        c1, c2, c3, c4, c5, c6 = st.columns(6)
 
-    # Filtros aplicados
-    df_c = df.copy()
+        with c1:
+            fecha_c = st.selectbox("Fecha Gestión — Comp.", ["Todas"] + dominios.opciones("FechaGestion"), format_func=formato_fecha)
 
-    if fecha_c != "Todas":
-        df_c = df_c[df_c["FechaGestion"] == fecha_c]
+        with c2:
+            supervisor_c = st.selectbox("Supervisor — Comp.", ["Todas"] + dominios.opciones("Supervisor"))
 
-    if supervisor_c != "Todas":
-        df_c = df_c[df_c["Supervisor"] == supervisor_c]
+        with c3:
+            gestor_c = st.selectbox("Gestor — Comp.", ["Todas"] + dominios.opciones("Gestor", {"Supervisor": supervisor_c}))
 
-    if gestor_c != "Todas":
-        df_c = df_c[df_c["Gestor"] == gestor_c]
+        with c4:
+            etapa_c = st.selectbox("Etapa — Comp.", ["Todas"] + dominios.opciones("Etapa"))
 
-    if etapa_c != "Todas":
-        df_c = df_c[df_c["Etapa"] == etapa_c]
+        with c5:
+            estrategia_c = st.selectbox("Estrategia — Comp.", ["Todas"] + dominios.opciones("Estrategia"))
 
-    if estrategia_c != "Todas":
-        df_c = df_c[df_c["Estrategia"] == estrategia_c]
+        with c6:
+            producto_c = st.selectbox("Producto — Comp.", ["Todos"] + dominios.opciones("Producto"))
 
-    if producto_c != "Todos":
-        df_c = df_c[df_c["Producto"] == producto_c]
 
+        # Filtros aplicados
+        seleccion_c = {
+            "FechaGestion": fecha_c,
+            "Supervisor": supervisor_c,
+            "Gestor": gestor_c,
+            "Etapa": etapa_c,
+            "Estrategia": estrategia_c,
+            "Producto": producto_c,
+        }
 
-    # -------------------- SLIDER DE HORA --------------------
-    st.markdown("---")
-    st.subheader("Rango de Hora")
+        # -------------------- SLIDER DE HORA --------------------
+        st.markdown("---")
+        st.subheader("Rango de Hora")
 
-    h_min_c = int(df_c["Hora"].min())
-    h_max_c = int(df_c["Hora"].max())
+        h_min_c, h_max_c = memo.obtener(
+            "por_hora", VERSION, lambda: cubo.por_hora(seleccion_c), seleccion_c
+        ).extremos()
 
-    h1, h2 = st.columns(2)
+        h1, h2 = st.columns(2)
 
-    with h1:
-        desde_c = st.slider("Desde", h_min_c, h_max_c, h_min_c, key="hmin3")
+        with h1:
+            desde_c = st.slider("Desde", h_min_c, h_max_c, h_min_c, key="hmin3")
 
-    with h2:
-        hasta_c = st.slider("Hasta", h_min_c, h_max_c, h_max_c, key="hmax3")
+        with h2:
+            hasta_c = st.slider("Hasta", h_min_c, h_max_c, h_max_c, key="hmax3")
 
-    df_c_rango = df_c[(df_c["Hora"] >= desde_c) & (df_c["Hora"] <= hasta_c)]
 
+        # -------------------- GRÁFICO COMPARATIVO --------------------
+        st.markdown("---")
+        st.subheader("Comparativo por Tipo de Contacto y Día")
 
-    # -------------------- GRÁFICO COMPARATIVO --------------------
-    st.markdown("---")
-    st.subheader("Comparativo por Tipo de Contacto y Día")
+        # Tabla y gráfico salen de una sola pasada sobre el cubo
+        tabla_pivot, comp = memo.obtener(
+            "comparativo", VERSION, lambda: cubo.comparativo(seleccion_c, hora=(desde_c, hasta_c)),
+            seleccion_c, hora=(desde_c, hasta_c)
+        )
 
-    comp = (
-        df_c_rango.groupby(["TipoContacto", "DiaNombre"])
-        .agg({"Gestiones": "sum"})
-        .reset_index()
-    )
+        fig_comp = px.bar(
+            comp,
+            x="Gestiones",
+            y="TipoContacto",
+            color="DiaNombre",
+            barmode="group",
+            text="Gestiones"
+        )
 
-    fig_comp = px.bar(
-        comp,
-        x="Gestiones",
-        y="TipoContacto",
-        color="DiaNombre",
-        barmode="group",
-        text="Gestiones"
-    )
+        with medir("grafico: comparativo"):
+            st.plotly_chart(fig_comp, use_container_width=True, height=420)
 
-    st.plotly_chart(fig_comp, use_container_width=True, height=420)
 
+        # -------------------- TABLA COMPARATIVA --------------------
+        st.markdown("---")
+        st.subheader("Tabla Comparativa por Gestor y Día")
 
-    # -------------------- TABLA COMPARATIVA --------------------
-    st.markdown("---")
-    st.subheader("Tabla Comparativa por Gestor y Día")
+        with medir("tabla: comparativo", entrada=tabla_pivot):
+            st.dataframe(tabla_pivot, use_container_width=True, height=650)
 
-    # columnas calculadas por día
-    tabla = (
-        df_c_rango.groupby(["Gestor", "DiaNombre"])
-        .agg({
-            "Gestiones": "sum",
-            "ContactoDirecto": "sum",
-            "Compromisos": "sum",
-            "HoraGestion": "min"
-        })
-        .reset_index()
-    )
 
-    # Pivot para crear columnas como en Power BI
-    tabla_pivot = tabla.pivot_table(
-        index="Gestor",
-        columns="DiaNombre",
-        values=["Gestiones", "ContactoDirecto", "Compromisos", "HoraGestion"],
-        aggfunc="first"
+# =========================================================
+# 8. DIAGNÓSTICO DE RENDIMIENTO
+# =========================================================
+# Cada etapa queda también en diagnostico.LOG_PATH (JSON por línea), esté o no abierto
+diag.terminar()
+
+st.markdown("---")
+if st.toggle("Diagnóstico de rendimiento", key="diagnostico"):
+    medir_asignaciones(st.toggle(
+        "Medir memoria asignada",
+        key="diagnostico_memoria",
+        help="tracemalloc: hace más lentos los reruns de todas las sesiones mientras está activo",
+    ))
+
+    st.markdown("#### Etapas de este rerun")
+    st.dataframe(diag.tabla(), use_container_width=True)
+    st.caption(
+        f"Caché de agregados: {memo.aciertos:,} aciertos, {memo.fallos:,} cálculos · "
+        f"log: {LOG_PATH}"
     )
 
-    tabla_pivot.columns = [f"{col2} {col1}" for col1, col2 in tabla_pivot.columns]
-
-    tabla_pivot = tabla_pivot.reset_index()
-
-    st.dataframe(tabla_pivot, use_container_width=True, height=650)
-
-
-
-
+    st.markdown("#### Últimos registros (todas las sesiones)")
+    st.dataframe(leer_log(), use_container_width=True)
@@ -0,0 +1,7 @@
+"""
+Benchmarks del panel.
+
+    bench_ingesta  lectura de CSV: camino anterior contra ingesta.load_csv
+    generador      gestiones sintéticas (100 mil a 50 millones de filas)
+    bench_panel    carga, filtros, agregados y detalle; resultados en JSON
+"""
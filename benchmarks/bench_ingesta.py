@@ -0,0 +1,155 @@
+"""
+Benchmark de lectura de CSV: camino anterior (csv.Sniffer + read_csv
+latin-1 + astype) contra ingesta.load_csv (pyarrow, formato en sidecar).
+
+    python -m benchmarks.bench_ingesta --filas 5000000
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from ingesta import load_csv, SUFIJO_FORMATO
+from esquema import dtypes_lectura, aplicar_esquema, FECHAS
+
+COLUMNAS_PANEL = [
+    "FechaGestion", "Hora", "HoraGestion", "NumeroOperacion", "CodigoTipoContacto",
+    "Respuesta", "Identificacion", "Telefono", "Etapa", "ProductoGestion",
+    "EsGestor", "EsCompromiso", "Estrategia", "Gestor", "Supervisor",
+]
+
+
+def _dos_digitos(valores):
+    return pd.Series(valores).astype(str).str.zfill(2)
+
+
+def _lote(rng, n, fechas, filas, productos):
+    hora = rng.integers(7, 21, n)
+    hora_gestion = (
+        _dos_digitos(hora) + ":" + _dos_digitos(rng.integers(0, 60, n))
+        + ":" + _dos_digitos(rng.integers(0, 60, n))
+    )
+    fecha = pd.Series(rng.choice(fechas, n))
+    return pd.DataFrame({
+        "skfecha": 1,
+        "Hora": hora,
+        "Fecha": fecha + "T" + hora_gestion,
+        "FechaGestion": fecha,
+        "HoraGestion": hora_gestion,
+        "NumeroOperacion": rng.integers(1, max(filas // 3, 2), n),
+        "CodigoTipoContacto": rng.choice(["TIPRESCDIRE", "TIPRESCINDIR", "TIPRESNCON", "TIPRESCTR"], n),
+        "Respuesta": rng.choice([f"RESPUESTA {i}" for i in range(40)], n),
+        "Identificacion": rng.integers(1_000_000_000, 2_000_000_000, n),
+        "Telefono": rng.integers(900_000_000, 1_000_000_000, n),
+        "Etapa": rng.choice(["PREVENTIVA", "FLUJO", "PRIMERA", "SEGUNDA"], n),
+        "Cedente": "SOLIDARIO",
+        "EsCompromiso": rng.integers(0, 2, n),
+        "TiempoGestion": rng.integers(1, 300, n),
+        "ProductoGestion": rng.choice(productos, n),
+        "EsGestor": rng.integers(0, 2, n),
+        "Estrategia": rng.choice([f"E{i}" for i in range(8)], n),
+        "Gestor": rng.choice([f"GESTOR {i}" for i in range(120)], n),
+        "Supervisor": rng.choice([f"SUPERVISOR {i}" for i in range(10)], n),
+        "Observacion": rng.choice(["", "llamar luego", "no contesta", "ofrece pago"], n),
+    })
+
+
+def generar_csv(path, filas, semilla=7, lote=500_000):
+    """CSV sintético con la forma del exporte de DatosGestion (utf-8 con BOM, ';')."""
+    rng = np.random.default_rng(semilla)
+    fechas = pd.date_range("2025-08-01", periods=30).strftime("%Y-%m-%d").to_numpy()
+
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        for inicio in range(0, filas, lote):
+            n = min(lote, filas - inicio)
+            _lote(rng, n, fechas, filas, ["UTE", "CCO", "MICROCRÉDITO"]).to_csv(
+                f, sep=";", index=False, header=inicio == 0
+            )
+
+
+def generar_csv_latin1_tardio(path, filas, semilla=7, lote=500_000):
+    """
+    El mismo CSV en latin-1 (como los exportes viejos de Power BI), pero con
+    el primer carácter no ASCII en la última fila, fuera de la muestra con
+    la que ingesta.detectar_formato adivina la codificación.
+    """
+    rng = np.random.default_rng(semilla)
+    fechas = pd.date_range("2025-08-01", periods=30).strftime("%Y-%m-%d").to_numpy()
+
+    with open(path, "w", encoding="latin-1", newline="") as f:
+        for inicio in range(0, filas - 1, lote):
+            n = min(lote, filas - 1 - inicio)
+            _lote(rng, n, fechas, filas, ["UTE", "CCO", "MICROCREDITO"]).to_csv(
+                f, sep=";", index=False, header=inicio == 0
+            )
+        _lote(rng, 1, fechas, filas, ["MICROCRÉDITO"]).assign(Gestor="GESTOR MUÑOZ").to_csv(
+            f, sep=";", index=False, header=filas == 1
+        )
+
+
+def lectura_anterior(path):
+    """Camino previo: Sniffer sobre 1 KB, read_csv latin-1 de todas las columnas."""
+    try:
+        with open(path, "r", encoding="latin-1") as f:
+            sep = csv.Sniffer().sniff(f.read(1024)).delimiter
+    except csv.Error:
+        sep = ";"
+
+    df = pd.read_csv(path, sep=sep, encoding="latin-1", dtype=dtypes_lectura())
+    df.columns = df.columns.str.replace("ï»¿", "", regex=False).str.strip()
+    return aplicar_esquema(df)
+
+
+def lectura_nueva(path):
+    df = load_csv(path, dtype=dtypes_lectura(), usecols=COLUMNAS_PANEL, fechas=FECHAS)
+    return aplicar_esquema(df)
+
+
+def medir(nombre, funcion, path, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        df = funcion(path)
+        tiempos.append(time.perf_counter() - inicio)
+    mejor = min(tiempos)
+    print(f"{nombre:<28} {mejor:8.2f} s  {len(df) / mejor:>12,.0f} filas/s  {df.memory_usage(deep=True).sum() / 2**20:8.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de lectura de gestiones CSV")
+    parser.add_argument("--filas", type=int, default=5_000_000)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--archivo", help="CSV a usar; si no existe se genera")
+    args = parser.parse_args()
+
+    path = args.archivo or os.path.join(tempfile.gettempdir(), f"gestiones_bench_{args.filas}.csv")
+    if not os.path.exists(path):
+        print(f"Generando {args.filas:,} filas en {path}...")
+        generar_csv(path, args.filas)
+    print(f"{path}: {os.path.getsize(path) / 2**20:,.0f} MB")
+
+    medir("anterior (Sniffer + C)", lectura_anterior, path, args.repeticiones)
+
+    if os.path.exists(path + SUFIJO_FORMATO):
+        os.remove(path + SUFIJO_FORMATO)
+    medir("load_csv (sin sidecar)", lectura_nueva, path, 1)
+    medir("load_csv (con sidecar)", lectura_nueva, path, args.repeticiones)
+
+    # latin-1 con el primer carácter no ASCII al final: se detecta utf-8 y
+    # load_csv tiene que volver a leerlo como latin-1
+    tardio = os.path.splitext(path)[0] + "_latin1.csv"
+    if not os.path.exists(tardio):
+        generar_csv_latin1_tardio(tardio, args.filas)
+    if os.path.exists(tardio + SUFIJO_FORMATO):
+        os.remove(tardio + SUFIJO_FORMATO)
+    medir("load_csv (latin-1 tardío)", lectura_nueva, tardio, 1)
+    ultima = lectura_nueva(tardio).iloc[-1]
+    print(f"  última fila: {ultima['Gestor']} / {ultima['ProductoGestion']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+Benchmark del panel sobre datos sintéticos (benchmarks.generador): carga en
+frío y desde la caché en disco, construcción de índices y cubo, cada
+combinación de filtros, cada agregado de las pestañas y el orden de la
+tabla de detalle. Guarda tiempo y RSS pico de cada paso en un JSON que se
+puede comparar entre commits.
+
+    python -m benchmarks.bench_panel --filas 5000000 --salida antes.json
+    python -m benchmarks.bench_panel --filas 5000000 --salida despues.json
+    python -m benchmarks.bench_panel --comparar antes.json despues.json
+"""
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+from almacen import read_partitions, DiskCache
+from benchmarks.bench_ingesta import COLUMNAS_PANEL
+from benchmarks.generador import escribir_dataset
+from cubo import Cubo
+from detalle import VistaDetalle
+from diagnostico import rss_mb
+from dimensiones import load_dimensiones, enrich
+from esquema import CATEGORIAS, aplicar_esquema
+from filtros import FilterEngine, Dominios, COLUMNAS_FILTRO
+from medidas import calcular_campos
+
+
+# =========================================================
+# Memoria: RSS (diagnostico.rss_mb) muestreado en un hilo mientras corre cada paso
+# =========================================================
+class MedidorRSS:
+    """Pico de RSS dentro del bloque `with`, muestreando cada `intervalo` segundos."""
+
+    def __init__(self, intervalo=0.005):
+        self.intervalo = intervalo
+        self.inicio = self.pico = None
+
+    def _muestrear(self):
+        while not self._fin.wait(self.intervalo):
+            self._registrar()
+
+    def _registrar(self):
+        actual = rss_mb()
+        if actual is not None:
+            self.pico = actual if self.pico is None else max(self.pico, actual)
+
+    def __enter__(self):
+        self.inicio = rss_mb()
+        self.pico = self.inicio
+        self._fin = threading.Event()
+        self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._fin.set()
+        self._hilo.join()
+        self._registrar()
+
+
+# =========================================================
+# Pasos
+# =========================================================
+class Benchmark:
+
+    def __init__(self, repeticiones=3):
+        self.repeticiones = repeticiones
+        self.resultados = []
+
+    def medir(self, grupo, nombre, funcion, repeticiones=None):
+        """Corre `funcion` varias veces; guarda el mejor tiempo, la mediana y el RSS pico."""
+        tiempos = []
+        with MedidorRSS() as rss:
+            for _ in range(repeticiones or self.repeticiones):
+                inicio = time.perf_counter()
+                valor = funcion()
+                tiempos.append(time.perf_counter() - inicio)
+
+        self.resultados.append({
+            "grupo": grupo,
+            "nombre": nombre,
+            "segundos": min(tiempos),
+            "mediana": statistics.median(tiempos),
+            "repeticiones": len(tiempos),
+            "rss_inicio_mb": rss.inicio,
+            "rss_pico_mb": rss.pico,
+        })
+        print(f"{grupo:<12} {nombre:<48} {min(tiempos) * 1000:10.1f} ms  "
+              f"pico {rss.pico or 0:8.0f} MB")
+        return valor
+
+
+def cargar(almacen, dim_dir):
+    """El camino de load_all con el almacén Parquet, sin Streamlit."""
+    df = read_partitions(almacen, columns=COLUMNAS_PANEL, categorias=CATEGORIAS)
+    enrich(df, load_dimensiones(dim_dir))
+    aplicar_esquema(df)
+    return calcular_campos(df)
+
+
+def _mas_frecuente(df, col):
+    return df[col].value_counts(sort=True).index[0]
+
+
+def selecciones(df, todas=False):
+    """
+    {nombre: selección} con el valor más frecuente de cada filtro: sin
+    filtros, cada uno solo, cada par y todos juntos (todas=True: cada subconjunto).
+    """
+    columnas = [c for c in COLUMNAS_FILTRO if c in df.columns]
+    valores = {c: _mas_frecuente(df, c) for c in columnas}
+
+    tamanos = range(len(columnas) + 1) if todas else sorted({0, 1, 2, len(columnas)})
+    resultado = {}
+    for k in tamanos:
+        for combinacion in itertools.combinations(columnas, k):
+            nombre = "+".join(combinacion) or "sin filtros"
+            resultado[nombre] = {c: valores[c] for c in combinacion}
+    return resultado
+
+
+def correr(almacen, dim_dir, repeticiones=3, todas=False):
+    bench = Benchmark(repeticiones)
+
+    # -------------------- CARGA --------------------
+    df = bench.medir("carga", "frio (parquet + dimensiones + esquema)",
+                     lambda: cargar(almacen, dim_dir), repeticiones=1)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = DiskCache("bench", cache_dir=cache_dir)
+        bench.medir("carga", "escritura cache en disco", lambda: cache.put("v", df), repeticiones=1)
+        bench.medir("carga", "lectura cache en disco", lambda: cache.get("v"))
+
+    # -------------------- ESTRUCTURAS --------------------
+    motor = bench.medir("construccion", "FilterEngine (filas)", lambda: FilterEngine(df), 1)
+    cubo = bench.medir("construccion", "Cubo", lambda: Cubo(df, motor_filas=motor), 1)
+    bench.medir("construccion", "Dominios", lambda: Dominios(cubo.celdas, filas=df), 1)
+    vista = bench.medir("construccion", "VistaDetalle", lambda: VistaDetalle(df), 1)
+
+    celdas = {"celdas": len(cubo.celdas), "filas": len(df),
+              "razon": len(cubo.celdas) / len(df) if len(df) else 0.0}
+    print(f"Cubo: {celdas['celdas']:,} celdas para {celdas['filas']:,} filas ({celdas['razon']:.1%})")
+
+    # Filtro fuera del grano: la primera vez se arma el subcubo de sus filas
+    for col in cubo.filtros_filas:
+        sel = {col: _mas_frecuente(df, col)}
+        bench.medir("construccion", f"subcubo {col}", lambda: cubo.totales(sel), 1)
+
+    # -------------------- FILTROS --------------------
+    h_min, h_max = cubo.por_hora({}).extremos()
+    rango = (h_min + 2, h_max - 2)
+    for nombre, sel in selecciones(df, todas).items():
+        bench.medir("filtro", f"filas {nombre}", lambda: motor.indices(sel))
+        bench.medir("filtro", f"filas {nombre} + hora", lambda: motor.indices(sel, rango))
+        bench.medir("filtro", f"cubo {nombre}", lambda: cubo.filtrar(sel))
+
+    # -------------------- AGREGADOS DEL PANEL --------------------
+    gestor = {"Gestor": _mas_frecuente(df, "Gestor")}
+    for etiqueta, sel in (("sin filtros", {}), ("gestor", gestor)):
+        pasos = {
+            "totales": lambda: cubo.totales(sel),
+            "operaciones unicas exacto": lambda: cubo.operaciones_unicas(sel),
+            "operaciones unicas aproximado": lambda: cubo.operaciones_unicas(sel, modo="Aproximado"),
+            "por hora + extremos": lambda: cubo.por_hora(sel).extremos(),
+            "embudo (rango de hora)": lambda: (cubo.totales(sel, hora=rango),
+                                               cubo.operaciones_unicas(sel, hora=rango)),
+            "primera gestion / resumen gestor": lambda: cubo.rollup(sel, "Gestor"),
+            "donut tipo contacto": lambda: cubo.rollup(sel, "TipoContacto"),
+            "pivote gestor x hora": lambda: cubo.pivot(sel, index="Gestor", columns="Hora"),
+            "comparativo gestor x dia": lambda: cubo.comparativo(sel, hora=rango),
+        }
+        for nombre, funcion in pasos.items():
+            bench.medir("agregado", f"{nombre} ({etiqueta})", funcion)
+
+    # -------------------- DETALLE --------------------
+    columnas = [c for c in COLUMNAS_PANEL if c in df.columns]
+    idx_gestor = motor.indices(gestor)
+    bench.medir("detalle", "primera pagina (100, sin filtros)",
+                lambda: vista.pagina(df, None, 0, 100, columnas))
+    bench.medir("detalle", "pagina 100 (1000, sin filtros)",
+                lambda: vista.pagina(df, None, 100, 1000, columnas))
+    bench.medir("detalle", "primera pagina (100, gestor)",
+                lambda: vista.pagina(df, idx_gestor, 0, 100, columnas))
+    bench.medir("detalle", "orden completo (sin filtros)", lambda: vista.orden(None), 1)
+    bench.medir("detalle", "exportar csv (gestor)",
+                lambda: vista.exportar_csv(df, idx_gestor, columnas), 1)
+
+    return bench.resultados, celdas
+
+
+# =========================================================
+# Resultados
+# =========================================================
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(path_antes, path_despues):
+    """Imprime, paso a paso, el tiempo y el pico de RSS de dos corridas."""
+    with open(path_antes, "r", encoding="utf-8") as f:
+        antes = json.load(f)
+    with open(path_despues, "r", encoding="utf-8") as f:
+        despues = json.load(f)
+
+    print(f"antes:   {antes['commit']} ({antes['filas']:,} filas)")
+    print(f"despues: {despues['commit']} ({despues['filas']:,} filas)")
+    for nombre, corrida in (("antes", antes), ("despues", despues)):
+        if "cubo" in corrida:
+            print(f"cubo {nombre}: {corrida['cubo']['celdas']:,} celdas ({corrida['cubo']['razon']:.1%} de las filas)")
+
+    previos = {(r["grupo"], r["nombre"]): r for r in antes["resultados"]}
+    for r in despues["resultados"]:
+        p = previos.get((r["grupo"], r["nombre"]))
+        if p is None:
+            continue
+        razon = p["segundos"] / r["segundos"] if r["segundos"] else float("inf")
+        print(f"{r['grupo']:<12} {r['nombre']:<48} {p['segundos'] * 1000:10.1f} -> "
+              f"{r['segundos'] * 1000:10.1f} ms  x{razon:6.2f}  "
+              f"pico {p['rss_pico_mb'] or 0:7.0f} -> {r['rss_pico_mb'] or 0:7.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del panel sobre datos sintéticos")
+    parser.add_argument("--filas", type=int, default=1_000_000, help="de 100 mil a 50 millones")
+    parser.add_argument("--semilla", type=int, default=7)
+    parser.add_argument("--dias", type=int, default=30)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--todas", action="store_true",
+                        help="medir cada subconjunto de filtros (por defecto: solos, pares y todos)")
+    parser.add_argument("--datos", help="carpeta del dataset sintético (se genera si no existe)")
+    parser.add_argument("--salida", help="JSON de resultados")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTES", "DESPUES"),
+                        help="comparar dos JSON de resultados y salir")
+    args = parser.parse_args()
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return
+
+    destino = args.datos or os.path.join(
+        tempfile.gettempdir(), f"gestiones_bench_{args.filas}_{args.semilla}_{args.dias}"
+    )
+    print(f"Dataset: {destino}")
+    almacen, dim_dir = escribir_dataset(destino, args.filas, args.semilla, args.dias)
+
+    resultados, celdas = correr(almacen, dim_dir, args.repeticiones, args.todas)
+
+    salida = args.salida or f"bench_panel_{args.filas}_{_commit() or 'sin-commit'}.json"
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump({
+            "commit": _commit(),
+            "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+            "filas": celdas["filas"],
+            "cubo": celdas,
+            "semilla": args.semilla,
+            "dias": args.dias,
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "resultados": resultados,
+        }, f, indent=1, default=str)
+    print(f"Resultados en {salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Generador sintético de gestiones con el esquema de RepGestionesSemanalPorHora
+tal como lo trae DatosGestion.QUERY_SELECT (HoraGestion en segundos).
+
+Misma semilla y mismos parámetros dan los mismos datos. Las cardinalidades
+imitan la operación real: gestores agrupados bajo supervisores y con
+actividad desigual, respuestas y productos con distribución sesgada, y
+operaciones que reciben varias gestiones en el mes. Los códigos de tipo de
+contacto, producto y etapa salen de las tablas de dimensión de Data/, así
+el enriquecimiento encuentra sus claves.
+
+    python -m benchmarks.generador --filas 1000000 --destino /tmp/gestiones
+"""
+import argparse
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from almacen import write_partitions
+from dimensiones import DIM_DIR, DIM_ARCHIVOS, load_dimensiones
+
+LOTE = 1_000_000
+
+SUPERVISORES = 15
+GESTORES_POR_SUPERVISOR = 25
+RESPUESTAS = 80
+ESTRATEGIAS = 12
+
+# Gestiones por operación en promedio durante el período
+GESTIONES_POR_OPERACION = 4
+
+TIPOS_CONTACTO = {
+    "TIPRESNCON": 0.45,
+    "TIPRESCDIRE": 0.25,
+    "TIPRESCINDIR": 0.20,
+    "TIPRESCTR": 0.10,
+}
+
+# Gestiones por hora del día (jornada 08-20 con picos a media mañana y tarde)
+PESOS_HORA = {8: 4, 9: 8, 10: 10, 11: 10, 12: 7, 13: 5, 14: 7, 15: 9, 16: 9, 17: 7, 18: 4, 19: 2}
+
+DIAS = ["LUNES", "MARTES", "MIERCOLES", "JUEVES", "VIERNES", "SABADO", "DOMINGO"]
+
+MARCA = "generado.json"
+
+
+def _zipf(rng, n, k, s=1.1):
+    """`n` índices en [0, k) con probabilidad decreciente (Zipf truncada)."""
+    pesos = 1.0 / np.arange(1, k + 1) ** s
+    return rng.choice(k, size=n, p=pesos / pesos.sum())
+
+
+def _normalizar(pesos):
+    p = np.asarray(list(pesos), dtype=np.float64)
+    return p / p.sum()
+
+
+class Generador:
+
+    def __init__(self, filas, semilla=7, dias=30, desde="2025-08-01", dim_dir=DIM_DIR):
+        self.filas = filas
+        self.semilla = semilla
+        self.fechas = pd.date_range(desde, periods=dias)
+
+        rng = np.random.default_rng(semilla)
+
+        # Jerarquía fija: cada gestor pertenece a un supervisor
+        n_gestores = SUPERVISORES * GESTORES_POR_SUPERVISOR
+        self.gestores = np.array([f"GESTOR {i:03d}" for i in range(n_gestores)])
+        self.supervisor_de = np.array(
+            [f"SUPERVISOR {i // GESTORES_POR_SUPERVISOR:02d}" for i in range(n_gestores)]
+        )
+        # Actividad desigual entre gestores; unos pocos son robots (IVR)
+        self.peso_gestor = _normalizar(rng.gamma(2.0, 1.0, n_gestores))
+        self.es_gestor = (rng.random(n_gestores) > 0.05).astype(np.int8)
+
+        dims = load_dimensiones(dim_dir)
+        self.productos = dims["producto"]["ProductoGestion"].dropna().unique()
+        self.etapas = dims["orden_etapa"]["Etapa"].dropna().unique()
+
+        self.respuestas = np.array([f"RESPUESTA {i:02d}" for i in range(RESPUESTAS)])
+        self.estrategias = np.array([f"ESTRATEGIA {i:02d}" for i in range(ESTRATEGIAS)])
+
+        self.operaciones = max(filas // GESTIONES_POR_OPERACION, 1)
+
+    def lote(self, inicio, n):
+        """Filas inicio..inicio+n; cada lote tiene su propia semilla derivada."""
+        rng = np.random.default_rng([self.semilla, inicio])
+
+        fecha = self.fechas[rng.integers(0, len(self.fechas), n)]
+        hora = rng.choice(list(PESOS_HORA), size=n, p=_normalizar(PESOS_HORA.values()))
+        segundos = hora * 3600 + rng.integers(0, 3600, n)
+
+        gestor = rng.choice(len(self.gestores), size=n, p=self.peso_gestor)
+        tipo = rng.choice(list(TIPOS_CONTACTO), size=n, p=_normalizar(TIPOS_CONTACTO.values()))
+        compromiso = (rng.random(n) < np.where(tipo == "TIPRESCDIRE", 0.35, 0.02)).astype(np.int8)
+
+        # Operaciones: pocas muy gestionadas, muchas con una o dos gestiones
+        operacion = (self.operaciones * rng.random(n) ** 2).astype(np.int64) + 1
+
+        return pd.DataFrame({
+            "skfecha": fecha.strftime("%Y%m%d").astype(np.int32),
+            "Hora": hora.astype(np.int8),
+            "Fecha": fecha + pd.to_timedelta(segundos, unit="s"),
+            "FechaGestion": fecha,
+            "HoraGestion": segundos.astype(np.int32),
+            "NumeroOperacion": operacion,
+            "CodigoTipoContacto": tipo,
+            "Respuesta": self.respuestas[_zipf(rng, n, len(self.respuestas))],
+            "Identificacion": 1_000_000_000 + operacion * 7919 % 900_000_000,
+            "Telefono": 900_000_000 + (operacion * 104_729 + rng.integers(0, 3, n)) % 100_000_000,
+            "Etapa": self.etapas[_zipf(rng, n, len(self.etapas), s=0.8)],
+            "Cedente": "SOLIDARIO",
+            "EsCompromiso": compromiso,
+            "TiempoGestion": rng.exponential(90, n).astype(np.int32) + 1,
+            "ProductoGestion": self.productos[_zipf(rng, n, len(self.productos))],
+            "EsGestor": self.es_gestor[gestor],
+            "esEfectivo": np.maximum(compromiso, rng.random(n) < 0.1).astype(np.int8),
+            "Estrategia": self.estrategias[_zipf(rng, n, len(self.estrategias), s=0.7)],
+            "Gestor": self.gestores[gestor],
+            "Supervisor": self.supervisor_de[gestor],
+            "codigocanal": np.where(rng.random(n) < 0.8, "CALLCENTER", "TELECONTACT"),
+            "EstadoCompromiso": np.where(
+                compromiso == 1, rng.choice(["VIGENTE", "CUMPLIDO", "ROTO"], n), None
+            ),
+        })
+
+    def lotes(self, lote=LOTE):
+        for inicio in range(0, self.filas, lote):
+            yield self.lote(inicio, min(lote, self.filas - inicio))
+
+    def semana(self):
+        """Semana.csv que cubre las fechas generadas (mismo formato que Data/)."""
+        return pd.DataFrame({
+            "DiaSemana": [DIAS[f.dayofweek] for f in self.fechas],
+            "fechaGestion": [f"{f.day}/{f.month}/{f.year} 0:00" for f in self.fechas],
+            "DiaNombre": [f"{DIAS[f.dayofweek]} {f.day}" for f in self.fechas],
+            "MesDia": self.fechas.strftime("%m-%d"),
+        })
+
+
+def escribir_dataset(destino, filas, semilla=7, dias=30, dim_dir=DIM_DIR, lote=LOTE):
+    """
+    Escribe en `destino` un almacén Parquet (gestiones/) y sus tablas de
+    dimensión. Si ya existe uno generado con los mismos parámetros, se reutiliza.
+    Devuelve (carpeta del almacén, carpeta de dimensiones).
+    """
+    almacen = os.path.join(destino, "gestiones")
+    parametros = {"filas": filas, "semilla": semilla, "dias": dias}
+
+    try:
+        with open(os.path.join(destino, MARCA), "r", encoding="utf-8") as f:
+            if json.load(f) == parametros:
+                return almacen, destino
+    except (OSError, ValueError):
+        pass
+
+    shutil.rmtree(destino, ignore_errors=True)
+    os.makedirs(destino)
+
+    generador = Generador(filas, semilla=semilla, dias=dias, dim_dir=dim_dir)
+    for i, df in enumerate(generador.lotes(lote)):
+        write_partitions(df, almacen, prefijo=f"bench-{i:05d}")
+
+    for nombre, archivo in DIM_ARCHIVOS.items():
+        if nombre != "semana":
+            shutil.copy(os.path.join(dim_dir, archivo), destino)
+    generador.semana().to_csv(
+        os.path.join(destino, DIM_ARCHIVOS["semana"]), sep=";", index=False, encoding="utf-8-sig"
+    )
+
+    # La marca va al final: un dataset a medio escribir no se reutiliza
+    with open(os.path.join(destino, MARCA), "w", encoding="utf-8") as f:
+        json.dump(parametros, f)
+
+    return almacen, destino
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generador sintético de gestiones")
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--semilla", type=int, default=7)
+    parser.add_argument("--dias", type=int, default=30)
+    parser.add_argument("--destino", required=True, help="carpeta de salida (almacén + dimensiones)")
+    args = parser.parse_args()
+
+    almacen, dims = escribir_dataset(args.destino, args.filas, args.semilla, args.dias)
+    print(f"{args.filas:,} filas en {almacen} (dimensiones en {dims})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+from esquema import formato_hora
+
+# =========================================================
+# Comparativo Gestor x Día
+#
+# La tabla ancha (por gestor: Gestiones, ContactoDirecto, Compromisos y
+# primera HoraGestion de cada día) y el gráfico por tipo de contacto y
+# día salen de una sola pasada sobre las celdas del cubo: gestor, día y
+# tipo se codifican como enteros al armar el cubo y cada medida se
+# acumula con bincount sobre la clave combinada gestor x día x tipo.
+# La tabla suma ese intermedio sobre el tipo y el gráfico sobre el gestor.
+# =========================================================
+MEDIDAS_COMPARATIVO = ["Gestiones", "ContactoDirecto", "Compromisos"]
+
+
+class Comparativo:
+
+    def __init__(self, celdas, fila="Gestor", columna="DiaNombre", serie="TipoContacto",
+                 medidas=MEDIDAS_COMPARATIVO):
+        self.fila, self.columna, self.serie = fila, columna, serie
+        self.medidas = [m for m in medidas if m in celdas.columns]
+
+        # Códigos en el orden del groupby (categorías o valores ordenados);
+        # los nulos van a una posición extra al final de cada eje
+        codigos, self._valores = [], {}
+        for col in (fila, columna, serie):
+            cod, valores = pd.factorize(celdas[col], sort=True)
+            codigos.append(np.where(cod < 0, len(valores), cod))
+            self._valores[col] = valores
+
+        self._forma = tuple(len(self._valores[c]) + 1 for c in (fila, columna, serie))
+        self._clave = np.ravel_multi_index(codigos, self._forma)
+
+        self._pesos = {m: celdas[m].to_numpy(dtype=np.float64) for m in self.medidas}
+        self._hora = None
+        if "PrimeraHora" in celdas.columns:
+            self._hora = celdas["PrimeraHora"].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    def intermedio(self, idx=None):
+        """
+        Celdas, medidas y primera hora por gestor x día x tipo (arrays con
+        la forma de los tres ejes) para las celdas `idx` (None = todas).
+        """
+        clave = self._clave if idx is None else self._clave[idx]
+        n = int(np.prod(self._forma))
+
+        def acumular(pesos):
+            return np.bincount(clave, weights=pesos, minlength=n).reshape(self._forma)
+
+        datos = {"celdas": acumular(None)}
+        for m, pesos in self._pesos.items():
+            datos[m] = acumular(pesos if idx is None else pesos[idx]).astype(np.int64)
+
+        if self._hora is not None:
+            hora = np.full(n, np.inf)
+            np.fmin.at(hora, clave, self._hora if idx is None else self._hora[idx])
+            datos["PrimeraHora"] = hora.reshape(self._forma)
+
+        return datos
+
+    def tabla(self, datos):
+        """Una fila por gestor y columnas "<día> <medida>", como el pivote de Power BI."""
+        # Sin gestor o sin día no entran a la tabla (como en un groupby)
+        presentes = datos["celdas"][:-1, :-1].sum(axis=2) > 0
+        filas = presentes.any(axis=1)
+        dias = presentes.any(axis=0)
+        presentes = presentes[filas][:, dias]
+
+        por_dia = {m: datos[m][:-1, :-1].sum(axis=2)[filas][:, dias] for m in self.medidas}
+        if "PrimeraHora" in datos:
+            hora = datos["PrimeraHora"][:-1, :-1].min(axis=2)[filas][:, dias]
+            por_dia["HoraGestion"] = np.where(np.isfinite(hora), hora, np.nan)
+
+        nombres_dias = self._valores[self.columna][dias]
+        bloques = [pd.DataFrame({self.fila: self._valores[self.fila][filas]})]
+
+        # Mismo orden de columnas que pivot_table: medidas por nombre, días dentro
+        for m in sorted(por_dia):
+            matriz = por_dia[m]
+            if m == "HoraGestion":
+                # Todas las horas de una vez; las combinaciones vacías ya son NaN
+                texto = formato_hora(pd.Series(matriz.ravel()).astype("Int32"))
+                bloque = pd.DataFrame(texto.to_numpy().reshape(matriz.shape))
+            else:
+                bloque = pd.DataFrame(matriz)
+                if not presentes.all():
+                    bloque = bloque.where(presentes)
+            bloque.columns = [f"{dia} {m}" for dia in nombres_dias]
+            bloques.append(bloque)
+
+        return pd.concat(bloques, axis=1)
+
+    def serie_tipo(self, datos, medida="Gestiones"):
+        """`medida` por tipo de contacto y día (largo, para el gráfico de barras)."""
+        # Aquí sí cuentan las celdas sin gestor
+        presentes = datos["celdas"][:, :-1, :-1].sum(axis=0) > 0
+        valores = datos[medida][:, :-1, :-1].sum(axis=0)
+
+        tipo, dia = np.nonzero(presentes.T)
+        return pd.DataFrame({
+            self.serie: self._valores[self.serie].take(tipo),
+            self.columna: self._valores[self.columna].take(dia),
+            medida: valores[dia, tipo],
+        })
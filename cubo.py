@@ -0,0 +1,320 @@
+import functools
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from filtros import FilterEngine, COLUMNAS_FILTRO, SIN_HORA, normalizar_seleccion
+from distintos import ContadorDistintos
+from comparativo import Comparativo
+from medidas import ALIAS, tiene_medida, medida
+
+# =========================================================
+# Cubo pre-agregado del panel
+#
+# Se arma una vez por carga de datos al grano de lo que las vistas
+# agrupan o cruzan con la hora:
+#   Fecha x Gestor x TipoContacto x Hora
+# (más DiaNombre y Supervisor, que dependen de la fecha y del gestor y
+# no agregan celdas) con las medidas aditivas sumadas (y la primera
+# HoraGestion, que se combina con min). KPIs, embudo, donut, resumen,
+# pivote por hora y el comparativo se responden agregando celdas, no
+# filas. Las operaciones únicas no se pueden sumar: las cuenta un
+# ContadorDistintos (distintos.py).
+#
+# Los filtros que ninguna vista agrupa (Etapa, Estrategia, Producto,
+# Robot) no entran al grano: multiplicarían las celdas hasta casi las
+# filas. Una selección que los usa se resuelve sobre las filas (con el
+# índice de filtros de las filas) y se arma un cubo chico solo con las
+# que cumplen; los últimos SUBCUBOS quedan guardados. La primera vez
+# cuesta lo que armar un cubo con esas filas (con 1M de filas, de 0.2 a
+# 0.9 s según cuántas filas elija el filtro); después responde como el
+# cubo principal.
+#
+# Para los sliders de hora, las medidas de una selección se acumulan por
+# hora (AcumuladoHora): cualquier rango sale de restar dos sumas.
+# =========================================================
+DIMENSIONES_CUBO = [
+    "FechaGestion",
+    "DiaNombre",
+    "Gestor",
+    "Supervisor",
+    "TipoContacto",
+    "Hora",
+]
+
+MEDIDAS = ["Gestiones", "Contacto", "ContactoDirecto", "Compromisos"]
+
+HORAS = 24
+
+SUBCUBOS = 8
+
+
+class AcumuladoHora:
+    """
+    Medidas de una selección acumuladas por hora: la fila h de `acumulado`
+    suma las horas < h, así el rango [desde, hasta] es
+    acumulado[hasta + 1] - acumulado[desde], sin recorrer celdas.
+    """
+
+    def __init__(self, medidas, celdas_hora, acumulado, sin_hora):
+        self.medidas = medidas
+        self._celdas_hora = celdas_hora
+        self._acumulado = acumulado
+        self._sin_hora = sin_hora
+
+    @property
+    def nbytes(self):
+        """Bytes de los arreglos (para el tope de memoria de CacheAgregados)."""
+        return self._celdas_hora.nbytes + self._acumulado.nbytes + self._sin_hora.nbytes
+
+    def totales(self, hora=None):
+        """
+        Suma de las medidas en el rango `hora=(desde, hasta)`: Series
+        {medida: valor}. Sin rango también cuentan las gestiones sin hora.
+        """
+        n = len(self._celdas_hora)
+        if hora is None:
+            return pd.Series(self._acumulado[n] + self._sin_hora, index=self.medidas)
+
+        desde, hasta = hora
+        desde = min(max(int(desde), 0), n)
+        hasta = min(max(int(hasta) + 1, desde), n)
+        return pd.Series(self._acumulado[hasta] - self._acumulado[desde], index=self.medidas)
+
+    def extremos(self):
+        """Hora mínima y máxima con datos (0-23 si no hay ninguna)."""
+        horas = np.flatnonzero(self._celdas_hora)
+        if len(horas) == 0:
+            return 0, HORAS - 1
+        return int(horas[0]), int(horas[-1])
+
+
+def _resuelto(metodo):
+    # La selección se responde en este cubo o en el subcubo de sus filas
+    @functools.wraps(metodo)
+    def envoltura(self, seleccion, *args, **kwargs):
+        cubo, seleccion = self._resolver(seleccion)
+        return metodo(cubo, seleccion, *args, **kwargs)
+    return envoltura
+
+
+class Cubo:
+
+    def __init__(self, df, dimensiones=DIMENSIONES_CUBO, medidas=MEDIDAS, motor_filas=None):
+        """
+        `motor_filas` es el FilterEngine de las filas de `df` (el del panel),
+        para los filtros fuera del grano; si falta se arma al primer uso.
+        """
+        self.dimensiones = [d for d in dimensiones if d in df.columns]
+        self.medidas = [m for m in medidas if tiene_medida(df, m)]
+
+        # Celda de cada fila
+        celda = (
+            df.groupby(self.dimensiones, observed=True, dropna=False, sort=False)
+            .ngroup()
+            .to_numpy()
+        )
+        n_celdas = int(celda.max()) + 1 if len(celda) else 0
+
+        _, primera_fila = np.unique(celda, return_index=True)
+        celdas = df[self.dimensiones].take(primera_fila).reset_index(drop=True)
+
+        for m in self.medidas:
+            pesos = medida(df, m).astype(np.float64)
+            celdas[m] = np.bincount(celda, weights=pesos, minlength=n_celdas).astype(np.int64)
+
+        if "HoraGestion" in df.columns:
+            celdas["PrimeraHora"] = (
+                df["HoraGestion"].groupby(celda).min().reindex(range(n_celdas)).array
+            )
+
+        self.celdas = celdas
+        self.motor = FilterEngine(celdas, columnas=[c for c in COLUMNAS_FILTRO if c in self.dimensiones])
+
+        self.filtros_filas = [c for c in COLUMNAS_FILTRO if c in df.columns and c not in self.dimensiones]
+        self.enlazar(df, motor_filas)
+
+        # Hora como entero (posición en los acumulados por hora)
+        self._hora = None
+        if "Hora" in self.dimensiones:
+            self._hora = celdas["Hora"].to_numpy(dtype=np.int64, na_value=SIN_HORA)
+            self._n_horas = max(HORAS, int(self._hora.max()) + 1 if n_celdas else 0)
+            self._pesos = {m: celdas[m].to_numpy(dtype=np.float64) for m in self.medidas}
+            self._todo = self._acumular(None)
+
+        self.matriz = None
+        if {"Gestor", "DiaNombre", "TipoContacto"} <= set(self.dimensiones):
+            self.matriz = Comparativo(celdas)
+
+        # Operaciones distintas: exacto por celda / por día y HyperLogLog
+        self.distintos = None
+        if "NumeroOperacion" in df.columns:
+            particion = None
+            if "FechaGestion" in self.dimensiones:
+                particion, fechas = pd.factorize(celdas["FechaGestion"])
+                self._particiones = {f: i for i, f in enumerate(fechas)}
+            self.distintos = ContadorDistintos(
+                celda, df["NumeroOperacion"], n_celdas, particion_celda=particion
+            )
+
+    def enlazar(self, df, motor_filas=None):
+        """
+        Filas de `df` para los subcubos de los filtros fuera del grano. Un
+        cubo leído de la caché en disco llega sin ellas (ni sus subcubos,
+        que son de cada proceso): hay que enlazarlo con el mismo `df`.
+        """
+        self._filas = None
+        if self.filtros_filas:
+            usadas = set(self.dimensiones) | {ALIAS.get(m, m) for m in self.medidas}
+            usadas |= {"HoraGestion", "NumeroOperacion"}
+            self._filas = df[[c for c in df.columns if c in usadas or c in self.filtros_filas]]
+            self._columnas_subcubo = [c for c in self._filas.columns if c in usadas]
+            self._motor_filas = motor_filas
+            self._subcubos = OrderedDict()
+            self._lock = threading.Lock()
+        return self
+
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        for nombre in ("_filas", "_columnas_subcubo", "_motor_filas", "_subcubos", "_lock"):
+            estado.pop(nombre, None)
+        estado["_filas"] = None
+        return estado
+
+    def _resolver(self, seleccion):
+        """
+        (cubo, selección) que responde `seleccion`: este mismo cubo, o si
+        filtra por columnas fuera del grano, el subcubo de las filas que
+        cumplen toda la selección (y entonces ya no queda nada por filtrar).
+        """
+        activos = normalizar_seleccion(seleccion or {})
+        if not any(c in activos for c in self.filtros_filas):
+            return self, seleccion
+        if self._filas is None:
+            raise RuntimeError("Cubo sin filas para los subcubos: falta enlazar(df)")
+
+        clave = tuple(sorted(activos.items()))
+        with self._lock:
+            subcubo = self._subcubos.get(clave)
+            if subcubo is not None:
+                self._subcubos.move_to_end(clave)
+                return subcubo, {}
+
+        if self._motor_filas is None:
+            self._motor_filas = FilterEngine(self._filas)
+        idx = self._motor_filas.indices(activos)
+        subcubo = Cubo(self._filas[self._columnas_subcubo].take(idx), self.dimensiones, self.medidas)
+
+        with self._lock:
+            self._subcubos[clave] = subcubo
+            while len(self._subcubos) > SUBCUBOS:
+                self._subcubos.popitem(last=False)
+        return subcubo, {}
+
+    @_resuelto
+    def filtrar(self, seleccion, hora=None):
+        """Celdas del cubo que cumplen la selección y el rango de hora."""
+        return self.motor.apply(self.celdas, seleccion, hora)
+
+    @_resuelto
+    def totales(self, seleccion, hora=None):
+        """Suma de las medidas para la selección: Series {medida: valor}."""
+        if self._hora is not None:
+            return self.por_hora(seleccion).totales(hora)
+        return self.filtrar(seleccion, hora)[self.medidas].sum()
+
+    @_resuelto
+    def por_hora(self, seleccion):
+        """
+        AcumuladoHora de la selección (sin rango de hora): se calcula una
+        vez por selección y responde cada posición de los sliders.
+        """
+        idx = self.motor.indices(seleccion)
+        return self._todo if idx is None else self._acumular(idx)
+
+    def _acumular(self, idx):
+        hora = self._hora if idx is None else self._hora[idx]
+        sin_hora = hora == SIN_HORA
+        if sin_hora.any():
+            hora = hora[~sin_hora]
+        else:
+            sin_hora = None
+        celdas_hora = np.bincount(hora, minlength=self._n_horas)
+
+        acumulado = np.zeros((self._n_horas + 1, len(self.medidas)), dtype=np.int64)
+        totales_sin_hora = np.zeros(len(self.medidas), dtype=np.int64)
+        for j, m in enumerate(self.medidas):
+            pesos = self._pesos[m] if idx is None else self._pesos[m][idx]
+            if sin_hora is not None:
+                totales_sin_hora[j] = pesos[sin_hora].sum()
+                pesos = pesos[~sin_hora]
+            acumulado[1:, j] = np.cumsum(np.bincount(hora, weights=pesos, minlength=self._n_horas))
+
+        return AcumuladoHora(self.medidas, celdas_hora, acumulado, totales_sin_hora)
+
+    @_resuelto
+    def rollup(self, seleccion, por, hora=None):
+        """Medidas agregadas por las dimensiones `por` (como un groupby sobre las filas)."""
+        agg = {m: "sum" for m in self.medidas}
+        if "PrimeraHora" in self.celdas.columns:
+            agg["PrimeraHora"] = "min"
+
+        return (
+            self.filtrar(seleccion, hora)
+            .groupby(por, observed=True)
+            .agg(agg)
+            .reset_index()
+        )
+
+    @_resuelto
+    def pivot(self, seleccion, index, columns, medida="Gestiones", hora=None):
+        return pd.pivot_table(
+            self.filtrar(seleccion, hora),
+            index=index,
+            columns=columns,
+            values=medida,
+            aggfunc="sum",
+            fill_value=0,
+            observed=True,
+        )
+
+    @_resuelto
+    def comparativo(self, seleccion, hora=None):
+        """
+        (tabla Gestor x Día, Gestiones por TipoContacto y Día) de la
+        selección, ambas del mismo intermedio (ver comparativo.py).
+        """
+        datos = self.matriz.intermedio(self.motor.indices(seleccion, hora))
+        return self.matriz.tabla(datos), self.matriz.serie_tipo(datos)
+
+    @_resuelto
+    def operaciones_unicas(self, seleccion, hora=None, modo="Exacto"):
+        """
+        NumeroOperacion distintos en la selección. modo="Aproximado" usa
+        HyperLogLog (error estándar distintos.ERROR_HLL).
+        """
+        if self.distintos is None:
+            return 0
+
+        aproximado = modo == "Aproximado"
+        idx = self.motor.indices(seleccion, hora)
+        if idx is None:
+            return self.distintos.aproximado() if aproximado else self.distintos.exacto()
+
+        # Solo filtro de fecha: se combinan los bitsets (o registros HLL)
+        # ya armados del día, sin recorrer celdas
+        activos = normalizar_seleccion(seleccion)
+        if (
+            list(activos) == ["FechaGestion"]
+            and self.distintos.tiene_particiones
+            and not self.motor.rango_activo(hora)
+        ):
+            dia = self._particiones.get(activos["FechaGestion"])
+            dias = [] if dia is None else [dia]
+            if aproximado:
+                return self.distintos.aproximado_particiones(dias)
+            return self.distintos.exacto_particiones(dias)
+
+        return self.distintos.aproximado(idx) if aproximado else self.distintos.exacto(idx)
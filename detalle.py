@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+from esquema import HORAS, formato_hora
+
+# =========================================================
+# Tabla de registros detallados, paginada en el servidor
+#
+# En vez de ordenar todo el DataFrame filtrado y mandarlo entero al
+# navegador, se ordenan solo las posiciones que hacen falta para la
+# página pedida (argpartition + sort de k filas) y se envía esa página.
+# La descarga CSV se arma por lotes, solo cuando se pide. Las horas (segundos) se formatean recién aquí.
+# =========================================================
+TAMANOS_PAGINA = [100, 500, 1000]
+
+LOTE_CSV = 50_000
+
+
+class VistaDetalle:
+
+    def __init__(self, df, columna_orden="HoraGestion"):
+        # Rango de cada fila según la columna de orden (nulos al final); con
+        # la posición como desempate, cada fila tiene una clave única y el
+        # orden es estable, como sort_values(kind="stable")
+        self.n = len(df)
+        if columna_orden in df.columns and self.n:
+            rango, _ = pd.factorize(df[columna_orden], sort=True)
+            rango = np.where(rango < 0, rango.max() + 1, rango).astype(np.int64)
+        else:
+            rango = np.zeros(self.n, dtype=np.int64)
+        self._clave = rango * max(self.n, 1) + np.arange(self.n, dtype=np.int64)
+
+    @staticmethod
+    def _mostrar(parte):
+        horas = {c: formato_hora(parte[c]) for c in HORAS if c in parte.columns}
+        return parte.assign(**horas) if horas else parte
+
+    def _posiciones(self, idx):
+        return np.arange(self.n) if idx is None else np.asarray(idx)
+
+    def total(self, idx):
+        return self.n if idx is None else len(idx)
+
+    def orden(self, idx, hasta=None):
+        """Las primeras `hasta` posiciones de `idx` ordenadas (todas con hasta=None)."""
+        pos = self._posiciones(idx)
+        clave = self._clave[pos]
+
+        if hasta is not None and hasta < len(pos):
+            top = np.argpartition(clave, hasta - 1)[:hasta]
+            return pos[top[np.argsort(clave[top])]]
+        return pos[np.argsort(clave)]
+
+    def pagina(self, df, idx, pagina, tamano, columnas):
+        """Filas de la página `pagina` (desde 0) en el orden de la columna de orden."""
+        desde = pagina * tamano
+        pos = self.orden(idx, hasta=desde + tamano)[desde:]
+        return self._mostrar(df.iloc[pos, df.columns.get_indexer(columnas)])
+
+    def exportar_csv(self, df, idx, columnas, lote=LOTE_CSV):
+        """
+        CSV ordenado de toda la selección, como bytes (st.download_button lee
+        igual todo el contenido a memoria). Se codifica por lotes.
+        """
+        pos = self.orden(idx)
+        partes = []
+
+        for i in range(0, len(pos), lote):
+            parte = self._mostrar(df.iloc[pos[i:i + lote], df.columns.get_indexer(columnas)])
+            partes.append(parte.to_csv(index=False, header=i == 0).encode("utf-8"))
+
+        if not len(pos):
+            partes.append(",".join(columnas).encode("utf-8") + b"\n")
+
+        return b"".join(partes)
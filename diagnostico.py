@@ -0,0 +1,244 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+import pandas as pd
+
+from almacen import CACHE_DIR
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# =========================================================
+# Diagnóstico de rendimiento
+#
+# Cada etapa de un rerun (carga, construcción de índices, cada agregado
+# del panel, gráficos y tablas) se mide con
+#
+#   with medir("embudo", entrada=df) as m:
+#       ...
+#       m.salida(resultado)
+#
+# y queda como un registro: tiempo, filas de entrada y salida, bytes del
+# resultado, RSS y, si está activado tracemalloc, bytes asignados. Los
+# registros se acumulan en el Diagnostico del rerun (para el panel de la
+# app) y se escriben como JSON por línea en LOG_PATH, con rotación.
+#
+# El Diagnostico activo es por hilo: Streamlit ejecuta cada sesión en su
+# propio hilo, así el código compartido (CacheAgregados) mide sin recibirlo.
+# =========================================================
+LOG_PATH = os.path.join(CACHE_DIR, "diagnostico.jsonl")
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_RESPALDOS = 3
+
+
+def tamano(valor):
+    """
+    Bytes aproximados de un resultado (DataFrame, Series, arreglos o
+    contenedores de ellos). Los objetos que guardan arreglos (por ejemplo
+    AcumuladoHora) informan su tamaño con una propiedad `nbytes`.
+    """
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        uso = valor.memory_usage(index=True, deep=True)
+        return int(uso.sum()) if isinstance(uso, pd.Series) else int(uso)
+    if isinstance(getattr(valor, "nbytes", None), int):
+        return int(valor.nbytes)
+    if isinstance(valor, (tuple, list)):
+        return sys.getsizeof(valor) + sum(tamano(v) for v in valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamano(v) for v in valor.values())
+    return sys.getsizeof(valor)
+
+
+def rss_mb():
+    """RSS actual del proceso en MB (None si la plataforma no lo expone)."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 2**20
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _filas(valor):
+    try:
+        return len(valor)
+    except TypeError:
+        return None
+
+
+_loggers = {}
+_loggers_lock = threading.Lock()
+
+
+def _logger(path):
+    with _loggers_lock:
+        if path not in _loggers:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            logger = logging.getLogger(f"diagnostico.{path}")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            manejador = RotatingFileHandler(
+                path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_RESPALDOS, encoding="utf-8"
+            )
+            manejador.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(manejador)
+            _loggers[path] = logger
+        return _loggers[path]
+
+
+def medir_asignaciones(activo):
+    """Activa o desactiva tracemalloc (afecta a todo el proceso y lo hace más lento)."""
+    if activo and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not activo and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+class Medicion:
+    """Lo que el código medido informa de su resultado."""
+
+    def __init__(self):
+        self.filas_salida = None
+        self.bytes_salida = None
+
+    def salida(self, valor):
+        self.filas_salida = _filas(valor)
+        self.bytes_salida = tamano(valor)
+        return valor
+
+
+class Diagnostico:
+    """Registros de las etapas de un rerun de una sesión."""
+
+    def __init__(self, app, sesion=None, log_path=LOG_PATH):
+        self.app = app
+        self.sesion = sesion
+        self.rerun = uuid.uuid4().hex[:8]
+        self.etapas = []
+        self._log = _logger(log_path) if log_path else None
+        self._pila = []
+        self._inicio = time.perf_counter()
+
+    def _registrar(self, registro):
+        registro = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "app": self.app,
+            "sesion": self.sesion,
+            "rerun": self.rerun,
+            **registro,
+        }
+        self.etapas.append(registro)
+        if self._log is not None:
+            self._log.info(json.dumps(registro, ensure_ascii=False, default=str))
+
+    @contextmanager
+    def etapa(self, nombre, entrada=None, **extra):
+        medicion = Medicion()
+        traza = tracemalloc.is_tracing()
+
+        # Con tracemalloc, el pico de la etapa se calcula desde su inicio y
+        # se propaga a la etapa que la contiene
+        marco = {"base": 0, "pico": 0}
+        if traza:
+            en_uso, pico = tracemalloc.get_traced_memory()
+            if self._pila:
+                self._pila[-1]["pico"] = max(self._pila[-1]["pico"], pico)
+            tracemalloc.reset_peak()
+            marco = {"base": en_uso, "pico": en_uso}
+        self._pila.append(marco)
+
+        rss_inicio = rss_mb()
+        inicio = time.perf_counter()
+        try:
+            yield medicion
+        finally:
+            segundos = time.perf_counter() - inicio
+            self._pila.pop()
+
+            asignado = None
+            if traza and tracemalloc.is_tracing():
+                marco["pico"] = max(marco["pico"], tracemalloc.get_traced_memory()[1])
+                asignado = marco["pico"] - marco["base"]
+                if self._pila:
+                    self._pila[-1]["pico"] = max(self._pila[-1]["pico"], marco["pico"])
+
+            rss_fin = rss_mb()
+            self._registrar({
+                "etapa": nombre,
+                "segundos": round(segundos, 6),
+                "filas_entrada": _filas(entrada) if entrada is not None else None,
+                "filas_salida": medicion.filas_salida,
+                "bytes_salida": medicion.bytes_salida,
+                "bytes_asignados": asignado,
+                "rss_mb": None if rss_fin is None else round(rss_fin, 1),
+                "rss_delta_mb": None if rss_inicio is None or rss_fin is None else round(rss_fin - rss_inicio, 1),
+                **extra,
+            })
+
+    def terminar(self):
+        """Registra el tiempo total del rerun (desde que se creó el Diagnostico)."""
+        rss = rss_mb()
+        self._registrar({
+            "etapa": "rerun",
+            "segundos": round(time.perf_counter() - self._inicio, 6),
+            "rss_mb": None if rss is None else round(rss, 1),
+        })
+
+    def tabla(self):
+        """Etapas del rerun como DataFrame, sin las columnas que identifican la sesión."""
+        return pd.DataFrame(self.etapas).drop(columns=["ts", "app", "sesion", "rerun"], errors="ignore")
+
+
+# =========================================================
+# Diagnostico activo del hilo
+# =========================================================
+_local = threading.local()
+
+
+def activar(diagnostico):
+    _local.actual = diagnostico
+    return diagnostico
+
+
+def actual():
+    return getattr(_local, "actual", None)
+
+
+@contextmanager
+def medir(nombre, entrada=None, **extra):
+    """Mide en el Diagnostico activo del hilo; sin uno activo no registra nada."""
+    diagnostico = actual()
+    if diagnostico is None:
+        yield Medicion()
+        return
+    with diagnostico.etapa(nombre, entrada=entrada, **extra) as medicion:
+        yield medicion
+
+
+def leer_log(n=200, log_path=LOG_PATH):
+    """Últimos `n` registros del log (todas las sesiones), como DataFrame."""
+    try:
+        with open(log_path, "r", encoding="utf-8") as f:
+            lineas = deque(f, maxlen=n)
+    except OSError:
+        return pd.DataFrame()
+
+    registros = []
+    for linea in lineas:
+        try:
+            registros.append(json.loads(linea))
+        except ValueError:
+            continue
+    return pd.DataFrame(registros)
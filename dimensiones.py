@@ -0,0 +1,125 @@
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+from ingesta import load_csv
+from almacen import fingerprint
+from esquema import parse_fecha
+
+# =========================================================
+# Enriquecimiento con las tablas de dimensión
+#
+# Reemplaza los cuatro df.merge por búsquedas sobre los valores
+# distintos de cada clave: se resuelve la dimensión sobre unos pocos
+# valores y se reparte a las filas con los códigos de pd.factorize,
+# sin copiar la tabla de hechos en cada unión.
+# =========================================================
+
+# Versión del formato pre-unido; subirla obliga a re-enriquecer al cargar
+ENRIQUECIDO_VERSION = 1
+
+DIM_DIR = "Data"
+
+DIM_ARCHIVOS = {
+    "tipo_contacto": "TipoContacto.csv",
+    "producto": "Producto.csv",
+    "orden_etapa": "Orden etapa.csv",
+    "semana": "Semana.csv",
+}
+
+# dimensión -> (clave en hechos, clave en la dimensión, columnas que aporta)
+UNIONES = {
+    "tipo_contacto": ("CodigoTipoContacto", "CodigoTipoContacto", ["TipoContacto"]),
+    "producto": ("ProductoGestion", "ProductoGestion", ["Producto"]),
+    "orden_etapa": ("Etapa", "Etapa", ["Orden"]),
+    "semana": ("FechaGestion", "fechaGestion", ["DiaSemana", "DiaNombre", "MesDia"]),
+}
+
+# Claves de fecha: en hechos vienen ISO y en Semana.csv como "9/8/2025 0:00"
+CLAVES_FECHA = {"semana"}
+
+# Columnas que agrega el enriquecimiento
+COLUMNAS_DIMENSION = [c for _, _, cols in UNIONES.values() for c in cols]
+
+
+def dim_paths(data_dir=DIM_DIR):
+    return [os.path.join(data_dir, f) for f in DIM_ARCHIVOS.values()]
+
+
+def load_dimensiones(data_dir=DIM_DIR):
+    # Las claves de fecha ("9/8/2025 0:00") se convierten al leer, con formato explícito
+    return {
+        nombre: load_csv(
+            os.path.join(data_dir, archivo),
+            fechas=[UNIONES[nombre][1]] if nombre in CLAVES_FECHA else None,
+        )
+        for nombre, archivo in DIM_ARCHIVOS.items()
+    }
+
+
+def version_dimensiones(data_dir=DIM_DIR):
+    """Identificador del enriquecimiento: versión del formato + huella de las dimensiones."""
+    return f"{ENRIQUECIDO_VERSION}-{fingerprint(dim_paths(data_dir))}"
+
+
+def _lookup(df, clave, dim, clave_dim, columnas, normalizar=None):
+    codigos, valores = pd.factorize(df[clave])
+
+    claves_dim = dim[clave_dim]
+    if normalizar is not None:
+        valores = normalizar(valores)
+        claves_dim = normalizar(claves_dim)
+
+    # Primera fila por clave, como un left join sin duplicar hechos
+    dim = dim.assign(**{clave_dim: claves_dim.to_numpy()})
+    dim = dim.drop_duplicates(clave_dim).set_index(clave_dim)
+    pos = dim.index.get_indexer(valores)
+    encontrados = pos >= 0
+
+    for col in columnas:
+        origen = dim[col].to_numpy()
+        por_valor = np.full(len(valores) + 1, np.nan, dtype=object)
+        por_valor[:-1][encontrados] = origen[pos[encontrados]]
+
+        # El código -1 (clave nula) cae en la última posición: NaN
+        df[col] = pd.Series(por_valor[codigos], index=df.index).infer_objects()
+
+
+def enrich(df, dims):
+    """Agrega a `df` (en el lugar) las columnas de las cuatro dimensiones."""
+    for nombre, (clave, clave_dim, columnas) in UNIONES.items():
+        if clave in df.columns:
+            normalizar = parse_fecha if nombre in CLAVES_FECHA else None
+            _lookup(df, clave, dims[nombre], clave_dim, columnas, normalizar)
+    return df
+
+
+# =========================================================
+# Marca de enriquecimiento junto al archivo de hechos
+# =========================================================
+def _marca_path(path):
+    if os.path.isdir(path):
+        return os.path.join(path, "_enriquecido.json")
+    return path + ".enriquecido.json"
+
+
+def marcar_enriquecido(path, version):
+    tmp = _marca_path(path) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": version}, f)
+    os.replace(tmp, _marca_path(path))
+
+
+def es_enriquecido(path, version=None):
+    """
+    True si `path` ya trae las dimensiones resueltas con esta `version`
+    (con version=None, con cualquiera).
+    """
+    marca = _marca_path(path)
+    if not os.path.exists(marca):
+        return False
+    with open(marca, "r", encoding="utf-8") as f:
+        guardada = json.load(f).get("version")
+    return version is None or guardada == version
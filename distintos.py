@@ -0,0 +1,185 @@
+import numpy as np
+import pandas as pd
+
+# =========================================================
+# Conteo de valores distintos (Operaciones Únicas) sobre el cubo
+#
+# Exacto: las operaciones se codifican como enteros 0..n-1 y se guardan
+# los pares (celda, operación) distintos; una selección marca sus
+# operaciones en un bitmap y se cuentan los bits. Para filtros solo por
+# FechaGestion hay además un bitset empaquetado por partición (día),
+# que se combinan con OR sin recorrer celdas.
+#
+# Aproximado: un HyperLogLog disperso por celda (registro, rho). Las
+# celdas se combinan con max registro a registro, así que sirve para
+# cualquier combinación de filtros; el total y cada partición tienen
+# además sus registros densos ya combinados. Con P_HLL = 12 (4096 registros) el
+# error estándar es 1.04 / sqrt(4096) ~ 1.6 %: en ~95 % de los casos el
+# valor queda dentro de ±3.3 % del exacto.
+# =========================================================
+P_HLL = 12
+ERROR_HLL = 1.04 / np.sqrt(2 ** P_HLL)
+
+MODOS = ("Exacto", "Aproximado")
+
+
+def _bit_length(x):
+    """Largo en bits de cada uint64 (búsqueda binaria vectorizada)."""
+    x = x.copy()
+    n = np.zeros(len(x), dtype=np.int64)
+    for s in (32, 16, 8, 4, 2, 1):
+        alto = x >= (np.uint64(1) << np.uint64(s))
+        n += alto * s
+        x = np.where(alto, x >> np.uint64(s), x)
+    return n + (x > 0)
+
+
+# rho cabe en 6 bits (a lo más 64 - p + 1): (registro, rho) se codifica
+# como un entero y el máximo por registro sale de marcar y buscar la
+# última marca de cada registro, sin np.maximum.at
+_BITS_RHO = 6
+
+
+def _registros_densos(registro, rho, p):
+    """Registros HLL densos (max rho por registro) de entradas dispersas."""
+    marcas = np.zeros((1 << p) << _BITS_RHO, dtype=bool)
+    marcas[(registro.astype(np.int64) << _BITS_RHO) | rho] = True
+    marcas = marcas.reshape(1 << p, 1 << _BITS_RHO)
+
+    ultima = (1 << _BITS_RHO) - 1 - marcas[:, ::-1].argmax(axis=1)
+    return np.where(marcas.any(axis=1), ultima, 0).astype(np.uint8)
+
+
+def _estimar_hll(registros):
+    m = len(registros)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimado = alpha * m * m / np.sum(np.ldexp(1.0, -registros.astype(np.int64)))
+
+    # Corrección de rango chico (linear counting)
+    vacios = int(np.count_nonzero(registros == 0))
+    if estimado <= 2.5 * m and vacios:
+        estimado = m * np.log(m / vacios)
+    return estimado
+
+
+class ContadorDistintos:
+
+    def __init__(self, celda, valores, n_celdas, particion_celda=None, p=P_HLL):
+        """
+        celda: celda del cubo de cada fila; valores: valor a contar por fila
+        (NumeroOperacion); particion_celda: código de partición de cada celda
+        (por ejemplo el día) para los bitsets por partición.
+        """
+        self.n_celdas = n_celdas
+        self.p = p
+
+        op, unicos = pd.factorize(valores)
+        self.n_valores = len(unicos)
+        validas = op >= 0
+        celda, op = celda[validas].astype(np.int64), op[validas].astype(np.int64)
+
+        # ---- exacto: pares (celda, operación) distintos, ordenados por celda
+        # (np.unique sin return_index pasa por una tabla hash, mucho más
+        # lenta que ordenar y quitar repetidos)
+        n = max(self.n_valores, 1)
+        pares = np.sort(celda * n + op)
+        pares = pares[np.r_[True, pares[1:] != pares[:-1]]] if len(pares) else pares
+        self._par_celda = (pares // n).astype(np.int32)
+        self._par_op = (pares % n).astype(np.int32)
+
+        # ---- exacto por partición: un bitset empaquetado por partición
+        self._bitsets = None
+        self.tiene_particiones = particion_celda is not None
+        if self.tiene_particiones:
+            particion_par = particion_celda[self._par_celda]
+            n_part = int(particion_celda.max()) + 1 if len(particion_celda) else 0
+            con_part = particion_par >= 0
+            ops = self._par_op[con_part]
+
+            self._bitsets = np.zeros((n_part, (n + 7) // 8), dtype=np.uint8)
+            np.bitwise_or.at(
+                self._bitsets,
+                (particion_par[con_part], ops >> 3),
+                (0x80 >> (ops & 7)).astype(np.uint8),
+            )
+
+        # ---- aproximado: HLL disperso, máximo rho por (celda, registro)
+        # Enteros se hashean tal cual (mezcla de bits, sin pasar por object)
+        unicos = np.asarray(unicos)
+        if unicos.dtype.kind not in "iu":
+            unicos = unicos.astype(object)
+        hashes = pd.util.hash_array(unicos).astype(np.uint64)
+        h = hashes[self._par_op]
+        resto_bits = 64 - p
+        registro = (h >> np.uint64(resto_bits)).astype(np.int64)
+        resto = h & np.uint64((1 << resto_bits) - 1)
+        rho = (resto_bits - _bit_length(resto) + 1).astype(np.uint8)
+
+        # Ordenadas por celda: las entradas de cada celda son un tramo contiguo
+        clave = self._par_celda.astype(np.int64) * (1 << p) + registro
+        if len(clave):
+            orden = np.lexsort((rho, clave))
+            ultimo = np.r_[clave[orden][1:] != clave[orden][:-1], True]
+            elegidos = orden[ultimo]
+        else:
+            elegidos = np.empty(0, dtype=np.intp)
+
+        self._hll_celda = self._par_celda[elegidos]
+        self._hll_registro = registro[elegidos].astype(np.int32)
+        self._hll_rho = rho[elegidos]
+        self._hll_cortes = np.searchsorted(self._hll_celda, np.arange(n_celdas + 1))
+
+        self._hll_total = _registros_densos(self._hll_registro, self._hll_rho, p)
+
+        # Registros densos por partición, para combinarlos con np.maximum.reduce
+        self._hll_particiones = None
+        if self.tiene_particiones:
+            particion = particion_celda[self._hll_celda]
+            con_part = particion >= 0
+            self._hll_particiones = np.zeros((n_part, 1 << p), dtype=np.uint8)
+            np.maximum.at(
+                self._hll_particiones,
+                (particion[con_part], self._hll_registro[con_part]),
+                self._hll_rho[con_part],
+            )
+
+    def exacto(self, celdas=None):
+        """Distintos exactos en las `celdas` indicadas (None = todas)."""
+        if celdas is None:
+            return self.n_valores
+
+        elegidas = np.zeros(self.n_celdas, dtype=bool)
+        elegidas[celdas] = True
+
+        vistos = np.zeros(self.n_valores, dtype=bool)
+        vistos[self._par_op[elegidas[self._par_celda]]] = True
+        return int(np.count_nonzero(vistos))
+
+    def exacto_particiones(self, particiones):
+        """Distintos exactos en la unión de las particiones indicadas (OR de bitsets)."""
+        if len(particiones) == 0:
+            return 0
+        union = np.bitwise_or.reduce(self._bitsets[particiones], axis=0)
+        return int(np.count_nonzero(np.unpackbits(union)))
+
+    def aproximado(self, celdas=None):
+        """Distintos estimados con HyperLogLog (error estándar ERROR_HLL)."""
+        if celdas is None:
+            return int(round(_estimar_hll(self._hll_total)))
+
+        # Solo las entradas de las celdas elegidas (tramos contiguos)
+        celdas = np.asarray(celdas, dtype=np.int64)
+        inicio = self._hll_cortes[celdas]
+        largo = self._hll_cortes[celdas + 1] - inicio
+        fin = np.cumsum(largo)
+        pos = np.repeat(inicio - (fin - largo), largo) + np.arange(fin[-1] if len(fin) else 0)
+
+        registros = _registros_densos(self._hll_registro[pos], self._hll_rho[pos], self.p)
+        return int(round(_estimar_hll(registros)))
+
+    def aproximado_particiones(self, particiones):
+        """Distintos estimados en la unión de las particiones indicadas."""
+        if len(particiones) == 0:
+            return 0
+        registros = np.maximum.reduce(self._hll_particiones[particiones], axis=0)
+        return int(round(_estimar_hll(registros)))
@@ -0,0 +1,187 @@
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# =========================================================
+# Esquema del dataset de gestiones
+#
+# Dimensiones de baja cardinalidad como category (filtros y groupby
+# comparan códigos enteros) con las categorías en orden alfabético,
+# banderas Es* como int8, Hora como Int8 y fechas como datetime64.
+# Se aplica al leer, antes de cualquier filtro.
+# =========================================================
+CATEGORIAS = [
+    "Gestor",
+    "Supervisor",
+    "Etapa",
+    "Estrategia",
+    "Producto",
+    "ProductoGestion",
+    "TipoContacto",
+    "CodigoTipoContacto",
+    "Respuesta",
+    "codigocanal",
+    "Cedente",
+    "EstadoCompromiso",
+    "DiaSemana",
+    "DiaNombre",
+    "MesDia",
+]
+
+ENTEROS = {
+    "EsCompromiso": "int8",
+    "EsGestor": "int8",
+    "esEfectivo": "int8",
+    "EsContactoDirecto": "int8",
+    "EsContacto": "int8",
+}
+
+# Hora del día (0-23) nullable: una gestión sin hora no se confunde con
+# las de la medianoche ni entra en ningún rango de hora
+HORA_DIA = {"Hora": "Int8"}
+
+FECHAS = ["Fecha", "FechaGestion"]
+
+# Horas del día como segundos desde la medianoche (Int32, nulos como <NA>)
+HORAS = ["HoraGestion"]
+
+# Formatos aceptados, en orden: ISO (SQL Server / Parquet) y d/m/Y de los
+# exportes de Power BI y de Semana.fechaGestion ("9/8/2025 0:00")
+FORMATOS_FECHA = ["ISO8601", "%d/%m/%Y %H:%M", "%d/%m/%Y %H:%M:%S"]
+
+
+def dtypes_lectura(columnas=None):
+    """dtypes para pd.read_csv: las categorías se construyen al parsear."""
+    return {c: "category" for c in CATEGORIAS if columnas is None or c in columnas}
+
+
+def parse_fecha(valores, normalizar=True):
+    """
+    Convierte fechas a datetime64 probando los FORMATOS_FECHA explícitos,
+    sin inferencia. Con normalizar=True se queda solo con el día.
+    """
+    serie = pd.Series(valores)
+    if not pd.api.types.is_datetime64_any_dtype(serie):
+        texto = serie.astype(str)
+        resultado = pd.Series(pd.NaT, index=serie.index, dtype="datetime64[ns]")
+        for formato in FORMATOS_FECHA:
+            faltan = resultado.isna()
+            if not faltan.any():
+                break
+            resultado[faltan] = pd.to_datetime(texto[faltan], format=formato, errors="coerce")
+        serie = resultado
+
+    return serie.dt.normalize() if normalizar else serie
+
+
+def _fecha(serie, normalizar):
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.dt.normalize() if normalizar else serie
+
+    # Las fechas se repiten mucho: se convierten solo los valores distintos
+    codigos, valores = pd.factorize(serie)
+    convertidos = parse_fecha(valores, normalizar).to_numpy()
+    return pd.Series(pd.api.extensions.take(convertidos, codigos, allow_fill=True), index=serie.index)
+
+
+def hora_a_segundos(serie):
+    """
+    Segundos desde la medianoche: acepta enteros (formato actual) y textos
+    "HH:MM:SS" de exportes anteriores, mezclados en la misma columna.
+    """
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.round().astype("Int32")
+
+    # Pocos valores distintos (a lo más 86.400): se convierten solo esos
+    codigos, valores = pd.factorize(serie)
+    texto = pd.Series(valores, dtype=object).astype(str)
+
+    segundos = pd.to_numeric(texto, errors="coerce")
+    faltan = segundos.isna()
+    segundos[faltan] = pd.to_timedelta(texto[faltan], errors="coerce").dt.total_seconds()
+
+    por_valor = segundos.round().astype("Int32").array
+    return pd.Series(pd.api.extensions.take(por_valor, codigos, allow_fill=True), index=serie.index)
+
+
+def formato_hora(serie):
+    """Texto "HH:MM:SS" de una columna de segundos, solo para mostrar."""
+    if not pd.api.types.is_numeric_dtype(serie):
+        return serie
+    h, resto = serie // 3600, serie % 3600
+    texto = (
+        h.astype(str).str.zfill(2)
+        + ":" + (resto // 60).astype(str).str.zfill(2)
+        + ":" + (resto % 60).astype(str).str.zfill(2)
+    )
+    return texto.where(serie.notna())
+
+
+def aplicar_esquema(df):
+    """Fuerza (en el lugar) los tipos del esquema en las columnas presentes."""
+    for col in CATEGORIAS:
+        if col not in df.columns:
+            continue
+        if not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+        elif not df[col].cat.categories.is_monotonic_increasing:
+            # Los diccionarios de Parquet vienen en orden de aparición; el
+            # CSV y los groupby del panel esperan orden alfabético
+            df[col] = df[col].cat.reorder_categories(df[col].cat.categories.sort_values())
+
+    for col, dtype in ENTEROS.items():
+        if col in df.columns and df[col].dtype != dtype:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(dtype)
+
+    for col, dtype in HORA_DIA.items():
+        if col in df.columns and df[col].dtype != dtype:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(dtype)
+
+    for col in FECHAS:
+        if col in df.columns:
+            df[col] = _fecha(df[col], normalizar=col == "FechaGestion")
+
+    for col in HORAS:
+        if col in df.columns and df[col].dtype != "Int32":
+            df[col] = hora_a_segundos(df[col])
+
+    return df
+
+
+def formato_fecha(valor):
+    """Texto de una FechaGestion para los selectbox."""
+    if isinstance(valor, pd.Timestamp):
+        return valor.strftime("%Y-%m-%d")
+    return str(valor)
+
+
+def concat_gestiones(df_list):
+    """
+    pd.concat que conserva las categorías: cada parte trae sus propias
+    categorías y concat las convertiría a texto, así que primero se unifican.
+
+    Se une columna por columna y cada columna se borra de las partes apenas
+    se copia, así el pico es el resultado más una columna y no partes +
+    resultado (las partes quedan vacías).
+    """
+    for col in CATEGORIAS:
+        partes = [d[col] for d in df_list if col in d.columns]
+        if len(partes) < 2 or not all(isinstance(p.dtype, pd.CategoricalDtype) for p in partes):
+            continue
+        categorias = union_categoricals(partes).categories
+        for d in df_list:
+            if col in d.columns:
+                d[col] = d[col].cat.set_categories(categorias)
+
+    columnas = list(dict.fromkeys(c for d in df_list for c in d.columns))
+    vacia = pd.DataFrame(columns=columnas)
+    unidas = {}
+    for col in columnas:
+        unidas[col] = pd.concat(
+            [d[col] if col in d.columns else vacia[col].reindex(range(len(d))) for d in df_list],
+            ignore_index=True,
+        )
+        for d in df_list:
+            if col in d.columns:
+                del d[col]
+
+    return pd.DataFrame(unidas, columns=columnas, copy=False)
@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+
+# =========================================================
+# Motor de filtros del panel
+#
+# Índice invertido sobre las dimensiones de filtro: para cada valor
+# de cada columna se guardan las posiciones de sus filas, ordenadas.
+# Una selección parte de la lista más corta y la va intersectando con
+# los códigos de las demás columnas (y con el rango de Hora), así el
+# costo depende de cuántas filas calzan y no del tamaño del DataFrame.
+# Sin filtros activos se devuelve el mismo DataFrame, sin copiarlo.
+# =========================================================
+
+# Valores de los selectbox que significan "sin filtro"
+TODOS = ("Todas", "Todos")
+
+# Hora de las gestiones sin hora: queda fuera de cualquier rango
+SIN_HORA = -1
+
+COLUMNAS_FILTRO = [
+    "FechaGestion",
+    "Supervisor",
+    "Gestor",
+    "Etapa",
+    "Estrategia",
+    "Producto",
+    "Robot",
+]
+
+
+def normalizar_seleccion(seleccion):
+    """Deja solo los filtros activos: {columna: valor}."""
+    return {
+        col: valor
+        for col, valor in seleccion.items()
+        if valor is not None and not (isinstance(valor, str) and valor in TODOS)
+    }
+
+
+class FilterEngine:
+
+    def __init__(self, df, columnas=COLUMNAS_FILTRO, columna_hora="Hora"):
+        self.n = len(df)
+        self._codigos = {}
+        self._valores = {}
+        self._listas = {}
+
+        for col in columnas:
+            if col not in df.columns:
+                continue
+            codigos, valores = pd.factorize(df[col])
+            codigos = codigos.astype(np.int32)
+
+            # Posiciones agrupadas por código; dentro de cada código, en orden de fila
+            orden = np.argsort(codigos, kind="stable")
+            cortes = np.searchsorted(codigos[orden], np.arange(len(valores) + 1))
+
+            self._codigos[col] = codigos
+            self._valores[col] = {v: i for i, v in enumerate(valores)}
+            self._listas[col] = (orden, cortes)
+
+        # Hora: filas ordenadas por hora, un rango es un tramo contiguo
+        self._hora = None
+        if columna_hora in df.columns:
+            self._hora = df[columna_hora].to_numpy(dtype=np.int8, na_value=SIN_HORA)
+        if self._hora is not None:
+            self._orden_hora = np.argsort(self._hora, kind="stable")
+            self._hora_ordenada = self._hora[self._orden_hora]
+
+    def _lista(self, col, codigo):
+        orden, cortes = self._listas[col]
+        return orden[cortes[codigo]:cortes[codigo + 1]]
+
+    def rango_activo(self, hora):
+        if hora is None or self._hora is None or self.n == 0:
+            return False
+        desde, hasta = hora
+        return desde > self._hora_ordenada[0] or hasta < self._hora_ordenada[-1]
+
+    def indices(self, seleccion, hora=None):
+        """
+        Posiciones (ordenadas) de las filas que cumplen la selección y el
+        rango `hora=(desde, hasta)`, o None si no hay ningún filtro activo.
+        """
+        filtros = []
+        for col, valor in normalizar_seleccion(seleccion).items():
+            codigo = self._valores[col].get(valor)
+            if codigo is None:
+                return np.empty(0, dtype=np.intp)
+            filtros.append((col, codigo))
+
+        con_hora = self.rango_activo(hora)
+
+        if not filtros:
+            if not con_hora:
+                return None
+            desde, hasta = hora
+            lo = np.searchsorted(self._hora_ordenada, desde, side="left")
+            hi = np.searchsorted(self._hora_ordenada, hasta, side="right")
+
+            # Tramos grandes: recorrer la columna int8 sale más barato que ordenar
+            if hi - lo > self.n // 8:
+                return np.flatnonzero((self._hora >= desde) & (self._hora <= hasta))
+            return np.sort(self._orden_hora[lo:hi])
+
+        # Se parte de la lista más corta y se filtra con los códigos del resto
+        filtros.sort(key=lambda f: len(self._lista(*f)))
+        col, codigo = filtros[0]
+        pos = self._lista(col, codigo)
+
+        for col, codigo in filtros[1:]:
+            pos = pos[self._codigos[col][pos] == codigo]
+
+        if con_hora:
+            desde, hasta = hora
+            h = self._hora[pos]
+            pos = pos[(h >= desde) & (h <= hasta)]
+
+        return pos
+
+    def apply(self, df, seleccion, hora=None):
+        """Filas de `df` que cumplen la selección (el mismo `df` si no hay filtros)."""
+        idx = self.indices(seleccion, hora)
+        return df if idx is None else df.take(idx)
+
+
+# =========================================================
+# Opciones de los selectbox
+#
+# Dominios de cada columna de filtro, ordenados, calculados una vez por
+# versión de datos (sobre las celdas del cubo, no sobre las filas; las
+# columnas que no están en el cubo, sobre las filas) y compartidos por
+# todas las pestañas. Las columnas de JERARQUIAS se acotan al valor
+# elegido en su columna padre.
+# =========================================================
+
+# hijo -> padre
+JERARQUIAS = {"Gestor": "Supervisor"}
+
+
+class Dominios:
+
+    def __init__(self, df, columnas=COLUMNAS_FILTRO, jerarquias=JERARQUIAS, filas=None):
+        """Las columnas que no están en `df` se toman de `filas`, si se da."""
+        self._opciones = {
+            col: sorted(df[col].dropna().unique()) for col in columnas if col in df.columns
+        }
+        if filas is not None:
+            self._opciones.update({
+                col: sorted(filas[col].dropna().unique())
+                for col in columnas if col not in df.columns and col in filas.columns
+            })
+
+        self._por_padre = {}
+        for hijo, padre in jerarquias.items():
+            if hijo not in df.columns or padre not in df.columns:
+                continue
+            pares = df[[padre, hijo]].dropna().drop_duplicates()
+            self._por_padre[hijo] = (
+                padre,
+                {valor: sorted(g) for valor, g in pares.groupby(padre, observed=True)[hijo]},
+            )
+
+    def opciones(self, col, seleccion=None):
+        """Valores posibles de `col`, acotados por el padre elegido en `seleccion`."""
+        if seleccion and col in self._por_padre:
+            padre, hijos = self._por_padre[col]
+            valor = normalizar_seleccion(seleccion).get(padre)
+            if valor is not None:
+                return hijos.get(valor, [])
+        return self._opciones.get(col, [])
@@ -0,0 +1,242 @@
+import codecs
+import csv
+import glob
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+
+from esquema import concat_gestiones, FORMATOS_FECHA
+
+
+# =========================================================
+# Lectura rápida de CSV
+#
+# El formato de cada archivo (separador, codificación, BOM y encabezado)
+# se detecta una vez sobre los primeros bytes y se guarda al lado en
+# <archivo>.formato.json; mientras el archivo no cambie (tamaño y mtime)
+# no se vuelve a detectar. El parseo lo hace pyarrow (multihilo), solo
+# con las columnas pedidas, las categorías como diccionario y las fechas
+# con formatos explícitos. Si pyarrow no puede con el archivo se cae al
+# parser C de pandas. Si el archivo resulta no ser utf-8 más allá de la
+# muestra, se vuelve a leer como latin-1 y se corrige el sidecar.
+# =========================================================
+SUFIJO_FORMATO = ".formato.json"
+SEPARADORES = [";", ",", "\t", "|"]
+MUESTRA_BYTES = 64 * 1024
+
+# FORMATOS_FECHA en la sintaxis de pyarrow
+PARSERS_FECHA = [pv.ISO8601 if f == "ISO8601" else f for f in FORMATOS_FECHA]
+
+
+def _limpiar_columna(nombre):
+    # BOM leído como latin-1 ("ï»¿") o como utf-8, espacios
+    return nombre.replace("ï»¿", "").replace("\ufeff", "").strip()
+
+
+def detectar_formato(path, encoding=None):
+    """
+    {"sep", "encoding", "bom", "columnas"} del archivo. Las columnas son las
+    del encabezado tal cual (sin limpiar). Usa el sidecar si sigue vigente;
+    con `encoding` se fuerza la codificación y se reescribe el sidecar.
+    """
+    info = os.stat(path)
+    firma = [info.st_size, info.st_mtime_ns]
+    sidecar = path + SUFIJO_FORMATO
+
+    if encoding is None:
+        try:
+            with open(sidecar, "r", encoding="utf-8") as f:
+                formato = json.load(f)
+            if formato.get("firma") == firma:
+                return formato
+        except (OSError, ValueError):
+            pass
+
+    with open(path, "rb") as f:
+        muestra = f.read(MUESTRA_BYTES)
+
+    bom = muestra.startswith(codecs.BOM_UTF8)
+
+    # utf-8 si la muestra lo es (el último carácter puede venir cortado);
+    # si después aparece texto que no lo es, load_csv corrige a latin-1
+    if encoding is None:
+        try:
+            codecs.getincrementaldecoder("utf-8")().decode(muestra)
+            encoding = "utf-8"
+        except UnicodeDecodeError:
+            encoding = "latin-1"
+
+    texto = muestra.decode(encoding, errors="ignore").lstrip("\ufeff")
+    encabezado = texto.splitlines()[0] if texto else ""
+
+    # El separador es el que más se repite en el encabezado
+    sep = max(SEPARADORES, key=encabezado.count)
+    if not encabezado.count(sep):
+        sep = ";"
+
+    formato = {
+        "firma": firma,
+        "sep": sep,
+        "encoding": encoding,
+        "bom": bom,
+        "columnas": next(csv.reader([encabezado], delimiter=sep), []),
+    }
+
+    try:
+        tmp = sidecar + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(formato, f)
+        os.replace(tmp, sidecar)
+    except OSError:
+        # Carpeta de solo lectura: se detecta en cada carga
+        pass
+
+    return formato
+
+
+def _leer_arrow(path, formato, dtype, usecols, fechas):
+    crudas = {_limpiar_columna(c): c for c in formato["columnas"]}
+
+    incluir = None
+    if usecols is not None:
+        incluir = [crudas[c] for c in usecols if c in crudas]
+
+    tipos = {
+        crudas[c]: pa.dictionary(pa.int32(), pa.string())
+        for c, t in (dtype or {}).items()
+        if c in crudas and t == "category"
+    }
+    tipos.update({crudas[c]: pa.timestamp("ns") for c in fechas or () if c in crudas})
+
+    lectura = pv.ReadOptions(encoding=formato["encoding"])
+    parseo = pv.ParseOptions(delimiter=formato["sep"])
+
+    def conversion():
+        return pv.ConvertOptions(
+            column_types=tipos,
+            include_columns=incluir,
+            strings_can_be_null=True,
+            timestamp_parsers=PARSERS_FECHA,
+        )
+
+    # pyarrow infiere horas y fechas que pandas deja como texto
+    # (HoraGestion): las que no se pidieron como fecha se leen como texto
+    with pv.open_csv(path, read_options=lectura, parse_options=parseo, convert_options=conversion()) as lector:
+        for campo in lector.schema:
+            if pa.types.is_temporal(campo.type) and campo.name not in tipos:
+                tipos[campo.name] = pa.string()
+
+    try:
+        tabla = pv.read_csv(path, read_options=lectura, parse_options=parseo, convert_options=conversion())
+    except pa.ArrowInvalid as e:
+        if "UTF8" not in str(e):
+            raise
+        raise UnicodeDecodeError(formato["encoding"], b"", 0, 1, str(e)) from e
+
+    # Sin tipo pedido, pyarrow deja como binario el texto que no es utf-8
+    binarias = [c.name for c in tabla.schema if pa.types.is_binary(c.type)]
+    if binarias:
+        raise UnicodeDecodeError(formato["encoding"], b"", 0, 1, f"texto no utf-8 en {binarias}")
+
+    # Un bloque por columna (las partes de load_shards se liberan columna a
+    # columna) y cada columna Arrow se suelta apenas se convierte
+    df = tabla.to_pandas(split_blocks=True, self_destruct=True)
+    del tabla
+
+    # Categorías ordenadas, como las arma pandas con astype("category")
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].cat.reorder_categories(df[col].cat.categories.sort_values())
+
+    return df
+
+
+def _leer_pandas(path, formato, dtype, usecols):
+    crudas = {_limpiar_columna(c): c for c in formato["columnas"]}
+    pedidas = None if usecols is None else {crudas[c] for c in usecols if c in crudas}
+
+    return pd.read_csv(
+        path,
+        sep=formato["sep"],
+        encoding=formato["encoding"],
+        usecols=None if pedidas is None else (lambda c: c in pedidas),
+        dtype={crudas.get(c, c): t for c, t in (dtype or {}).items()},
+    )
+
+
+def _leer(path, formato, dtype, usecols, fechas):
+    """(DataFrame, tipos que faltan aplicar). Los errores de codificación se propagan."""
+    try:
+        df = _leer_arrow(path, formato, dtype, usecols, fechas)
+        return df, {c: t for c, t in (dtype or {}).items() if t != "category"}
+    except UnicodeDecodeError:
+        raise
+    except pa.ArrowException:
+        # Filas irregulares o formatos de fecha fuera de lista: parser de pandas
+        return _leer_pandas(path, formato, dtype, usecols), {}
+
+
+# =========================================================
+# Función robusta para cargar y limpiar CSVs
+# =========================================================
+def load_csv(path, dtype=None, usecols=None, fechas=None):
+    """
+    Lee un CSV detectando su formato. `usecols` y las claves de `dtype`
+    usan los nombres limpios (sin BOM); `fechas` son columnas que se
+    convierten a datetime con FORMATOS_FECHA al parsear.
+    """
+    formato = detectar_formato(path)
+
+    try:
+        df, tipos = _leer(path, formato, dtype, usecols, fechas)
+    except UnicodeDecodeError:
+        if formato["encoding"] == "latin-1":
+            raise
+        # Texto latin-1 después de la muestra: todo el archivo como latin-1
+        formato = detectar_formato(path, encoding="latin-1")
+        df, tipos = _leer(path, formato, dtype, usecols, fechas)
+
+    # limpiar BOM, espacios, caracteres invisibles
+    df.columns = [_limpiar_columna(c) for c in df.columns]
+
+    tipos = {c: t for c, t in tipos.items() if c in df.columns}
+    return df.astype(tipos) if tipos else df
+
+
+# =========================================================
+# Carga en paralelo de archivos partidos (Gestion_part1..N.csv)
+# =========================================================
+def _orden_natural(path):
+    # Gestion_part10 va después de Gestion_part9
+    return [int(t) if t.isdigit() else t for t in re.split(r"(\d+)", path)]
+
+
+def list_shards(patron):
+    return sorted(glob.glob(patron), key=_orden_natural)
+
+
+def load_shards(patron, dtype=None, usecols=None, fechas=None, max_workers=None):
+    """
+    Lee en paralelo todos los archivos que calzan con `patron` y los une en
+    un solo DataFrame. Unir las partes cuesta una columna más que el
+    resultado (ver esquema.concat_gestiones); el pico de memoria lo pone el
+    parseo, hasta `max_workers` archivos a la vez.
+    """
+    archivos = list_shards(patron)
+    if not archivos:
+        raise FileNotFoundError(f"No hay archivos que coincidan con {patron}")
+
+    workers = max_workers or min(len(archivos), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        partes = list(
+            pool.map(lambda f: load_csv(f, dtype=dtype, usecols=usecols, fechas=fechas), archivos)
+        )
+
+    df = concat_gestiones(partes)
+    partes.clear()
+    return df
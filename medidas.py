@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+# =========================================================
+# Campos calculados y medidas del panel
+#
+# Los campos calculados (como en el modelo DAX de Power BI) se definen
+# una sola vez y se evalúan vectorizados; app.py y app2.py usan la misma
+# definición. Las medidas del panel (Gestiones, CD, Contacto, ...) no
+# son columnas: son alias de una bandera o el conteo de filas, y se
+# resuelven al agregar.
+# =========================================================
+
+
+def _es_contacto_directo(codigo):
+    return (codigo == "TIPRESCDIRE").astype("int8")
+
+
+def _es_contacto(codigo):
+    return (codigo != "TIPRESNCON").astype("int8")
+
+
+def _robot(es_gestor):
+    # Categoría de dos valores a partir de los códigos, sin apply fila a fila
+    codigos = (es_gestor.to_numpy() != 1).astype("int8")
+    return pd.Categorical.from_codes(codigos, categories=["GESTOR", "GESTOR_"])
+
+
+# campo -> (columna de origen, función vectorizada)
+CALCULADOS = {
+    "EsContactoDirecto": ("CodigoTipoContacto", _es_contacto_directo),
+    "EsContacto": ("CodigoTipoContacto", _es_contacto),
+    "Robot": ("EsGestor", _robot),
+}
+
+# Medida que cuenta filas
+CONTEO = "Gestiones"
+
+# medida -> columna que suma
+ALIAS = {
+    "CD": "EsContactoDirecto",
+    "Contacto": "EsContacto",
+    "ContactoDirecto": "EsContactoDirecto",
+    "Compromisos": "EsCompromiso",
+}
+
+
+def calcular_campos(df):
+    """Agrega (en el lugar) los CALCULADOS cuya columna de origen está en `df`."""
+    for campo, (origen, funcion) in CALCULADOS.items():
+        if origen in df.columns:
+            df[campo] = funcion(df[origen])
+    return df
+
+
+def tiene_medida(df, nombre):
+    return nombre == CONTEO or ALIAS.get(nombre, nombre) in df.columns
+
+
+def medida(df, nombre):
+    """Valores por fila de una medida (alias o conteo) como array numérico."""
+    if nombre == CONTEO:
+        return np.ones(len(df), dtype=np.int8)
+    return df[ALIAS.get(nombre, nombre)].to_numpy()
+
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from agregados import CacheAgregados
+from cubo import AcumuladoHora
+from diagnostico import tamano
+
+
+def contador(valor):
+    llamadas = []
+
+    def calcular():
+        llamadas.append(1)
+        return valor
+
+    return calcular, llamadas
+
+
+def test_none_se_guarda():
+    memo = CacheAgregados()
+    calcular, llamadas = contador(None)
+
+    assert memo.obtener("vacio", 1, calcular, {"Gestor": "GESTOR 001"}) is None
+    assert memo.obtener("vacio", 1, calcular, {"Gestor": "GESTOR 001"}) is None
+    assert len(llamadas) == 1
+    assert (memo.aciertos, memo.fallos) == (1, 1)
+
+
+def test_tamano_acumulado_hora():
+    acumulado = AcumuladoHora(
+        ["Gestiones"], np.zeros(24, dtype=np.int64), np.zeros((25, 1), dtype=np.int64), np.zeros(1, dtype=np.int64)
+    )
+    assert tamano(acumulado) == acumulado.nbytes == (24 + 25 + 1) * 8
+    assert tamano(np.zeros(10, dtype=np.int32)) == 40
+
+
+def test_tope_cuenta_los_arreglos():
+    # Cada acumulado pesa ~8 MB: con tope de 20 MB caben dos
+    memo = CacheAgregados(max_bytes=20 * 2**20)
+    for i in range(3):
+        memo.obtener(
+            "por_hora", 1,
+            lambda: AcumuladoHora(["Gestiones"], np.zeros(24), np.zeros((2**20, 1)), np.zeros(1)),
+            {"Gestor": f"GESTOR {i}"},
+        )
+
+    assert len(memo._datos) == 2
+    assert memo._bytes == sum(b for _, b in memo._datos.values()) <= memo.max_bytes
+
+
+def test_tamano_contenedores():
+    serie = pd.Series([1, 2, 3], dtype=np.int64)
+    assert tamano((serie, np.zeros(4))) > tamano(serie) + 32
@@ -0,0 +1,62 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from almacen import DiskCache, list_partitions, read_partitions, write_partitions
+
+
+def _gestiones(fechas, n=3):
+    return pd.DataFrame({
+        "FechaGestion": pd.to_datetime([f for f in fechas for _ in range(n)]),
+        "NumeroOperacion": range(n * len(fechas)),
+        "Gestor": ["A", "B", "C"][:n] * len(fechas),
+    })
+
+
+def test_ignora_tmp_old_y_staging(tmp_path):
+    base = str(tmp_path / "gestiones")
+    write_partitions(_gestiones(["2025-11-20", "2025-11-21"]), base)
+
+    # Un .parquet.tmp a medio escribir (o de un corte) dentro de la partición
+    carpeta = os.path.join(base, "FechaGestion=2025-11-20")
+    with open(os.path.join(carpeta, "part-x.parquet.tmp"), "wb") as f:
+        f.write(b"PAR1 incompleto")
+
+    # La carpeta .old que replace_partitions no pudo borrar, y un staging
+    shutil.copytree(carpeta, carpeta + ".old")
+    shutil.copytree(carpeta, os.path.join(base, "FechaGestion=2025-11-20.staging-1"))
+
+    assert list_partitions(base) == ["2025-11-20", "2025-11-21"]
+
+    df = read_partitions(base, categorias=["Gestor"])
+    assert len(df) == 6
+    assert sorted(df["FechaGestion"].unique()) == ["2025-11-20", "2025-11-21"]
+
+    solo = read_partitions(base, fechas=["2025-11-21"], columns=["NumeroOperacion", "FechaGestion"])
+    assert sorted(solo["NumeroOperacion"]) == [3, 4, 5]
+    assert set(solo["FechaGestion"]) == {"2025-11-21"}
+
+
+def test_almacen_vacio(tmp_path):
+    assert list_partitions(str(tmp_path)) == []
+    assert read_partitions(str(tmp_path), columns=["Gestor"]).empty
+
+
+def test_disk_cache_objetos(tmp_path):
+    cache = DiskCache("gestiones", cache_dir=str(tmp_path), max_versiones=1)
+    cache.put("v1", _gestiones(["2025-11-20"]))
+    objeto = {"codigos": np.arange(10, dtype=np.int32), "cortes": (np.zeros(3), "texto")}
+    cache.put_objeto("v1", "motor", objeto)
+
+    leido = cache.get_objeto("v1", "motor")
+    assert np.array_equal(leido["codigos"], objeto["codigos"]) and leido["cortes"][1] == "texto"
+    # Vistas de solo lectura sobre el archivo mapeado
+    assert not leido["codigos"].flags.writeable
+    assert leido["codigos"].ctypes.data % 64 == leido["cortes"][0].ctypes.data % 64 == 0
+    assert cache.get_objeto("v1", "cubo") is None
+
+    # Una versión nueva desaloja la vieja con sus objetos
+    cache.put("v2", _gestiones(["2025-11-21"]))
+    assert not cache.existe("v1") and not cache.existe_objeto("v1", "motor")
@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from almacen import DiskCache
+from benchmarks.bench_panel import cargar
+from benchmarks.generador import escribir_dataset
+from cubo import SUBCUBOS, Cubo
+from distintos import ERROR_HLL
+from filtros import COLUMNAS_FILTRO, normalizar_seleccion
+from medidas import medida
+
+# Equivalencia del cubo con el camino anterior: filtrar las filas y
+# agrupar (groupby / pivot_table / nunique) sobre el resultado.
+
+
+@pytest.fixture(scope="module")
+def df(tmp_path_factory):
+    destino = tmp_path_factory.mktemp("gestiones")
+    almacen, dim_dir = escribir_dataset(str(destino), 20_000, semilla=3, dias=10)
+    df = cargar(almacen, dim_dir)
+
+    # Nulos en las dimensiones, la hora y la operación, como en los datos reales
+    rng = np.random.default_rng(3)
+    df.loc[rng.random(len(df)) < 0.01, "Gestor"] = np.nan
+    df.loc[rng.random(len(df)) < 0.01, "Hora"] = pd.NA
+    df.loc[rng.random(len(df)) < 0.01, "NumeroOperacion"] = np.nan
+    return df
+
+
+@pytest.fixture(scope="module")
+def cubo(df):
+    return Cubo(df)
+
+
+def selecciones(df, n=25, semilla=11):
+    rng = np.random.default_rng(semilla)
+    columnas = [c for c in COLUMNAS_FILTRO if c in df.columns]
+    resultado = [{}, {"Gestor": "NO EXISTE"}]
+    for _ in range(n):
+        elegidas = rng.choice(columnas, size=rng.integers(1, 4), replace=False)
+        resultado.append({c: rng.choice(df[c].dropna().unique()) for c in elegidas})
+    return resultado
+
+
+def filas(df, seleccion, hora=None):
+    mascara = np.ones(len(df), dtype=bool)
+    for col, valor in normalizar_seleccion(seleccion).items():
+        mascara &= (df[col] == valor).to_numpy(dtype=bool, na_value=False)
+    if hora is not None:
+        desde, hasta = hora
+        mascara &= ((df["Hora"] >= desde) & (df["Hora"] <= hasta)).to_numpy(dtype=bool, na_value=False)
+    return df[mascara]
+
+
+def totales(parte, medidas):
+    return pd.Series({m: int(medida(parte, m).sum()) for m in medidas}, dtype=np.int64)
+
+
+RANGOS = [None, (9, 15), (0, 23), (12, 12)]
+
+
+@pytest.mark.parametrize("hora", RANGOS)
+def test_totales(df, cubo, hora):
+    for sel in selecciones(df):
+        esperado = totales(filas(df, sel, hora), cubo.medidas)
+        pd.testing.assert_series_equal(cubo.totales(sel, hora=hora), esperado, check_names=False)
+
+
+@pytest.mark.parametrize("hora", RANGOS)
+def test_rollup(df, cubo, hora):
+    for sel in selecciones(df, n=10):
+        parte = filas(df, sel, hora)
+        esperado = (
+            parte.assign(**{m: medida(parte, m) for m in cubo.medidas})
+            .groupby("Gestor", observed=True)
+            .agg(**{m: (m, "sum") for m in cubo.medidas}, PrimeraHora=("HoraGestion", "min"))
+            .reset_index()
+        )
+        obtenido = cubo.rollup(sel, "Gestor", hora=hora)
+
+        assert obtenido["Gestor"].astype(str).tolist() == esperado["Gestor"].astype(str).tolist()
+        for m in cubo.medidas:
+            assert obtenido[m].tolist() == esperado[m].astype(np.int64).tolist()
+        assert obtenido["PrimeraHora"].astype("Int64").tolist() == esperado["PrimeraHora"].astype("Int64").tolist()
+
+
+def test_pivot(df, cubo):
+    for sel in selecciones(df, n=10):
+        esperado = pd.pivot_table(
+            filas(df, sel).assign(Gestiones=1), index="Gestor", columns="Hora", values="Gestiones",
+            aggfunc="sum", fill_value=0, observed=True,
+        )
+        obtenido = cubo.pivot(sel, index="Gestor", columns="Hora")
+        pd.testing.assert_frame_equal(obtenido, esperado, check_dtype=False, check_names=False,
+                                      check_index_type=False, check_column_type=False)
+
+
+@pytest.mark.parametrize("hora", [None, (9, 15)])
+def test_operaciones_unicas(df, cubo, hora):
+    for sel in selecciones(df) + [{"FechaGestion": df["FechaGestion"].iloc[0]}]:
+        esperado = filas(df, sel, hora)["NumeroOperacion"].nunique()
+        assert cubo.operaciones_unicas(sel, hora=hora) == esperado
+
+        aproximado = cubo.operaciones_unicas(sel, hora=hora, modo="Aproximado")
+        assert abs(aproximado - esperado) <= max(5 * ERROR_HLL * esperado, 3)
+
+
+def test_dataset_vacio(df):
+    cubo = Cubo(df.iloc[:0])
+
+    assert cubo.totales({}).tolist() == [0] * len(cubo.medidas)
+    assert cubo.totales({"Gestor": "GESTOR 001"}, hora=(9, 15)).sum() == 0
+    assert cubo.operaciones_unicas({}) == 0
+    assert cubo.operaciones_unicas({}, modo="Aproximado") == 0
+    assert cubo.rollup({}, "Gestor").empty
+    assert cubo.por_hora({}).extremos() == (0, 23)
+
+
+def test_operaciones_todas_nulas(df):
+    cubo = Cubo(df.assign(NumeroOperacion=np.nan))
+    gestor = df["Gestor"].dropna().iloc[0]
+
+    assert cubo.totales({})["Gestiones"] == len(df)
+    for modo in ("Exacto", "Aproximado"):
+        assert cubo.operaciones_unicas({}, modo=modo) == 0
+        assert cubo.operaciones_unicas({"Gestor": gestor}, hora=(9, 15), modo=modo) == 0
+        assert cubo.operaciones_unicas({"FechaGestion": df["FechaGestion"].iloc[0]}, modo=modo) == 0
+
+
+def test_subcubos(df):
+    cubo = Cubo(df)
+    assert {"Etapa", "Estrategia", "Producto", "Robot"} <= set(cubo.filtros_filas)
+    assert not set(cubo.filtros_filas) & set(cubo.celdas.columns)
+
+    # Los filtros fuera del grano arman un subcubo por selección, y se reusa
+    etapas = df["Etapa"].dropna().unique()
+    sel = {"Etapa": etapas[0], "Gestor": df["Gestor"].dropna().iloc[0]}
+    assert cubo._resolver(sel)[0] is cubo._resolver(dict(sel))[0]
+    assert cubo._resolver({"Gestor": sel["Gestor"]})[0] is cubo
+
+    for etapa in etapas:
+        for producto in df["Producto"].dropna().unique()[:5]:
+            cubo.totales({"Etapa": etapa, "Producto": producto})
+    assert len(cubo._subcubos) == SUBCUBOS
+
+
+def test_cubo_de_la_cache_en_disco(df, cubo, tmp_path):
+    cache = DiskCache("gestiones", cache_dir=str(tmp_path))
+    cache.put_objeto("v1", "cubo", Cubo(df))
+
+    # Sin sus filas no puede armar subcubos
+    leido = cache.get_objeto("v1", "cubo")
+    with pytest.raises(RuntimeError):
+        leido.totales({"Etapa": df["Etapa"].dropna().iloc[0]})
+
+    leido.enlazar(df)
+    for sel in selecciones(df, n=10):
+        assert leido.totales(sel, hora=(9, 15)).equals(cubo.totales(sel, hora=(9, 15)))
+        assert leido.operaciones_unicas(sel) == cubo.operaciones_unicas(sel)
+
+
+# Sliders de hora: AcumuladoHora contra el filtro de filas, con rangos
+# invertidos (desde > hasta) o fuera de 0-23
+def rangos_hora(n=30, semilla=5):
+    rng = np.random.default_rng(semilla)
+    fijos = [(15, 9), (-5, 3), (20, 40), (-10, -1), (24, 30), (23, 23), (-100, 100)]
+    return fijos + [tuple(int(h) for h in rng.integers(-3, 27, 2)) for _ in range(n)]
+
+
+def test_por_hora(df, cubo):
+    for sel in selecciones(df, n=10):
+        acumulado = cubo.por_hora(sel)
+        assert acumulado.totales().tolist() == totales(filas(df, sel), cubo.medidas).tolist()
+        for hora in rangos_hora():
+            esperado = totales(filas(df, sel, hora), cubo.medidas)
+            assert acumulado.totales(hora).tolist() == esperado.tolist(), hora
+            assert cubo.totales(sel, hora=hora).tolist() == esperado.tolist(), hora
+
+
+def test_por_hora_extremos(df, cubo):
+    for sel in selecciones(df):
+        horas = filas(df, sel)["Hora"].dropna()
+        esperado = (int(horas.min()), int(horas.max())) if len(horas) else (0, 23)
+        assert cubo.por_hora(sel).extremos() == esperado
+
+
+def test_por_hora_sin_horas(df):
+    cubo = Cubo(df.assign(Hora=pd.array([pd.NA] * len(df), dtype="Int8")))
+    acumulado = cubo.por_hora({})
+
+    assert acumulado.extremos() == (0, 23)
+    assert acumulado.totales()["Gestiones"] == len(df)
+    assert acumulado.totales((0, 23)).sum() == 0
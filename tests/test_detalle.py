@@ -0,0 +1,32 @@
+import io
+
+import numpy as np
+import pandas as pd
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+from detalle import VistaDetalle
+
+
+def _df():
+    return pd.DataFrame({
+        "Gestor": ["B", "A", "C", "A", "B"],
+        "HoraGestion": pd.array([36000, 30000, None, 30001, 45296], dtype="Int32"),
+    })
+
+
+def test_exportar_csv_lo_acepta_download_button():
+    df = _df()
+    vista = VistaDetalle(df)
+
+    datos = vista.exportar_csv(df, np.array([0, 1, 2, 4]), ["Gestor", "HoraGestion"], lote=2)
+    contenido, _ = convert_data_to_bytes_and_infer_mime(datos, unsupported_error=RuntimeError("no soportado"))
+
+    leido = pd.read_csv(io.BytesIO(contenido), keep_default_na=False)
+    assert leido["Gestor"].tolist() == ["A", "B", "B", "C"]
+    assert leido["HoraGestion"].tolist() == ["08:20:00", "10:00:00", "12:34:56", ""]
+
+
+def test_exportar_csv_sin_filas_trae_encabezado():
+    df = _df()
+    datos = VistaDetalle(df).exportar_csv(df, np.array([], dtype=np.intp), ["Gestor", "HoraGestion"])
+    assert datos == b"Gestor,HoraGestion\n"
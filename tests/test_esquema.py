@@ -0,0 +1,51 @@
+import pandas as pd
+
+from almacen import read_partitions, write_partitions
+from esquema import CATEGORIAS, aplicar_esquema, concat_gestiones, dtypes_lectura
+
+
+def test_categorias_en_orden_alfabetico_en_parquet_y_csv(tmp_path):
+    df = pd.DataFrame({
+        "FechaGestion": pd.to_datetime(["2025-11-20"] * 4),
+        "Gestor": ["GESTOR 106", "GESTOR 202", "GESTOR 001", "GESTOR 000"],
+        "Hora": [9, 10, 11, 12],
+    })
+
+    base = str(tmp_path / "gestiones")
+    write_partitions(df, base)
+    desde_parquet = aplicar_esquema(read_partitions(base, categorias=CATEGORIAS))
+
+    csv = tmp_path / "gestiones.csv"
+    df.to_csv(csv, index=False)
+    desde_csv = aplicar_esquema(pd.read_csv(csv, dtype=dtypes_lectura()))
+
+    esperadas = ["GESTOR 000", "GESTOR 001", "GESTOR 106", "GESTOR 202"]
+    assert list(desde_parquet["Gestor"].cat.categories) == esperadas
+    assert list(desde_csv["Gestor"].cat.categories) == esperadas
+
+
+def test_hora_nula_no_pasa_a_medianoche():
+    df = aplicar_esquema(pd.DataFrame({"Hora": [8, None, 23], "EsCompromiso": [1, None, 0]}))
+
+    assert str(df["Hora"].dtype) == "Int8"
+    assert df["Hora"].isna().tolist() == [False, True, False]
+    # Las banderas sí toman 0 cuando faltan
+    assert df["EsCompromiso"].tolist() == [1, 0, 0]
+
+
+def test_concat_gestiones():
+    partes = [
+        pd.DataFrame({"Gestor": pd.Categorical(["B", "A"]), "Hora": [9, 10], "Observacion": ["x", "y"]}),
+        pd.DataFrame({"Gestor": pd.Categorical(["C"]), "Hora": [11]}),
+    ]
+
+    df = concat_gestiones(partes)
+
+    assert list(df.columns) == ["Gestor", "Hora", "Observacion"]
+    assert list(df["Gestor"].cat.categories) == ["A", "B", "C"]
+    assert df["Gestor"].tolist() == ["B", "A", "C"]
+    assert df["Hora"].tolist() == [9, 10, 11]
+    assert df["Observacion"].tolist()[:2] == ["x", "y"] and pd.isna(df["Observacion"].iloc[2])
+
+    # Cada columna se suelta de las partes al unirla
+    assert all(p.columns.empty for p in partes)
@@ -0,0 +1,85 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from DatosGestion import export_streaming
+from dimensiones import DIM_DIR, load_dimensiones
+
+QUERY = "select FechaGestion, HoraGestion, NumeroOperacion, CodigoTipoContacto from gestiones order by rowid"
+
+TIPOS = ["TIPRESCDIRE", "TIPRESCINDIR", "TIPRESNCON"]
+
+
+class Cursor(sqlite3.Cursor):
+    """Anota el tamaño de cada lote que devuelve fetchmany."""
+
+    lotes = []
+
+    def fetchmany(self, size=None):
+        filas = super().fetchmany(size)
+        Cursor.lotes.append(len(filas))
+        return filas
+
+
+class Conexion(sqlite3.Connection):
+    def cursor(self, factory=Cursor):
+        return super().cursor(factory)
+
+
+@pytest.fixture
+def conn():
+    Cursor.lotes = []
+    conn = sqlite3.connect(":memory:", factory=Conexion)
+    conn.execute(
+        "create table gestiones (FechaGestion text, HoraGestion integer,"
+        " NumeroOperacion integer, CodigoTipoContacto text)"
+    )
+    conn.executemany(
+        "insert into gestiones values (?, ?, ?, ?)",
+        [("2025-11-20", 30000 + i, i, TIPOS[i % 3]) for i in range(7)],
+    )
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def leer(path):
+    return pd.read_csv(path, encoding="utf-8-sig")
+
+
+def test_csv_por_lotes(conn, tmp_path):
+    salida = str(tmp_path / "gestiones.csv")
+
+    assert export_streaming(conn, QUERY, salida, batch_size=3) == 7
+
+    # Lotes de 3, 3 y 1, y uno vacío que corta
+    assert Cursor.lotes == [3, 3, 1, 0]
+
+    with open(salida, "r", encoding="utf-8-sig") as f:
+        lineas = f.read().splitlines()
+    assert lineas[0] == "FechaGestion,HoraGestion,NumeroOperacion,CodigoTipoContacto"
+    assert lineas.count(lineas[0]) == 1
+    assert leer(salida)["NumeroOperacion"].tolist() == list(range(7))
+
+
+def test_csv_enriquecido(conn, tmp_path):
+    salida = str(tmp_path / "gestiones.csv")
+    dims = load_dimensiones(DIM_DIR)
+
+    assert export_streaming(conn, QUERY, salida, batch_size=2, dims=dims) == 7
+
+    df = leer(salida)
+    assert df["NumeroOperacion"].tolist() == list(range(7))
+    assert {"TipoContacto", "DiaNombre"} <= set(df.columns)
+
+    # Cada lote se enriquece: todas las filas traen su tipo de contacto
+    tipos = dims["tipo_contacto"].set_index("CodigoTipoContacto")["TipoContacto"]
+    assert df["TipoContacto"].tolist() == tipos[df["CodigoTipoContacto"]].tolist()
+
+
+def test_csv_sin_filas(conn, tmp_path):
+    salida = str(tmp_path / "gestiones.csv")
+
+    assert export_streaming(conn, QUERY + " limit 0", salida, batch_size=3) == 0
+    assert leer(salida).columns.tolist() == ["FechaGestion", "HoraGestion", "NumeroOperacion", "CodigoTipoContacto"]
@@ -0,0 +1,171 @@
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import DatosGestion
+from almacen import list_partitions, read_partitions
+from DatosGestion import run_incremental, leer_watermark, SUFIJO_WATERMARK
+from dimensiones import DIM_DIR
+
+# Misma forma que QUERY_INCREMENTAL: parámetros (fecha, fecha, segundos) y
+# orden por fecha y hora (rowid desempata como el orden de llegada)
+QUERY_SQLITE = """
+select FechaGestion, HoraGestion, NumeroOperacion
+from gestiones
+where FechaGestion > ? or (FechaGestion = ? and HoraGestion >= ?)
+order by FechaGestion, HoraGestion, rowid
+"""
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "gestiones.db")
+
+
+@pytest.fixture
+def conn(db):
+    conn = sqlite3.connect(db)
+    conn.execute("create table gestiones (FechaGestion text, HoraGestion integer, NumeroOperacion integer)")
+    yield conn
+    conn.close()
+
+
+def insertar(conn, filas):
+    conn.executemany("insert into gestiones values (?, ?, ?)", filas)
+    conn.commit()
+
+
+def leer(path, formato):
+    if formato == "parquet":
+        df = read_partitions(path)
+        df["FechaGestion"] = pd.to_datetime(df["FechaGestion"]).dt.strftime("%Y-%m-%d")
+        return df
+    return pd.read_csv(path, encoding="utf-8-sig")
+
+
+@pytest.mark.parametrize("formato", ["csv", "parquet"])
+def test_empates_en_el_segundo_de_la_marca(conn, tmp_path, formato):
+    salida = str(tmp_path / ("gestiones.csv" if formato == "csv" else "gestiones"))
+    marca = str(tmp_path / "marca.json")
+
+    def correr():
+        return run_incremental(conn, query=QUERY_SQLITE, output_path=salida, watermark_path=marca,
+                               desde="2025-11-20", formato=formato, dim_dir=None)
+
+    # Tres gestiones en el mismo segundo al final de la primera corrida
+    insertar(conn, [
+        ("2025-11-20", 30000, 1),
+        ("2025-11-20", 36000, 2),
+        ("2025-11-20", 36000, 3),
+        ("2025-11-20", 36000, 4),
+    ])
+    assert correr() == 4
+
+    # Llegan dos más con la misma hora de la marca, y otras posteriores
+    insertar(conn, [
+        ("2025-11-20", 36000, 5),
+        ("2025-11-20", 36000, 6),
+        ("2025-11-20", 40000, 7),
+        ("2025-11-21", 100, 8),
+    ])
+    assert correr() == 4
+
+    # Sin novedades no se duplica nada
+    assert correr() == 0
+
+    insertar(conn, [("2025-11-21", 100, 9)])
+    assert correr() == 1
+
+    df = leer(salida, formato)
+    assert sorted(df["NumeroOperacion"]) == list(range(1, 10))
+
+
+def correr(conn, salida, formato="csv", desde="2025-11-20"):
+    return run_incremental(conn, query=QUERY_SQLITE, output_path=salida,
+                           watermark_path=salida + SUFIJO_WATERMARK,
+                           desde=desde, formato=formato, dim_dir=None)
+
+
+def test_recupera_filas_no_confirmadas(conn, tmp_path):
+    salida = str(tmp_path / "gestiones.csv")
+    insertar(conn, [("2025-11-20", 30000, 1), ("2025-11-20", 36000, 2)])
+    assert correr(conn, salida) == 2
+
+    # Una corrida que escribió filas y se cortó antes de mover la marca
+    with open(salida, "a", encoding="utf-8") as f:
+        f.write("2025-11-20,36000,2\n2025-11-20,40")
+
+    insertar(conn, [("2025-11-20", 40000, 3)])
+    assert correr(conn, salida) == 1
+    assert leer(salida, "csv")["NumeroOperacion"].tolist() == [1, 2, 3]
+
+
+def test_run_query_invalida_la_marca(conn, db, tmp_path, monkeypatch):
+    salida = str(tmp_path / "gestiones.csv")
+    insertar(conn, [("2025-11-20", 30000, 1), ("2025-11-20", 36000, 2)])
+    correr(conn, salida)
+
+    # Exportación completa sobre la misma salida: más corta que la marca
+    monkeypatch.setattr(DatosGestion, "conectar", lambda: sqlite3.connect(db))
+    monkeypatch.setattr(DatosGestion, "QUERY", "select NumeroOperacion from gestiones where NumeroOperacion = 1")
+    monkeypatch.setattr(DatosGestion, "OUTPUT_PATH", salida)
+    monkeypatch.setattr(DatosGestion, "DIM_DIR", DIM_DIR)
+    DatosGestion.run_query("csv")
+
+    assert leer_watermark(salida + SUFIJO_WATERMARK) is None
+    antes = open(salida, "rb").read()
+
+    # Sin marca, no se agrega nada encima de la exportación
+    insertar(conn, [("2025-11-20", 40000, 3)])
+    with pytest.raises(RuntimeError, match="no hay marca de agua"):
+        correr(conn, salida)
+    assert open(salida, "rb").read() == antes
+
+
+def test_no_recorta_un_archivo_ajeno(conn, tmp_path):
+    salida = str(tmp_path / "gestiones.csv")
+    insertar(conn, [("2025-11-20", 30000 + i, i) for i in range(50)])
+    correr(conn, salida)
+
+    # Otro archivo, más largo que lo confirmado, con la marca vieja al lado
+    pd.DataFrame({"FechaGestion": ["2025-11-19"] * 200, "HoraGestion": 0, "NumeroOperacion": 0}).to_csv(
+        salida, index=False
+    )
+    antes = open(salida, "rb").read()
+
+    with pytest.raises(RuntimeError, match="no es el archivo"):
+        correr(conn, salida)
+    assert open(salida, "rb").read() == antes
+
+
+@pytest.mark.parametrize("formato", ["csv", "parquet"])
+def test_salida_sin_marca(conn, tmp_path, formato):
+    salida = str(tmp_path / ("gestiones.csv" if formato == "csv" else "gestiones"))
+    insertar(conn, [("2025-11-20", 30000, 1), ("2025-11-21", 100, 2)])
+    correr(conn, salida, formato)
+    os.remove(salida + SUFIJO_WATERMARK)
+
+    with pytest.raises(RuntimeError, match="no hay marca de agua"):
+        correr(conn, salida, formato)
+
+    if formato == "parquet":
+        # Días posteriores a los guardados sí se pueden agregar
+        insertar(conn, [("2025-11-22", 100, 3)])
+        assert correr(conn, salida, formato, desde="2025-11-22") == 1
+        assert list_partitions(salida) == ["2025-11-20", "2025-11-21", "2025-11-22"]
+
+
+def test_parquet_con_particiones_reemplazadas(conn, tmp_path):
+    salida = str(tmp_path / "gestiones")
+    insertar(conn, [("2025-11-20", 30000, 1)])
+    correr(conn, salida, "parquet")
+
+    # Un backfill reemplazó el día: los archivos del último lote ya no están
+    carpeta = os.path.join(salida, "FechaGestion=2025-11-20")
+    for f in os.listdir(carpeta):
+        os.rename(os.path.join(carpeta, f), os.path.join(carpeta, "part-" + f))
+
+    with pytest.raises(RuntimeError, match="no es el que describe"):
+        correr(conn, salida, "parquet")
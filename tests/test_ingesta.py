@@ -0,0 +1,59 @@
+import json
+
+import pandas as pd
+import pytest
+
+from benchmarks.bench_ingesta import COLUMNAS_PANEL, generar_csv, generar_csv_latin1_tardio
+from esquema import FECHAS, dtypes_lectura
+from ingesta import MUESTRA_BYTES, SUFIJO_FORMATO, load_csv, load_shards
+
+
+@pytest.mark.parametrize("dtype", [dtypes_lectura(), None])
+def test_latin1_despues_de_la_muestra(tmp_path, dtype):
+    path = str(tmp_path / "gestiones.csv")
+    generar_csv_latin1_tardio(path, 2_000)
+
+    with open(path, "rb") as f:
+        assert f.read(MUESTRA_BYTES).isascii()
+
+    df = load_csv(path, dtype=dtype, usecols=["Gestor", "ProductoGestion"])
+
+    assert df["Gestor"].iloc[-1] == "GESTOR MUÑOZ"
+    assert df["ProductoGestion"].iloc[-1] == "MICROCRÉDITO"
+    with open(path + SUFIJO_FORMATO, "r", encoding="utf-8") as f:
+        assert json.load(f)["encoding"] == "latin-1"
+
+    # La segunda lectura usa el sidecar corregido
+    assert load_csv(path, dtype=dtype, usecols=["Gestor"])["Gestor"].iloc[-1] == "GESTOR MUÑOZ"
+
+
+def valores(serie):
+    # Las categorías distintas por parte quedan como texto en pd.concat
+    return [None if pd.isna(v) else v for v in serie.astype(object)]
+
+
+def test_load_shards_como_una_sola_lectura(tmp_path):
+    completo = str(tmp_path / "completo.csv")
+    generar_csv(completo, 3_000, lote=1_000)
+
+    # Tres partes con su encabezado; en la última Observacion viene vacía
+    # (Arrow la lee como tipo null) y con otras categorías
+    df = pd.read_csv(completo, sep=";", encoding="utf-8-sig", dtype=str, keep_default_na=False)
+    partes = [df.iloc[:1_000], df.iloc[1_000:2_500], df.iloc[2_500:].assign(Observacion="")]
+    partes[2] = partes[2][partes[2]["Gestor"] != "GESTOR 1"]
+    for i, parte in enumerate(partes, 1):
+        parte.to_csv(tmp_path / f"Gestion_part{i}.csv", sep=";", index=False, encoding="utf-8-sig")
+
+    kwargs = dict(dtype=dtypes_lectura(), usecols=COLUMNAS_PANEL + ["Observacion"], fechas=FECHAS)
+    unido = load_shards(str(tmp_path / "Gestion_part*.csv"), **kwargs)
+    esperado = pd.concat(
+        [load_csv(str(tmp_path / f"Gestion_part{i}.csv"), **kwargs) for i in (1, 2, 3)], ignore_index=True
+    )
+
+    assert len(unido) == sum(len(p) for p in partes)
+    assert isinstance(unido["Gestor"].dtype, pd.CategoricalDtype)
+    assert list(unido["Gestor"].cat.categories) == sorted(unido["Gestor"].cat.categories)
+    assert list(unido.columns) == list(esperado.columns)
+    for col in unido.columns:
+        assert valores(unido[col]) == valores(esperado[col]), col
+
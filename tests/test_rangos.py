@@ -0,0 +1,173 @@
+import datetime
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from almacen import leer_manifiesto, list_partitions, read_partitions
+from DatosGestion import PoolConexiones, extraer_rangos
+from dimensiones import DIM_ARCHIVOS, DIM_DIR, es_enriquecido, version_dimensiones
+
+# select/from con las columnas que filtra query_rango
+SELECT_SQLITE = """
+select FechaGestion, HoraGestion, NumeroOperacion, CodigoTipoContacto
+from gestiones
+"""
+
+DIAS = ["2025-11-01", "2025-11-02", "2025-11-03", "2025-11-04", "2025-11-05", "2025-11-06"]
+
+# 2025-11-04 sin gestiones del cedente
+FILAS_POR_DIA = {"2025-11-01": 3, "2025-11-02": 5, "2025-11-03": 2, "2025-11-04": 0,
+                 "2025-11-05": 4, "2025-11-06": 1}
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "gestiones.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "create table gestiones (CodigoCedente text, codigocanal integer, FechaGestion text,"
+        " HoraGestion integer, NumeroOperacion integer, CodigoTipoContacto text)"
+    )
+    filas = []
+    for dia, n in FILAS_POR_DIA.items():
+        filas += [("SOL", 1, dia, 36000 + i, len(filas) + i, "TIPRESCDIRE") for i in range(n)]
+        # Otro cedente y otro canal: no entran
+        filas += [("OTRO", 1, dia, 36000, 0, "TIPRESCDIRE"), ("SOL", 9, dia, 36000, 0, "TIPRESCDIRE")]
+    conn.executemany("insert into gestiones values (?, ?, ?, ?, ?, ?)", filas)
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def dim_dir(tmp_path):
+    # Copia de las dimensiones, para poder cambiarlas
+    destino = tmp_path / "dims"
+    destino.mkdir()
+    for archivo in DIM_ARCHIVOS.values():
+        shutil.copy(os.path.join(DIM_DIR, archivo), destino / archivo)
+    return str(destino)
+
+
+def pool(db, consultados, fallar=()):
+    """Pool SQLite que anota el día de cada consulta y falla en los de `fallar`."""
+
+    class Cursor(sqlite3.Cursor):
+        def execute(self, sql, params=()):
+            dia = params[-2]
+            consultados.append(dia)
+            if dia in fallar:
+                raise sqlite3.OperationalError(f"falla simulada en {dia}")
+            return super().execute(sql, params)
+
+    class Conexion(sqlite3.Connection):
+        def cursor(self, factory=Cursor):
+            return super().cursor(factory)
+
+    return PoolConexiones(lambda: sqlite3.connect(db, check_same_thread=False, factory=Conexion), maximo=3)
+
+
+def extraer(db, destino, dim_dir, fallar=(), desde=DIAS[0], hasta=DIAS[-1], **kwargs):
+    consultados = []
+    with pool(db, consultados, fallar) as conexiones:
+        completos, fallidos = extraer_rangos(
+            desde, hasta, cedentes=["SOL"], canales=[1], destino=destino, pool=conexiones,
+            max_workers=3, select=SELECT_SQLITE, dim_dir=dim_dir, batch_size=2, **kwargs
+        )
+    return completos, fallidos, sorted(consultados)
+
+
+def filas_por_dia(destino):
+    df = read_partitions(destino)
+    return df.groupby(df["FechaGestion"].astype(str)).size().to_dict()
+
+
+def test_backfill_paralelo(db, dim_dir, tmp_path):
+    destino = str(tmp_path / "almacen")
+
+    completos, fallidos, consultados = extraer(db, destino, dim_dir)
+
+    assert fallidos == []
+    assert consultados == DIAS
+    assert {str(d): n for d, n in completos.items()} == FILAS_POR_DIA
+    assert filas_por_dia(destino) == {d: n for d, n in FILAS_POR_DIA.items() if n}
+
+    # El día sin filas también queda con manifiesto
+    assert leer_manifiesto(destino, "2025-11-04")["filas"] == 0
+    assert list_partitions(destino) == DIAS
+
+    assert set(read_partitions(destino)["TipoContacto"]) == {"DIRECTO"}
+    assert es_enriquecido(destino, version_dimensiones(dim_dir))
+
+    # Sin staging ni carpetas temporales al lado del almacén
+    assert sorted(os.listdir(tmp_path)) == ["almacen", "dims", "gestiones.db"]
+
+
+def test_reanuda_solo_los_rangos_fallidos(db, dim_dir, tmp_path):
+    destino = str(tmp_path / "almacen")
+
+    completos, fallidos, _ = extraer(db, destino, dim_dir, fallar={"2025-11-03", "2025-11-05"})
+    assert fallidos == [datetime.date(2025, 11, 3), datetime.date(2025, 11, 5)]
+    assert len(completos) == 4
+    assert leer_manifiesto(destino, "2025-11-03") is None
+
+    # Lo ya extraído se salta; solo se consultan los días que fallaron
+    completos, fallidos, consultados = extraer(db, destino, dim_dir)
+    assert fallidos == []
+    assert consultados == ["2025-11-03", "2025-11-05"]
+    assert filas_por_dia(destino) == {d: n for d, n in FILAS_POR_DIA.items() if n}
+
+    # Completo: no se vuelve a consultar nada
+    completos, _, consultados = extraer(db, destino, dim_dir)
+    assert completos == {} and consultados == []
+
+
+def test_reanuda_rehace_particion_alterada(db, dim_dir, tmp_path):
+    destino = str(tmp_path / "almacen")
+    extraer(db, destino, dim_dir)
+
+    # Un archivo de más en un día: ya no calza con su manifiesto
+    carpeta = os.path.join(destino, "FechaGestion=2025-11-02")
+    archivo = next(f for f in os.listdir(carpeta) if f.endswith(".parquet"))
+    shutil.copy(os.path.join(carpeta, archivo), os.path.join(carpeta, "copia.parquet"))
+
+    _, _, consultados = extraer(db, destino, dim_dir)
+    assert consultados == ["2025-11-02"]
+    assert filas_por_dia(destino)["2025-11-02"] == FILAS_POR_DIA["2025-11-02"]
+
+
+def test_no_marca_almacen_con_dimensiones_viejas(db, dim_dir, tmp_path):
+    destino = str(tmp_path / "almacen")
+    extraer(db, destino, dim_dir)
+    vieja = version_dimensiones(dim_dir)
+
+    with open(os.path.join(dim_dir, DIM_ARCHIVOS["tipo_contacto"]), "a", encoding="utf-8") as f:
+        f.write("TIPNUEVO;NUEVO\n")
+    nueva = version_dimensiones(dim_dir)
+    assert nueva != vieja
+
+    # Re-extraer un solo día no deja los demás con las dimensiones nuevas
+    extraer(db, destino, dim_dir, desde="2025-11-02", hasta="2025-11-02", reanudar=False)
+    assert not es_enriquecido(destino, nueva)
+
+
+def test_cambio_de_dimensiones_rehace_los_dias(db, dim_dir, tmp_path):
+    destino = str(tmp_path / "almacen")
+    extraer(db, destino, dim_dir)
+    vieja = leer_manifiesto(destino, "2025-11-01")["consulta"]
+
+    with open(os.path.join(dim_dir, DIM_ARCHIVOS["tipo_contacto"]), "w", encoding="utf-8") as f:
+        f.write("CodigoTipoContacto;TipoContacto\nTIPRESCDIRE;DIRECTA\n")
+
+    # Los manifiestos son de otra versión: se vuelve a extraer todo
+    completos, _, consultados = extraer(db, destino, dim_dir)
+    assert consultados == DIAS
+    nuevas = {leer_manifiesto(destino, d)["consulta"] for d in DIAS}
+    assert len(nuevas) == 1 and vieja not in nuevas
+    assert set(read_partitions(destino)["TipoContacto"]) == {"DIRECTA"}
+    assert es_enriquecido(destino, version_dimensiones(dim_dir))
+
+    _, _, consultados = extraer(db, destino, dim_dir)
+    assert consultados == []